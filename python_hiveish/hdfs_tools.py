@@ -24,11 +24,24 @@ THE SOFTWARE.
 
 import hadoopy 
 import operator
+import os
+import subprocess
+import threading
+from multiprocessing.pool import ThreadPool
+try:
+    import queue
+except ImportError: #python 2
+    import Queue as queue
+
+from python_hiveish.mapreduce import topn
 
 def tb_topn_dict(path, limit=None, pprint = False):
     """Reads a path at HDFS that holds a dict, assumed to be a frequency dictionary), encoded as typed bytes. 
        Sorts the dict in descending order, then returns the top limit entries as a list of tuples
        
+       With a limit, the entries are streamed through a bounded heap (see mapreduce.topn), so only limit entries are ever held in memory; 
+       the entire dict is only loaded and sorted when limit is None. For very large dicts, execute.top_n_counts does the same on the cluster.
+       
        Args:
            path (strng): HDFS path
            limit (None or int): the number of entries to return: if None, the entire sorted dict is returned
@@ -36,55 +49,305 @@ def tb_topn_dict(path, limit=None, pprint = False):
         
         Returns: dict
     """
+    if limit:
+        top = topn.TopN(limit)
+        for key, value in hadoopy.readtb(path):
+            top.add(key, value)
+        items = top.items()
+    else:
+        items = sorted(dict(hadoopy.readtb(path)).items(), key=operator.itemgetter(1), reverse=True)
     top_dict = {}
-    count = 0
-    for key, value in sorted(dict(hadoopy.readtb(path)).items(), key=operator.itemgetter(1), reverse=True):
-        count += 1
+    for key, value in items:
         top_dict[key] = [value]
         if pprint:
             print((key, value))
-        if limit and count == limit:
-            break
     return top_dict    
          
-def read_hdfs_as_generator(path, read_all_at_once = False): 
+def _read_part(part, out, stop, batch_size):
+    """reads one part file and puts its records into the queue out in lists of batch_size, then None. 
+       An exception is put into out instead of being raised. Gives up when stop is set (the reader was abandoned)
+    """
+    try:
+        batch = []
+        for record in hadoopy.readtb(part):
+            batch.append(record)
+            if len(batch) == batch_size:
+                if not _put(out, batch, stop):
+                    return
+                batch = []
+        if batch and not _put(out, batch, stop):
+            return
+        _put(out, None, stop)
+    except Exception as e:
+        _put(out, e, stop)
+
+def _put(q, item, stop):
+    """q.put(item) that gives up (returning False) once stop is set, so that threads blocked on a full queue can end"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout = 0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def read_hdfs_parallel(path, num_threads = 8, ordered = True, prefetch = 4, batch_size = 1000, batches = False):
+    """Reads the part files at the HDFS path(s) with num_threads threads, each decoding one part file at a time, and returns the records as a generator
+    
+       At most prefetch batches of batch_size records per thread are read ahead of the caller, so memory stays bounded however large the output is.
+       With ordered=True, the records come in the same order as from hadoopy.readtb (part file by part file), and the threads read the next parts ahead;
+       with ordered=False, each batch is returned as soon as any thread has decoded it, which is faster when the order does not matter.
+       
+       Args:
+           path (str or list of str): HDFS path(s); a directory is read part file by part file (see hdfs_ls_files)
+           num_threads (int): the number of part files read at the same time
+           ordered (bool): see above
+           prefetch (int): the number of batches each thread can read ahead
+           batch_size (int): the number of records per batch
+           batches (bool): if True, lists of up to batch_size records are returned instead of the records
+        
+        Returns: (key, value) tuples, or lists of them
+    """
+    parts = hdfs_ls_files(path)
+    stop = threading.Event()
+    if ordered:
+        queues = [queue.Queue(prefetch) for _ in parts]
+        work = [(p, q) for p, q in zip(parts, queues)]
+    else:
+        shared = queue.Queue(prefetch * num_threads)
+        queues = [shared]
+        work = [(p, shared) for p in parts]
+    work.reverse() #popped from the end, so that the parts are started in order
+    
+    def worker():
+        while not stop.is_set():
+            try:
+                part, out = work.pop()
+            except IndexError:
+                return
+            _read_part(part, out, stop, batch_size)
+    
+    threads = [threading.Thread(target = worker, name = "hiveish-read-{0}".format(i)) for i in range(min(num_threads, len(parts)))]
+    for t in threads:
+        t.daemon = True
+        t.start()
+    try:
+        remaining = len(parts) #the parts not yet fully returned; each ends with a None in its queue
+        while remaining:
+            q = queues[len(parts) - remaining] if ordered else shared
+            item = q.get()
+            if item is None:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            elif batches:
+                yield item
+            else:
+                for record in item:
+                    yield record
+    finally:
+        stop.set()
+
+def read_hdfs_as_generator(path, read_all_at_once = False, num_threads = 8): 
     """Reads a path at HDFS and returns it line by line as a generator
+       The part files are read by num_threads threads in parallel (see read_hdfs_parallel); the lines keep their order 
        
        Args:
            path (strng): HDFS path
            read_all_at_once
+           num_threads (int): 1 reads the part files one after the other, as hadoopy.readtb does
         
         Returns: strings (lines of the file) 
     """
     if read_all_at_once:
-        lines = [i for i in hadoopy.readtb(path)]
+        lines = [i for i in read_hdfs_parallel(path, num_threads)]
         for i in lines:
             yield i
             
     else:        
-        for i in hadoopy.readtb(path):
+        for i in read_hdfs_parallel(path, num_threads):
             yield i     
+
+def _count_part(part):
+    return sum(1 for _ in hadoopy.readtb(part))
         
-def count_hdfs_lines(path):
+def count_hdfs_lines(path, num_threads = 8):
     """Simply counts the lines at the HDFS path
+       The part files are counted by num_threads threads in parallel, and the counts summed
        
        Args:
            path (strng): HDFS path
+           num_threads (int)
         
         Returns: int (# lines in file) 
     """    
-    count = 0
-    for i in read_hdfs_as_generator(path):
-        count += 1
-    return count
+    parts = hdfs_ls_files(path)
+    if not parts:
+        return 0
+    pool = ThreadPool(min(num_threads, len(parts)))
+    try:
+        return sum(pool.map(_count_part, parts))
+    finally:
+        pool.close()
     
-def print_hdfs(path):
+def print_hdfs(path, num_threads = 8):
     """Reads a path at HDFS and prints it
        
        Args:
            path (strng): HDFS path
+           num_threads (int): see read_hdfs_as_generator
         
         Returns: None 
     """
-    for i in read_hdfs_as_generator(path):
+    for i in read_hdfs_as_generator(path, num_threads = num_threads):
         print(i)
+
+def hdfs_du(path):
+    """Returns the total size of the files at the HDFS path(s)
+       
+       Args:
+           path (str or list of str): HDFS path(s); can contain asterisks
+        
+        Returns: int (# bytes) 
+    """
+    total = 0
+    for p in (path if isinstance(path, list) else [path]):
+        for line in subprocess.check_output(["hadoop", "fs", "-du", "-s", p]).decode("utf-8").splitlines():
+            if line.strip():
+                total += int(line.split()[0])
+    return total
+
+def hdfs_ls_files(path):
+    """Lists the data files at the HDFS path(s); a directory is expanded to the files directly below it, 
+       skipping the ones Hadoop itself skips as input (names starting with _ or ., e.g., _SUCCESS and _logs)
+       
+       Args:
+           path (str or list of str): HDFS path(s); can contain wildcards
+        
+        Returns: list of str
+    """
+    files = []
+    for p in (path if isinstance(path, list) else [path]):
+        if any(c in p for c in "*?["): #hadoop fs -ls expands the wildcards and lists the matched directories' contents
+            files += [f for f in hadoopy.ls(p) if not os.path.basename(f).startswith(("_", "."))]
+        elif hadoopy.isdir(p):
+            files += [f for f in hadoopy.ls(p) if not os.path.basename(f).startswith(("_", "."))]
+        else:
+            files.append(p)
+    return files
+
+def hdfs_ls_dirs(path):
+    """Lists the directories matching the HDFS path(s), with one hadoop fs -ls per 500 paths (to keep the command line short)
+       
+       Args:
+           path (str or list of str): HDFS path(s); can (and usually do) contain wildcards
+        
+        Returns: list of str; empty if nothing matches
+    """
+    paths = path if isinstance(path, list) else [path]
+    dirs = []
+    with open(os.devnull, "w") as devnull: #hadoop fs -ls complains about every path matching nothing
+        for i in range(0, len(paths), 500):
+            try:
+                out = subprocess.check_output(["hadoop", "fs", "-ls", "-d"] + paths[i:i + 500], stderr=devnull)
+            except subprocess.CalledProcessError as e: #hadoop fs -ls fails if any path matches nothing, but still lists the others
+                out = e.output
+            dirs += [line.split()[-1] for line in out.decode("utf-8").splitlines() if line.startswith("d")]
+    return dirs
+
+def hdfs_is_typedbytes(path):
+    """True if the HDFS file is a SequenceFile, as every (typedbytes) job output written through hadoopy is, rather than text
+       
+       Args:
+           path (str): HDFS path of a file
+        
+        Returns: bool
+    """
+    p = subprocess.Popen(["hadoop", "fs", "-cat", path], stdout=subprocess.PIPE)
+    try:
+        return p.stdout.read(3) == b"SEQ" #the SequenceFile magic
+    finally:
+        p.stdout.close()
+        p.kill()
+        p.wait()
+
+def _hdfs_stat(paths, fmt):
+    """runs hadoop fs -stat fmt on paths, in batches to keep the command line short; one output line per path"""
+    lines = []
+    for i in range(0, len(paths), 500):
+        lines += subprocess.check_output(["hadoop", "fs", "-stat", fmt] + paths[i:i + 500]).decode("utf-8").splitlines()
+    return lines
+
+def hdfs_stat_files(path):
+    """Returns the size and modification time of each data file at the HDFS path(s) (see hdfs_ls_files)
+       
+       Args:
+           path (str or list of str): HDFS path(s)
+        
+        Returns: list of (str, int, int) tuples; (file, # bytes, modification time in seconds since epoch)
+    """
+    files = hdfs_ls_files(path)
+    return [(f, int(size), int(mtime) // 1000) for f, (size, mtime) in zip(files, [l.split() for l in _hdfs_stat(files, "%b %Y")])]
+
+def hdfs_stat_dirs(path):
+    """Returns the total size and the modification time of every directory matching the HDFS path
+       
+       Args:
+           path (str): HDFS path; can (and usually does) contain asterisks
+        
+        Returns: list of (str, int, int) tuples; (directory, # bytes under it, modification time in seconds since epoch)
+    """
+    sizes = []
+    for line in subprocess.check_output(["hadoop", "fs", "-du", "-s", path]).decode("utf-8").splitlines():
+        if line.strip():
+            sizes.append((line.split()[-1], int(line.split()[0])))
+    mtimes = _hdfs_stat([d for d, _ in sizes], "%Y")
+    return [(d, size, int(mtime) // 1000) for (d, size), mtime in zip(sizes, mtimes)]
+
+def hdfs_mv(src, dst):
+    """Renames an HDFS path, creating the parent directory of dst if needed. dst must not exist (hadoop fs -mv would move src into it)
+       
+       Args:
+           src (str): HDFS path
+           dst (str): HDFS path
+        
+        Returns: None
+    """
+    subprocess.check_call(["hadoop", "fs", "-mkdir", "-p", dst.rstrip("/").rsplit("/", 1)[0]])
+    subprocess.check_call(["hadoop", "fs", "-mv", src, dst])
+
+def hdfs_mv_into(paths, directory):
+    """Moves HDFS paths into a directory, creating it if needed, with one hadoop fs -mv
+       
+       Args:
+           paths (list of str): HDFS paths
+           directory (str): HDFS path
+        
+        Returns: None
+    """
+    subprocess.check_call(["hadoop", "fs", "-mkdir", "-p", directory])
+    subprocess.check_call(["hadoop", "fs", "-mv"] + paths + [directory])
+
+def hdfs_read_text(path):
+    """Returns the contents of a (small) text file at the HDFS path as a string
+       
+       Args:
+           path (str): HDFS path
+        
+        Returns: str
+    """
+    return subprocess.check_output(["hadoop", "fs", "-cat", path]).decode("utf-8")
+
+def hdfs_write_text(path, text):
+    """Writes a string to a (small) text file at the HDFS path, replacing it if it exists
+       
+       Args:
+           path (str): HDFS path
+           text (str): the contents
+        
+        Returns: None
+    """
+    p = subprocess.Popen(["hadoop", "fs", "-put", "-f", "-", path], stdin=subprocess.PIPE)
+    p.communicate(text.encode("utf-8"))
+    if p.returncode:
+        raise Exception("Could not write {0}".format(path))
@@ -0,0 +1,196 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Tommy Carpenter
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+"""
+Aggregate functions for GROUP BY jobs (see execute.select_aggregates_where_and_groupby).
+
+Every aggregate is a mergeable partial state: init turns one column value into a state, merge combines two states (in any order 
+and grouping), and final turns the state of a whole group into the result. So the same code runs in the mapper (which aggregates 
+its rows in memory), the combiner and the reducer, and only one small state per group and aggregate is shuffled.
+
+    sum             the sum of the column's numbers
+    min, max        the smallest / largest of the column's numbers
+    avg             the mean of the column's numbers; the state is the pair [sum, count]
+    count           the number of rows with a (non empty) value in the column, like COUNT(column); count of column "*" is COUNT(*), the number of rows
+    count_distinct  the number of distinct values of the column; the state is the set of the distinct values (shuffled as a sorted list), so it grows with them
+    
+    approx_count_distinct  the estimated number of distinct values, from a HyperLogLog sketch (see sketches.py) whose size depends only on 
+                    the parameter, the wanted relative standard error (default 0.02: 4096 registers, at most 4 KB per group)
+    heavy_hitters   the most frequent values of the column, from a Space-Saving summary of parameter (default 100) counters: 
+                    [[value, estimated count, max error], ...], most frequent first. Any value in more than 1/parameter of the group's rows is listed
+
+As with NULL in SQL (and with the numeric WHERE operators, see predicates.py), a value that is not a number is skipped by the numeric 
+aggregates; count and count_distinct skip empty values. A group without any value gets NO_VALUE (the empty string) as its result, 
+and count/count_distinct get 0.
+
+On the wire (jobconf aggregates) the list of aggregates is written as name:column pairs separated by pipes, e.g. sum:3|avg:3|count:*, 
+and the aggregates taking a parameter as name:column:parameter, e.g. approx_count_distinct:2:0.01
+"""
+
+from python_hiveish.mapreduce import sketches
+
+NO_VALUE = "" #the state, and the result, of a numeric aggregate that has seen no number yet; None cannot be written as typed bytes
+
+def _number(s):
+    """s as an int if it is one, else as a float, else None"""
+    try:
+        return int(s)
+    except ValueError:
+        try:
+            return float(s)
+        except ValueError:
+            return None
+
+def _merge_numbers(f):
+    """a merge of two number states with f, where either can be NO_VALUE"""
+    def merge(a, b):
+        if a == NO_VALUE:
+            return b
+        if b == NO_VALUE:
+            return a
+        return f(a, b)
+    return merge
+
+def _init_number(s):
+    x = _number(s)
+    return x if x is not None else NO_VALUE
+
+def _init_avg(s):
+    x = _number(s)
+    return [x, 1] if x is not None else [0, 0]
+
+def _init_count(s):
+    return 1 if s != "" else 0
+
+def _init_distinct(s):
+    return set([s]) if s != "" else set()
+
+def _merge_distinct(a, b):
+    """unions two sets of distinct values (either can be a list, as read from the shuffle) in place"""
+    if not isinstance(a, set):
+        a = set(a)
+    a.update(b)
+    return a
+
+
+class Aggregate(object):
+    def __init__(self, name, init, merge, final, wire = None):
+        self.name = name
+        self.init = init   #column value (str) -> state
+        self.merge = merge #state, state -> state; can update and return its first argument
+        self.final = final #state -> result
+        self.wire = wire   #state -> the state as it is shuffled, if it is held differently in memory; None if it is not
+        
+
+AGGREGATES = dict((a.name, a) for a in [
+    Aggregate("sum", _init_number, _merge_numbers(lambda a, b: a + b), lambda s: s),
+    Aggregate("min", _init_number, _merge_numbers(min), lambda s: s),
+    Aggregate("max", _init_number, _merge_numbers(max), lambda s: s),
+    Aggregate("avg", _init_avg, lambda a, b: [a[0] + b[0], a[1] + b[1]], lambda s: float(s[0]) / s[1] if s[1] else NO_VALUE),
+    Aggregate("count", _init_count, lambda a, b: a + b, lambda s: s),
+    Aggregate("count_distinct", _init_distinct, _merge_distinct, len, sorted),
+])
+COUNT_STAR = Aggregate("count", lambda s: 1, lambda a, b: a + b, lambda s: s) #count of column "*"; every row counts
+
+def _approx_count_distinct(error):
+    p = sketches.hll_precision(float(error))
+    return Aggregate("approx_count_distinct", sketches.hll_init(p), sketches.hll_merge(p), sketches.hll_estimate(p), sketches.hll_wire)
+
+def _heavy_hitters(num_counters):
+    return Aggregate("heavy_hitters", sketches.space_saving_init, sketches.space_saving_merge(int(num_counters)), sketches.space_saving_top)
+
+PARAMETRIZED_AGGREGATES = {"approx_count_distinct" : (_approx_count_distinct, 0.02), #name: (function parameter -> Aggregate, default parameter)
+                           "heavy_hitters" : (_heavy_hitters, 100)}
+
+
+def encode_aggregates(aggregates): #list of (name, column) or (name, column, parameter) tuples; column is an int, a partition column name (see execute._partition_pruned), or "*" for count
+    """the aggregates jobconf"""
+    encoded = []
+    for a in aggregates:
+        name, column = a[0], a[1]
+        assert name in AGGREGATES or name in PARAMETRIZED_AGGREGATES, "Unsupported aggregate: {0}".format(name)
+        assert column != "*" or name == "count", "Only count can take the column *"
+        if name in PARAMETRIZED_AGGREGATES:
+            encoded.append("{0}:{1}:{2}".format(name, column, a[2] if len(a) > 2 else PARAMETRIZED_AGGREGATES[name][1]))
+        else:
+            encoded.append("{0}:{1}".format(name, column))
+    return "|".join(encoded)
+
+def decode_aggregates(aggregates_str):
+    """the (Aggregate, column) pairs of the aggregates jobconf; column is an int, a partition column name, or None for COUNT(*)"""
+    aggregates = []
+    for a in aggregates_str.split("|"):
+        fields = a.split(":")
+        name, column = fields[0], int(fields[1]) if fields[1].isdigit() else fields[1]
+        if column == "*":
+            aggregates.append((COUNT_STAR, None))
+        elif name in PARAMETRIZED_AGGREGATES:
+            aggregates.append((PARAMETRIZED_AGGREGATES[name][0](fields[2]), column))
+        else:
+            aggregates.append((AGGREGATES[name], column))
+    return aggregates
+
+def columns(aggregates): #list of (name, column) or (name, column, parameter) tuples
+    """the sorted column indices the aggregates read, then the sorted partition column names"""
+    read = set(a[1] for a in aggregates if a[1] != "*")
+    return sorted(c for c in read if isinstance(c, int)) + sorted(c for c in read if not isinstance(c, int))
+
+
+def _row_init(init, column, partitions):
+    """init of the state of an aggregate from a split row: from its column, the partition value (the same for every row of the task), or nothing for COUNT(*)"""
+    if column is None:
+        return lambda vals: init(None)
+    if isinstance(column, int):
+        return lambda vals: init(vals[column])
+    return lambda vals: init(partitions[column])
+
+
+class GroupStates(object):
+    """The partial states of a list of aggregates, one list of states per group"""
+    def __init__(self, aggregates,     #list of (Aggregate, column) pairs, see decode_aggregates
+                 partitions = None):   #dict; the partition values of the file being mapped, if a column is a partition column name (only init reads them)
+        self.inits = [_row_init(a.init, column, partitions) for a, column in aggregates]
+        self.merges = [a.merge for a, _ in aggregates]
+        self.finals = [a.final for a, _ in aggregates]
+        self.wires = [a.wire for a, _ in aggregates]
+        
+    def init(self, vals): 
+        """the states of a single split row"""
+        return [init(vals) for init in self.inits]
+    
+    def merge(self, states_1, states_2):
+        return [merge(a, b) for merge, a, b in zip(self.merges, states_1, states_2)]
+    
+    def merge_all(self, states_iter):
+        merged = None
+        for states in states_iter:
+            merged = states if merged is None else self.merge(merged, states)
+        return merged
+    
+    def final(self, states):
+        return [final(s) for final, s in zip(self.finals, states)]
+    
+    def wire(self, states):
+        """the states as they are shuffled"""
+        return [wire(s) if wire is not None else s for wire, s in zip(self.wires, states)]
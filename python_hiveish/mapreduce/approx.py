@@ -0,0 +1,70 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Tommy Carpenter
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import hashlib
+import math
+import struct
+
+"""
+Approximate queries over a sample of the input (see the approx argument of execute.select_where and select_count_star_where_and_groupby).
+
+The sample is deterministic, so re-running a query gives the same answer:
+    "files": only the input files whose path hashes below sample_rate are read (at least one). This is where the time is saved: 
+             the skipped files are never read, and the job runs as many fewer map tasks. The sampling rate used for scaling is the 
+             fraction of the input bytes actually read, which is close to sample_rate when there are many files of similar sizes
+    "rows":  every file is read, but only the rows whose hash is below sample_rate are used (see mappers._sampled); the shuffle and the 
+             reducers shrink, the reading does not
+             
+A count n over a sample of rate p is scaled to n / p, with the binomial standard error sqrt(n * (1 - p)) / p, which gives the confidence 
+interval n / p +- z * standard error. For "files" this treats the rows of the sampled files as if they were sampled one by one, 
+which understates the error when the counted rows are clustered in a few files.
+"""
+
+def path_hash(path):
+    """a 32 bit hash of a file path without its scheme and host, so that the sample does not depend on them"""
+    path = "/" + path.split("://", 1)[1].split("/", 1)[1] if "://" in path else path
+    return struct.unpack("<I", hashlib.md5(path.encode("utf-8")).digest()[:4])[0]
+
+def file_sampled(path, sample_rate):
+    """True for the files in the (deterministic) sample"""
+    return path_hash(path) < sample_rate * 2**32
+
+def z_score(confidence): #float in (0, 1), e.g. 0.95
+    """the z with P(-z < Z < z) = confidence for a standard normal Z (1.96 for 0.95), by bisection on erf"""
+    lo, hi = 0.0, 10.0
+    for _ in range(60):
+        mid = (lo + hi) / 2
+        if math.erf(mid / math.sqrt(2)) < confidence:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2
+
+def scaled_count(n, sample_rate, z):
+    """the estimate of a count that is n in the sample, and its confidence interval: [estimate, lower bound, upper bound]
+       the lower bound is never below n, which was actually seen
+    """
+    estimate = n / float(sample_rate)
+    error = z * math.sqrt(n * (1 - sample_rate)) / sample_rate
+    return [estimate, max(float(n), estimate - error), estimate + error]
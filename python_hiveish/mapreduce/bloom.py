@@ -0,0 +1,81 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Tommy Carpenter
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import hashlib
+import math
+import struct
+
+"""
+A Bloom filter of join keys, used to drop table 1 rows that cannot join before they are shuffled (see execute.join, bloom_fp_rate).
+
+It is built on the client, saved to a local file, shipped to the map tasks next to the job script, and loaded once per task. 
+A key that was added is always found; a key that was not is found with probability about fp_rate, and those rows are then dropped 
+by the join reducer as before, so the filter never changes the result of the join.
+"""
+
+def _to_bytes(x):
+    return x if isinstance(x, bytes) else x.encode("utf-8")
+
+
+class BloomFilter(object):
+    def __init__(self, num_bits, num_hashes, bits = None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bits if bits is not None else bytearray((num_bits + 7) // 8)
+        
+    @classmethod
+    def for_capacity(cls, num_keys, fp_rate): 
+        """the smallest filter holding num_keys keys with a false positive rate of at most fp_rate"""
+        num_keys = max(num_keys, 1)
+        num_bits = int(math.ceil(-num_keys * math.log(fp_rate) / math.log(2) ** 2))
+        num_hashes = max(1, int(round(float(num_bits) / num_keys * math.log(2))))
+        return cls(num_bits, num_hashes)
+    
+    def _positions(self, key):
+        """the num_hashes bit positions of key, by double hashing the two halves of its md5"""
+        h1, h2 = struct.unpack("<QQ", hashlib.md5(_to_bytes(key)).digest())
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+    
+    def add(self, key):
+        for p in self._positions(key):
+            self.bits[p >> 3] |= 1 << (p & 7)
+            
+    def __contains__(self, key):
+        bits = self.bits
+        for p in self._positions(key):
+            if not bits[p >> 3] & (1 << (p & 7)):
+                return False
+        return True
+    
+    def save(self, path):
+        """a "num_bits num_hashes" header line followed by the raw bits"""
+        with open(path, "wb") as f:
+            f.write(_to_bytes("{0} {1}\n".format(self.num_bits, self.num_hashes)))
+            f.write(self.bits)
+    
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            num_bits, num_hashes = [int(x) for x in f.readline().split()]
+            return cls(num_bits, num_hashes, bytearray(f.read()))
@@ -23,8 +23,16 @@ THE SOFTWARE.
 """
 
 import hadoopy
+import hashlib
+import json
+import operator
+import os
+import shutil
+import tempfile
+import threading
 import time
-from python_hiveish import logger
+from python_hiveish import logger, hdfs_tools
+from python_hiveish.mapreduce import aggregates, approx, bloom, mappers, inprocess, predicates, scheduler, stats
 
 class PlatformArgs:
      def __init__(self, 
@@ -33,11 +41,28 @@ class PlatformArgs:
                   output_root,  #the root for results NO TRAILING SLASH
                   hdfs_prefix,  #the path prefix to be prepended to all input paths. e.g., hdfs://bigdata. NO TRAILING SLASH
                   script_root,  #path to PythonTools's exact location on HDFS server. NO TRAILING SLASH
-                  switch,       #switch for hadoop platform; either "local", "frozen", or "hadoop"
+                  switch,       #switch for hadoop platform; either "local", "frozen", "hadoop", or "inprocess" (see mapreduce/inprocess.py; local paths, no Hadoop)
                   cmdenvs,       #system variables to set before launching job  
                   num_mappers = None,  #can specify the number of mappers; if None, hadoop sets it                
-                  num_reducers = None):  #can specify the number of reducers; if None, hadoop sets it      
-        """A struct that represents the HDFS/MapReduce cluster's parameters. Not specific to a specific job, but for all jobs that run on this cluster"""  
+                  num_reducers = None,  #can specify the number of reducers; if None, hadoop sets it      
+                  map_only = False,     #if True, jobs whose reducer is an identity (select_where, interlace_tables) run with zero reducers and skip the shuffle
+                  broadcast_join_max_bytes = 256*1024*1024, #join_strategy="auto" broadcasts table 2 if it is at most this many bytes on HDFS; must fit in a map task's memory
+                  result_cache = False,          #if True, a job identical to a previous one (same script, jobconfs, and unchanged inputs) returns the previous output path without running
+                  result_cache_max_age = None,   #seconds; cached outputs older than this are deleted. None means no limit
+                  result_cache_max_bytes = None, #cached outputs are deleted, oldest first, until they total at most this many bytes. None means no limit
+                  max_concurrent_jobs = 4,       #cap on the number of jobs submit() and select_where_interlace_multiple_tables run at the same time
+                  stats_catalog = None,          #local path of a stats.StatsCatalog JSON file; if given, jobs are planned from table statistics, see below
+                  bytes_per_reducer = 1024**3,   #stats_catalog only; a job gets one reducer per this many bytes it is expected to shuffle
+                  max_reducers = 999,            #stats_catalog only; cap on the number of reducers chosen
+                  stats_max_age = 24*3600):      #stats_catalog only; seconds after which the recorded size of an input is measured again
+        """A struct that represents the HDFS/MapReduce cluster's parameters. Not specific to a specific job, but for all jobs that run on this cluster
+        
+           With a stats_catalog, the catalog is consulted and kept up to date (see stats.py): the number of reducers of each job is derived 
+           from its expected shuffle size (num_reducers is then only used when that is unknown), joins choose between broadcast and repartition 
+           by default (join_strategy "auto"), group bys skip the combiner when they have about as many groups as rows, and skewed joins take 
+           their hot keys from the recorded heavy hitters. The statistics are gathered by collect_stats, and the sizes of the input tables 
+           by every job reading them (but not of the outputs of other jobs, see _catalogued)
+        """  
         self.python_cmd = python_cmd
         self.temp_path = temp_path
         self.output_root = output_root 
@@ -47,6 +72,17 @@ class PlatformArgs:
         self.cmdenvs = cmdenvs 
         self.num_mappers = num_mappers
         self.num_reducers = num_reducers
+        self.map_only = map_only
+        self.broadcast_join_max_bytes = broadcast_join_max_bytes
+        self.result_cache = result_cache
+        self.result_cache_max_age = result_cache_max_age
+        self.result_cache_max_bytes = result_cache_max_bytes
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.scheduler = scheduler.JobScheduler(max_concurrent_jobs) #shared by every submit() made with this PlatformArgs
+        self.stats = stats.StatsCatalog(stats_catalog) if stats_catalog else None
+        self.bytes_per_reducer = bytes_per_reducer
+        self.max_reducers = max_reducers
+        self.stats_max_age = stats_max_age
  
         
 def _hadoop_helper(platform_args, #instance of PlatformArgs
@@ -54,11 +90,27 @@ def _hadoop_helper(platform_args, #instance of PlatformArgs
                    in_name,      #input path    
                    out_name,     #output_path  
                    jobconfs,     #jobconfs 
-                   output_as_text = False):
+                   output_as_text = False,
+                   map_only = False,   #if True, the job is launched with zero reducers; only valid for scripts whose reducer does no work
+                   partitioner = False, #if True, Hadoop's KeyFieldBasedPartitioner is used; configure it through jobconfs
+                   files = [],         #list of str; local files shipped into the working directory of every task
+                   num_reducers = None, #int; overrides platform_args.num_reducers for this job (e.g., the number of buckets of a bucketed table)
+                   shuffle_bytes = None): #int; with a stats catalog, the expected shuffle size of the job, if it is known to differ from the input size
     """This is just a wrapper around hadoopy's launch method that allows one to swich platforms easily. 
        It also contains a few default args
        Not meant to be called directly except by function in this file that compose these arguments
        Please see the following for parameter definitions: http://hadoopy.readthedocs.org/en/latest/api.html
+       
+       When map_only is set, num_reducers is forced to 0 so Hadoop writes the mapper output directly, with no sort/shuffle/reduce. 
+       
+       With a stats catalog (see PlatformArgs), a job not given num_reducers gets one reducer per platform_args.bytes_per_reducer 
+       of shuffle_bytes, or of its input if that is not given. 
+       
+       When platform_args.result_cache is set, out_name is replaced by output_root/script_name/cache_<digest>, where the digest covers
+       the script, the jobconfs, the launch options and the size and modification time of every input file (see _result_cache_key). 
+       If that output already exists (and is complete), it is returned without launching anything. Otherwise the job writes to out_name, 
+       which is unique, and its output is renamed to the cache path once complete, so the cache path never holds a partial output and 
+       a job never removes the output of an identical job still running. 
     """
     args = {}
     args["python_cmd"] = platform_args.python_cmd
@@ -72,12 +124,26 @@ def _hadoop_helper(platform_args, #instance of PlatformArgs
     
     if output_as_text:
         args["use_seqoutput"] = False 
+        
+    if partitioner:
+        args["partitioner"] = True
+        
+    if files:
+        args["files"] = files
 
     if  platform_args.num_mappers:
         args["num_mappers"] = platform_args.num_mappers
             
     if  platform_args.num_reducers:
         args["num_reducers"] = platform_args.num_reducers
+        
+    if num_reducers:
+        args["num_reducers"] = num_reducers
+    elif platform_args.stats is not None and not map_only:
+        args["num_reducers"] = _planned_reducers(platform_args, in_name, shuffle_bytes)
+        
+    if map_only:
+        args["num_reducers"] = 0
 
     logger.info("Launching {0} with {1} on {2} and writing to {3}".format(args["script_path"], str(jobconfs), args["in_name"], args["out_name"]))
 
@@ -87,27 +153,379 @@ def _hadoop_helper(platform_args, #instance of PlatformArgs
         launcher = hadoopy.launch_frozen
     elif platform_args.switch == "local":
         launcher = hadoopy.launch_local 
+    elif platform_args.switch == "inprocess":
+        launcher = inprocess.launch_inprocess
+    else:
+        raise Exception("Unsupported Launch Switch: {0}".format(platform_args.switch))
+        
+    if not platform_args.result_cache:
+        launcher(**args)
+        return out_name
+    
+    cache_name = "{0}/{1}/{2}{3}".format(platform_args.output_root, script_name, RESULT_CACHE_PREFIX, _result_cache_key(platform_args, args))
+    with _result_cache_lock(cache_name): #identical jobs submitted concurrently run once; the others wait, then hit the cache
+        if _exists(platform_args, cache_name + "/_SUCCESS"):
+            logger.info("Result cache hit for {0}; reusing {1}".format(args["script_path"], cache_name))
+            return cache_name
+        try:
+            launcher(**args)
+        except:
+            if _exists(platform_args, out_name):
+                _rmr(platform_args, out_name)
+            raise
+        if _exists(platform_args, cache_name + "/_SUCCESS"): #an identical job of another process finished first
+            _rmr(platform_args, out_name)
+        else:
+            if _exists(platform_args, cache_name): #incomplete; only ever left behind by versions that wrote the cache path directly
+                _rmr(platform_args, cache_name)
+            _mv(platform_args, out_name, cache_name)
+    _evict_result_cache(platform_args, cache_name)
+    return cache_name
+
+
+RESULT_CACHE_PREFIX = "cache_" #cached outputs are output_root/<script_name>/cache_<digest>; nothing else under output_root is ever evicted
+
+TASK_INPUT_JOBCONFS = ("mapred.cache.files", "table_2_buckets", "table_2_broadcast_files") #jobconfs listing files the tasks read besides their input
+
+_result_cache_locks = {}
+_result_cache_locks_lock = threading.Lock()
+
+def _result_cache_lock(cache_name):
+    """the lock held while the job of a cached output is checked for, run and renamed into place"""
+    with _result_cache_locks_lock:
+        return _result_cache_locks.setdefault(cache_name, threading.Lock())
+
+def _result_cache_key(platform_args, args):
+    """digest of everything that determines the output of a launch; see _hadoop_helper
+       The files the tasks read besides their input (TASK_INPUT_JOBCONFS: the distributed cache of the broadcast join, the table 2 buckets 
+       of the merge join, ...) have their stats included too, and jobs shipping local files (e.g., the Bloom filter of a join) their contents
+    """
+    inputs = _stat_files(platform_args, args["in_name"])
+    for jc in args["jobconfs"]:
+        name, _, value = jc.partition("=")
+        if name.strip() in TASK_INPUT_JOBCONFS and value:
+            inputs += _stat_files(platform_args, [f.split("#")[0] for f in value.split(",")])
+    spec = {"script": args["script_path"].split("/")[-1],
+            "jobconfs": sorted([jc.strip() for jc in args["jobconfs"]]),
+            "inputs": sorted(inputs),
+            "num_reducers": args.get("num_reducers"),
+            "use_seqoutput": args.get("use_seqoutput", True),
+            "partitioner": args.get("partitioner", False),
+            "files": sorted(_file_digest(f) for f in args.get("files", []))}
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _file_digest(path):
+    """name and content digest of a local file shipped with a job"""
+    with open(path, "rb") as f:
+        return os.path.basename(path) + ":" + hashlib.sha1(f.read()).hexdigest()
+
+def _evict_result_cache(platform_args, keep):
+    """deletes the cached outputs older than result_cache_max_age, then the oldest ones until the rest fit in result_cache_max_bytes
+       keep, the output that was just written, is never deleted
+    """
+    if platform_args.result_cache_max_age is None and platform_args.result_cache_max_bytes is None:
+        return
+    entries = sorted(_stat_dirs(platform_args, "{0}/*/{1}*".format(platform_args.output_root, RESULT_CACHE_PREFIX)), key=operator.itemgetter(2), reverse=True)
+    now = time.time()
+    total = 0
+    for path, size, mtime in entries: #newest first
+        total += size
+        too_old = platform_args.result_cache_max_age is not None and now - mtime > platform_args.result_cache_max_age
+        too_big = platform_args.result_cache_max_bytes is not None and total > platform_args.result_cache_max_bytes
+        if (too_old or too_big) and path.rstrip("/").split("/")[-1] != keep.rstrip("/").split("/")[-1]:
+            logger.info("Evicting cached output {0} ({1} bytes, {2:.0f} seconds old)".format(path, size, now - mtime))
+            _rmr(platform_args, path)
+            total -= size
+
+
+_output_path_lock = threading.Lock()
+_last_output_stamp = [0.0]
+
+def _output_path(platform_args, job_name):
+    """output_root/job_name/<timestamp>; the timestamp is bumped if needed so that jobs launched concurrently never share an output path"""
+    with _output_path_lock:
+        stamp = max(time.time(), _last_output_stamp[0] + 0.000001)
+        _last_output_stamp[0] = stamp
+    return platform_args.output_root + "/{0}".format(job_name) + "/%f" % stamp
+
+
+def submit(platform_args, fn, *args, **kwargs):
+    """Non-blocking version of any function in this file: submit(platform_args, join, table_1_path = ...) starts 
+       join(platform_args, table_1_path = ...) in the background and returns a scheduler.JobHandle; call .result() for the output path. 
+       JobHandles can be passed as arguments (e.g., as paths) to later submits, which then wait for them. 
+       At most platform_args.max_concurrent_jobs run at once
+    """
+    return platform_args.scheduler.submit(fn, platform_args, *args, **kwargs)
+
+
+def _du(platform_args, path):
+    """size in bytes of the input path(s), on HDFS or, for the inprocess switch, on the local disk"""
+    return inprocess.du(path) if platform_args.switch == "inprocess" else hdfs_tools.hdfs_du(path)
+
+def _catalogued(platform_args, path):
+    """whether the size of path is kept in the stats catalog: only the tables given to the jobs are, not the outputs of earlier jobs 
+       (anything under output_root or temp_path, e.g. intermediate and Bloom key outputs), which are many and short lived, 
+       nor lists of paths (e.g., pruned partitions or sampled files), so the catalog stays about as large as the set of tables queried
+    """
+    return (platform_args.stats is not None and not isinstance(path, list) and 
+            not any(path.startswith(root.rstrip("/") + "/") for root in [platform_args.output_root, platform_args.temp_path]))
+
+def _table_bytes(platform_args, path):
+    """the size of the input path(s), from the stats catalog if it was recorded recently enough; measured otherwise, 
+       and recorded if path is a table the catalog keeps (see _catalogued)
+    """
+    if not _catalogued(platform_args, path):
+        return _du(platform_args, path)
+    size = platform_args.stats.bytes(path, platform_args.stats_max_age)
+    if size is None:
+        size = _du(platform_args, path)
+        platform_args.stats.update(path, bytes = size, updated = time.time())
+    return size
+
+def _planned_reducers(platform_args, in_path, shuffle_bytes = None):
+    """with a stats catalog, the number of reducers of a job: one per platform_args.bytes_per_reducer of shuffle_bytes, or of its input if that is not given"""
+    expected = shuffle_bytes if shuffle_bytes is not None else _table_bytes(platform_args, in_path)
+    num_reducers = max(1, min(platform_args.max_reducers, -(-expected // platform_args.bytes_per_reducer)))
+    logger.info("Expecting to shuffle {0} bytes; using {1} reducers".format(expected, num_reducers))
+    return num_reducers
+
+GROUP_BYTES = 64 #rough shuffle size of one group of a group by (key and partial state)
+SPLIT_BYTES = 128*1024*1024 #rough input split size, i.e. input bytes per map task
+
+def _group_by_plan(platform_args, in_path, key_columns):
+    """(whether to use a combiner, the expected shuffle bytes or None if unknown) of a group by on key_columns of in_path, from the stats catalog
+       
+       Each map task outputs at most one partial result per group (fewer after the combiner), so the shuffle is about 
+       min(rows, groups * map tasks) * GROUP_BYTES. When there are more than half as many groups as rows, combining cannot even halve it 
+       and the combiner is skipped
+    """
+    if platform_args.stats is None or key_columns == "*" or _partition_columns(key_columns):
+        return True, None
+    rows = platform_args.stats.get(in_path).get("rows")
+    groups = platform_args.stats.distinct(in_path, key_columns) if key_columns else 1
+    if rows is None or groups is None:
+        return True, None
+    map_tasks = max(1, _table_bytes(platform_args, in_path) // SPLIT_BYTES)
+    use_combiner = groups <= rows / 2
+    logger.info("Group by of about {0} groups over {1} rows; {2}".format(groups, rows, "with a combiner" if use_combiner else "without a combiner"))
+    return use_combiner, min(rows, groups * map_tasks) * GROUP_BYTES
+
+def collect_stats(platform_args,  #an instance of PlatformArgs with a stats_catalog
+                  in_path,        #str or list of str; the table
+                  columns,        #list of ints; the columns to estimate the distinct values and heavy hitters of
+                  delimiter = ",",
+                  sample_rate = None, #float in (0, 1]; if given, only this fraction of the input files is read (see approx.py)
+                  top_n = 20,         #int; the number of heavy hitters recorded per column
+                  error = 0.02):      #float; the relative standard error of the distinct estimates
+    """Gathers the statistics of a table into the stats catalog (see stats.py) with one select_aggregates_where_and_groupby job without 
+       GROUP BY: COUNT(*), and approx_count_distinct and heavy_hitters of each column. Only sketches are shuffled, so it costs about one scan 
+       of the table, or of sample_rate of it.
+       
+       Over a sample, the row count and the heavy hitter counts are scaled up by the sampling rate. Distinct counts do not scale with the 
+       sample: a column that is (almost) unique in the sample is scaled up like the rows, any other one is recorded as seen, a lower bound.
+       
+       Returns: the table's stats, as recorded
+    """
+    assert platform_args.stats is not None, "collect_stats needs PlatformArgs(stats_catalog = ...)"
+    sample_path, extra_jobconfs, rate = _approx_sample(platform_args, in_path, sample_rate, "files") if sample_rate else (in_path, [], 1.0)
+    aggregate_columns = [("count", "*")] + [("approx_count_distinct", c, error) for c in columns] + [("heavy_hitters", c, 10 * top_n) for c in columns]
+    out_path = select_aggregates_where_and_groupby(platform_args, sample_path, [], aggregate_columns, delimiter = delimiter)
+    results = [v for _, v in _readtb(platform_args, out_path)]
+    if not results:
+        raise Exception("{0} has no rows".format(in_path))
+    results = results[0]
+    rows = results[0]
+    distinct, heavy_hitters = {}, {}
+    for i, c in enumerate(columns):
+        d = results[1 + i]
+        distinct[str(c)] = int(d / rate) if d >= 0.9 * rows else d
+        heavy_hitters[str(c)] = [[value, int(count / rate)] for value, count, _ in results[1 + len(columns) + i][:top_n]]
+    platform_args.stats.update(in_path, rows = int(rows / rate), distinct = distinct, heavy_hitters = heavy_hitters, 
+                               bytes = _du(platform_args, in_path), updated = time.time())
+    return platform_args.stats.get(in_path)
+
+def _ls_files(platform_args, path):
+    """data files of the input path(s), on HDFS or, for the inprocess switch, on the local disk"""
+    return inprocess.ls_files(path) if platform_args.switch == "inprocess" else hdfs_tools.hdfs_ls_files(path)
+
+def _ls_dirs(platform_args, path):
+    return inprocess.ls_dirs(path) if platform_args.switch == "inprocess" else hdfs_tools.hdfs_ls_dirs(path)
+
+def _stat_files(platform_args, path):
+    """(file, bytes, mtime) of the data files of the input path(s), on HDFS or, for the inprocess switch, on the local disk"""
+    return inprocess.stat_files(path) if platform_args.switch == "inprocess" else hdfs_tools.hdfs_stat_files(path)
+
+def _stat_dirs(platform_args, path):
+    """(directory, bytes, mtime) of the directories matching path, on HDFS or, for the inprocess switch, on the local disk"""
+    return inprocess.stat_dirs(path) if platform_args.switch == "inprocess" else hdfs_tools.hdfs_stat_dirs(path)
+
+def _is_typedbytes(platform_args, fname):
+    """True if the data file (see _ls_files) holds typedbytes records, as the outputs of the jobs in this library do, rather than text lines"""
+    return inprocess.is_typedbytes(fname) if platform_args.switch == "inprocess" else hdfs_tools.hdfs_is_typedbytes(fname)
+
+def _exists(platform_args, path):
+    return os.path.exists(path) if platform_args.switch == "inprocess" else hadoopy.exists(path)
+
+def _rmr(platform_args, path):
+    return shutil.rmtree(path) if platform_args.switch == "inprocess" else hadoopy.rmr(path)
+
+def _mv(platform_args, src, dst):
+    """renames src to dst, creating the parent directory of dst if needed"""
+    if platform_args.switch == "inprocess":
+        if not os.path.isdir(os.path.dirname(dst)):
+            os.makedirs(os.path.dirname(dst))
+        os.rename(src, dst)
+    else:
+        hdfs_tools.hdfs_mv(src, dst)
+
+def _mv_into(platform_args, paths, directory):
+    """moves paths into directory, creating it if needed"""
+    return inprocess.mv_into(paths, directory) if platform_args.switch == "inprocess" else hdfs_tools.hdfs_mv_into(paths, directory)
+
+def _readtb(platform_args, path):
+    """reads the (key, value) output of a job, from HDFS or, for the inprocess switch, from the local disk"""
+    return inprocess.readtb(path) if platform_args.switch == "inprocess" else hadoopy.readtb(path)
+
+def _read_text(platform_args, path):
+    if platform_args.switch == "inprocess":
+        with open(path) as f:
+            return f.read()
+    return hdfs_tools.hdfs_read_text(path)
+
+def _write_text(platform_args, path, text):
+    if platform_args.switch == "inprocess":
+        with open(path, "w") as f:
+            f.write(text)
     else:
-        raise Exception("Unsupported Launch Switch: {0}".format(switch))
-    launcher(**args)
-    return out_name
+        hdfs_tools.hdfs_write_text(path, text)
+
+
+BUCKETS_FILE = "_BUCKETS" #written into the output directory of a bucketed table; Hadoop skips it as input because of the underscore
+
+def _bucketing(platform_args, path):
+    """the bucketing metadata (see select_where, num_buckets) of the table at path, or None if it is not a single bucketed table"""
+    if isinstance(path, list) or any(c in path for c in "*?["):
+        return None
+    metadata_path = path.rstrip("/") + "/" + BUCKETS_FILE
+    if not _exists(platform_args, metadata_path):
+        return None
+    return json.loads(_read_text(platform_args, metadata_path))
+
+def _partition_columns(*column_lists):
+    """the partition column names in column_lists (lists of column indices and names, or "*")"""
+    return [c for columns in column_lists if columns != "*" for c in columns if not isinstance(c, int)]
+
+def _partition_pruned(platform_args, path, filter_columns, filter_vals, invert_flags, filter_operators, *column_lists):
+    """Partition pruning for Hive style partitioned tables, stored as path/name_1=value/name_2=value/.../part files
+    
+       The name_i are virtual columns: they can be used by name wherever a column index can (filter, key and target columns). 
+       The filters on them are evaluated here, one directory level at a time, against the directory names, so that only the matching 
+       partitions are listed and read. Each level is listed at once (the children of all of the partitions kept at the level above, 
+       with a single hadoop fs -ls), so planning costs one listing per partition column, not one per directory; the mappers get the values of the other references from the path of the file they read 
+       (see mappers.partition_values). Nothing is done unless a partition column is referenced, in the filters or in column_lists.
+       
+       Returns: the path(s) to read (the leaf partition directories), and the filter_columns, filter_vals, invert_flags and filter_operators 
+                without the partition filters
+    """
+    if not _partition_columns(filter_columns, *column_lists):
+        return path, filter_columns, filter_vals, invert_flags, filter_operators
+    operators = filter_operators or ["in"] * len(filter_columns)
+    partition_filters = {} #name: list of predicates over [value]
+    data_filters = []
+    for i, c in enumerate(filter_columns):
+        if isinstance(c, int):
+            data_filters.append(i)
+        else:
+            partition_filters.setdefault(c, []).append(predicates.compile_where([0], [operators[i]], [[str(v) for v in filter_vals[i]]], [bool(invert_flags[i])]))
+    
+    level, names = path if isinstance(path, list) else [path], set()
+    while True:
+        children = _ls_dirs(platform_args, [parent.rstrip("/") + "/*=*" for parent in level]) #one listing of the whole level
+        if not children:
+            break
+        level = []
+        for d in children:
+            name, value = mappers.partition_values(d.rstrip("/").split("/")[-1]).popitem()
+            names.add(name)
+            if all(passed([value]) for passed in partition_filters.get(name, [])):
+                level.append(d)
+        if not level:
+            break
+    for name in _partition_columns(filter_columns, *column_lists):
+        if name not in names:
+            raise Exception("{0} is not a partition column of {1}".format(name, path))
+    if not level:
+        raise Exception("No partition of {0} matches the WHERE clause".format(path))
+    logger.info("Partition pruning: reading {0} partitions of {1}".format(len(level), path))
+    return (level, [filter_columns[i] for i in data_filters], [filter_vals[i] for i in data_filters], [invert_flags[i] for i in data_filters], 
+            [filter_operators[i] for i in data_filters] if filter_operators else None)
+
+
+APPROX_FILE = "_APPROX" #written into the output directory of an approximate select_where; holds the sampling rate of its rows
+
+def _approx_sample(platform_args, in_path, sample_rate, unit):
+    """the input path(s), the extra jobconfs and the effective sampling rate of a query over a sample_rate sample of in_path (see approx.py)"""
+    assert 0 < sample_rate <= 1
+    assert unit in ["files", "rows"]
+    if unit == "rows":
+        return in_path, ['sample_rate={0}'.format(sample_rate)], sample_rate
+    files = _stat_files(platform_args, in_path)
+    sampled = [(f, size) for f, size, _ in files if approx.file_sampled(f, sample_rate)]
+    if not sampled:
+        f, size, _ = min(files, key=lambda x: approx.path_hash(x[0])) #too few files for the rate; read at least one
+        sampled = [(f, size)]
+    total_bytes = sum(size for _, size, _ in files)
+    rate = float(sum(size for _, size in sampled)) / total_bytes if total_bytes else 1.0
+    logger.info("Approximate query over {0} of {1} input files ({2:.2%} of the bytes)".format(len(sampled), len(files), rate))
+    return [f for f, _ in sampled], [], rate
+
+def _approx_count_jobconfs(sample_rate, confidence):
+    """the jobconfs of reducers.ApproxCountReducer"""
+    return ['approx_sample_rate={0!r}'.format(sample_rate), 
+            'approx_z={0!r}'.format(approx.z_score(confidence))]
+
+def approx_row_count(platform_args, #an instance of PlatformArgs
+                     path,          #the output path of select_where
+                     confidence = 0.95):
+    """The number of rows of a select_where output, scaled up if it was an approximate select_where (see approx.py)
+    
+       Returns: [estimated count, lower bound, upper bound] (all three equal to the count if the select_where was exact)
+    """
+    n = sum(1 for _ in _readtb(platform_args, path))
+    metadata_path = path.rstrip("/") + "/" + APPROX_FILE
+    if not _exists(platform_args, metadata_path):
+        return [n, n, n]
+    return approx.scaled_count(n, json.loads(_read_text(platform_args, metadata_path))["sample_rate"], approx.z_score(confidence))
+
+def _bucketed_on(bucketing, key_columns, delimiter):
+    """True if the join key a join builds from key_columns of the (projected, comma delimited) rows of a bucketed table is exactly its bucket key"""
+    if bucketing is None or delimiter != ",":
+        return False
+    targets = bucketing["target_columns"]
+    if targets == "*":
+        return list(key_columns) == bucketing["key_columns"]
+    return all(c < len(targets) for c in key_columns) and [targets[c] for c in key_columns] == bucketing["key_columns"]
 
 
 def interlace_tables(platform_args,  #an instance of PlatformArgs    
                      input_paths):   #str or list of str; the input HDFS path(s) representing table 1. can contain asterisk paths
-    """Simply takes all of the tables defined by input_paths, and writes them into the same table"""
+    """Simply takes all of the tables defined by input_paths, and writes them into the same table
+    
+       If platform_args.map_only is set, the keys are suppressed in the mapper and the job runs with zero reducers
+    """
     out_path = _hadoop_helper(platform_args, 
-                              "identity_only_values",
+                              "identity_only_values_map_only" if platform_args.map_only else "identity_only_values",
                               input_paths, 
-                              platform_args.output_root + "/{0}".format("interlace_tables") + "/%f" % time.time() , 
+                              _output_path(platform_args, "interlace_tables"), 
                               [],
-                              output_as_text = True)    
+                              output_as_text = True,
+                              map_only = platform_args.map_only)    
     
     return out_path
     
     
 def join(platform_args,               #an instance of PlatformArgs                        
-        table_1_path,                 #str or list of str; the input HDFS path(s) representing table 1. THIS PATH OR LIST OF PATHS CANNOT CONTAIN ASTERISKS AND MUST BE FULLY COMPELTE!
+        table_1_path,                 #str or list of str; the input HDFS path(s) representing table 1. Can contain wildcards (*, ?, [..]) within path components
         table_2_path,                 #" "   
         table_1_key_columns,          #list of ints; represents the columns that form the composite join path
         table_2_key_columns,          #" "
@@ -119,116 +537,344 @@ def join(platform_args,               #an instance of PlatformArgs
         table_2_filter_vals= [],      #" "
         table_1_invert_flags= [],     #list of boolean; determines whether to select "NOT IN" instead of "IN" for each column (invert_flags[0] applied to filter_columns[0], etc)
         table_2_invert_flags= [],      #" " 
+        table_1_filter_operators = None, #list of str; the operator of each table 1 filter column, see predicates.py. If None, all are "in" 
+        table_2_filter_operators = None, #" "
         table_1_target_columns = "*", #the columns from table 1 to select
         table_2_target_columns = "*", #the columns from table 2 to select
-        join_switch = "inner_join"):  # either "inner_join" or "left_join"      
+        join_switch = "inner_join",   # either "inner_join", "left_join", "semi_join" or "anti_join"
+        join_strategy = None,         # either "repartition" (reduce side join), "broadcast" (map side join, table 2 must fit in a mapper's memory), "merge" (map side join of co-bucketed tables) or "auto". None is "auto" with a stats catalog, else "repartition"
+        skew_salts = 0,               #int; if > 0, the hot join keys are each spread over this many reducers (repartition only)
+        skew_keys = None,             #list of hot join keys, each a list of the table 1 key column values; if None and skew_salts > 0, they are sampled
+        skew_sample_rate = 0.01,      #fraction of table 1 rows the hot key sampling pass counts
+        skew_top_n = 10,              #number of most frequent sampled keys treated as hot
+        bloom_fp_rate = None,         #float in (0, 1); if given, an inner or semi repartition join first drops the table 1 rows whose key is not in a Bloom filter of table 2's keys
+        many_to_many = False,         #if True, table 2 can have several rows per key; each table 1 row is joined with all of them (repartition only)
+        group_max_bytes = 64*1024*1024): #many_to_many only; the table 2 rows of a key beyond this many bytes are spilled to the reducer's local disk
     """When join_swtich == inner_join,
          Executes an SELECT T1 INNER JOIN T2 ON .. WHERE ..
          
        When join_switch == "left_join"
          Executes an SELECT T1 LEFT JOIN T2 ON .. WHERE ..
+         
+       When join_switch == "semi_join" (or "anti_join")
+         Executes an SELECT T1.* FROM T1 WHERE T1.key (NOT) IN (SELECT T2.key FROM T2 WHERE ..) 
+         Only the table 1 target columns are output, and table 2 may have any number of rows per key. A repartition semi/anti join 
+         shuffles just the distinct keys of table 2 (deduplicated in the mappers and the combiner), never its rows; 
+         table_2_target_columns is ignored
+         
+       When join_strategy == "repartition", both tables are tagged by join_mapper, shuffled, and joined in the reducer. 
+       When join_strategy == "broadcast", table 2 is shipped to every mapper (through the distributed cache if it is text, see _broadcast_jobconfs) 
+         and joined in memory by mappers.BroadcastJoinMapper in a map only job; only table 1 is read by the job, and nothing is shuffled
+       When join_strategy == "auto", broadcast is used if table 2 is at most platform_args.broadcast_join_max_bytes on HDFS 
+       When join_strategy == "merge", both tables must have been written by select_where with the same num_buckets, bucketed on the join key. 
+         Bucket i of table 1 is then joined with bucket i of table 2 by a streaming merge of the two sorted files in a map only job 
+         (mappers.MergeJoinMapper); nothing is shuffled or sorted. 
+         A "repartition" or "auto" join of two such tables is run as a merge join as well. 
+       
+       When skew_salts > 0, a repartition join salts the hot keys (see mappers.join_mapper): their table 1 rows are spread over skew_salts 
+         reducers and their table 2 rows are replicated to each. The hot keys are either given in skew_keys or, if None, taken from the 
+         heavy hitters of the stats catalog (single column keys; see collect_stats) or found by a sampled count of table 1's join keys 
+         (see _sample_hot_keys). All other keys are joined as usual
+         
+       When bloom_fp_rate is given, an inner or semi repartition join is preceded by a pass collecting the distinct (filtered) join keys of table 2 
+         (see _build_bloom_filter). A Bloom filter of them, sized for a false positive rate of bloom_fp_rate, is shipped to the mappers, which 
+         drop the table 1 rows whose key is not in it before the shuffle. The result is unchanged; only the rows that could not join are dropped early
+         
+       When many_to_many is True, a key with several table 2 rows no longer raises: each of its table 1 rows is output once per table 2 row. 
+         The table 2 rows of a key are held by the reducer in memory up to group_max_bytes and spilled to local disk past that 
+         (see reducers._RowGroup), so large groups cannot run the reducer out of memory. Always a repartition join
+         
+       A table stored as Hive style partitions (path/name=value/...) can be filtered on, keyed by and projected to its partition columns 
+         by name; only the partitions passing the filters on them are read (see _partition_pruned). Table 2 can only use them in a repartition join
     """
-    assert(join_switch == "inner_join" or join_switch == "left_join")
+    assert(join_switch in ["inner_join", "left_join"] + list(mappers.KEY_EXISTENCE_JOINS))
+    if join_strategy is None:
+        join_strategy = "auto" if platform_args.stats is not None else "repartition"
+    assert(join_strategy in ["repartition", "broadcast", "merge", "auto"])
+    assert not many_to_many or join_strategy in ["repartition", "auto"], "many to many joins are repartition joins"
     
-    full_input_list = []
-    t1_path_str = ""
-    if isinstance(table_1_path, list):
-        t1_path_str = ",".join(["{0}{1}".format(platform_args.hdfs_prefix,i) for i in table_1_path])
-        full_input_list += table_1_path
-    else:
-        t1_path_str = "{0}{1}".format(platform_args.hdfs_prefix, table_1_path)
-        full_input_list += [table_1_path]
+    if join_switch in mappers.KEY_EXISTENCE_JOINS:
+        table_2_target_columns = table_2_key_columns #table 2 rows are never output; only split them as far as the key
+        many_to_many = False #a table 1 row is output at most once however many table 2 rows have its key
+    
+    table_1_path, table_1_filter_columns, table_1_filter_vals, table_1_invert_flags, table_1_filter_operators = _partition_pruned(
+        platform_args, table_1_path, table_1_filter_columns, table_1_filter_vals, table_1_invert_flags, table_1_filter_operators, table_1_key_columns, table_1_target_columns)
+    table_2_path, table_2_filter_columns, table_2_filter_vals, table_2_invert_flags, table_2_filter_operators = _partition_pruned(
+        platform_args, table_2_path, table_2_filter_columns, table_2_filter_vals, table_2_invert_flags, table_2_filter_operators, table_2_key_columns, table_2_target_columns)
+    
+    if many_to_many:
+        join_strategy = "repartition" #the map side joins need unique table 2 keys
+    elif join_strategy != "broadcast":
+        t1_buckets, t2_buckets = _bucketing(platform_args, table_1_path), _bucketing(platform_args, table_2_path)
+        if (_bucketed_on(t1_buckets, table_1_key_columns, table_1_delimiter) and _bucketed_on(t2_buckets, table_2_key_columns, table_2_delimiter) 
+            and t1_buckets["num_buckets"] == t2_buckets["num_buckets"]):
+            join_strategy = "merge"
+            logger.info("Both tables are bucketed on the join key into {0} buckets; using a merge join".format(t1_buckets["num_buckets"]))
+        elif join_strategy == "merge":
+            raise Exception("A merge join needs both tables bucketed on the join key into the same number of buckets (see select_where num_buckets)")
+    
+    if join_strategy == "auto":
+        t2_bytes = _table_bytes(platform_args, table_2_path)
+        join_strategy = "broadcast" if t2_bytes <= platform_args.broadcast_join_max_bytes and not _partition_columns(table_2_key_columns, table_2_target_columns) else "repartition"
+        logger.info("Table 2 is {0} bytes; using a {1} join".format(t2_bytes, join_strategy))
+    if join_strategy in ["broadcast", "merge"] and _partition_columns(table_2_key_columns, table_2_target_columns):
+        raise Exception("The map side joins read table 2 apart from the input files, so its key and target columns cannot be partition columns")
+    
+    full_input_list = (table_1_path if isinstance(table_1_path, list) else [table_1_path]) + (table_2_path if isinstance(table_2_path, list) else [table_2_path])
+    jobconfs = _join_table_jobconfs(platform_args, 1, table_1_path, table_1_key_columns, table_1_delimiter, table_1_filter_columns, 
+                                    table_1_filter_vals, table_1_invert_flags, table_1_filter_operators, table_1_target_columns)
+    jobconfs += _join_table_jobconfs(platform_args, 2, table_2_path, table_2_key_columns, table_2_delimiter, table_2_filter_columns, 
+                                     table_2_filter_vals, table_2_invert_flags, table_2_filter_operators, table_2_target_columns)
+
+    if join_strategy == "merge":
+        jobconfs += ['join_switch={0}'.format(join_switch),
+                     'table_2_buckets={0}'.format(",".join(_bucket_files(platform_args, table_2_path, t2_buckets["num_buckets"]))),
+                     'join_merge_reader={0}'.format("inprocess" if platform_args.switch == "inprocess" else "hadoopy"),
+                     'mapred.min.split.size={0}'.format(2**63 - 1), #one map task per bucket file
+                     'mapreduce.input.fileinputformat.split.minsize={0}'.format(2**63 - 1)]
+        return _hadoop_helper(platform_args, 
+                              "merge_join",
+                              table_1_path, 
+                              _output_path(platform_args, join_switch), 
+                              jobconfs,
+                              map_only = True)
+    
+    if join_strategy == "broadcast":
+        jobconfs += ['join_switch={0}'.format(join_switch)] + _broadcast_jobconfs(platform_args, table_2_path)
+        return _hadoop_helper(platform_args, 
+                              "broadcast_join",
+                              table_1_path, 
+                              _output_path(platform_args, join_switch), 
+                              jobconfs,
+                              map_only = True)
 
-    t2_path_str = ""
-    if isinstance(table_2_path, list):
-        t2_path_str = ",".join(["{0}{1}".format(platform_args.hdfs_prefix,i) for i in table_2_path])
-        full_input_list += table_2_path
+    if skew_salts:
+        hitters = platform_args.stats.heavy_hitters(table_1_path, table_1_key_columns[0]) if platform_args.stats is not None and len(table_1_key_columns) == 1 else None
+        if skew_keys is None and hitters:
+            skew_keys = [value for value, count in hitters[:skew_top_n]] #recorded by collect_stats; no sampling pass needed
+        elif skew_keys is None:
+            skew_keys = _sample_hot_keys(platform_args, table_1_path, table_1_key_columns, table_1_filter_columns, table_1_filter_vals, 
+                                         table_1_invert_flags, table_1_filter_operators, table_1_delimiter, skew_sample_rate, skew_top_n)
+        else:
+            skew_keys = ["+".join([str(c) for c in k]) for k in skew_keys]
+        logger.info("Salting hot join keys {0} over {1} reducers each".format(skew_keys, skew_salts))
+        if skew_keys:
+            jobconfs += ['join_skew_keys={0}'.format("|".join(skew_keys)),
+                         'join_skew_salts={0}'.format(skew_salts)]
+
+    #join_mapper appends a table tag to the join key; partition on the join key only (the first tab separated field) 
+    #so that both tables' rows of a key meet in the same reducer, sorted by tag 
+    jobconfs += ['mapred.text.key.partitioner.options=-k1,1',
+                 'mapreduce.partition.keypartitioner.options=-k1,1']
+    jobconfs += _many_to_many_jobconfs(many_to_many, group_max_bytes)
+    if join_switch in mappers.KEY_EXISTENCE_JOINS:
+        jobconfs += ['join_switch={0}'.format(join_switch)] #join_mapper sends only the keys of table 2
+    
+    files = []
+    if bloom_fp_rate and join_switch in ["inner_join", "semi_join"]: #left and anti joins keep table 1 rows whose key is not in table 2
+        bloom_dir = tempfile.mkdtemp(prefix = "hiveish_bloom_")
+        files = [_build_bloom_filter(platform_args, bloom_dir, bloom_fp_rate, table_2_path, table_2_key_columns, table_2_filter_columns, 
+                                     table_2_filter_vals, table_2_invert_flags, table_2_filter_operators, table_2_delimiter)]
+        jobconfs += ['join_bloom_filter={0}'.format(os.path.basename(files[0]))]
+    
+    try:
+        out_path = _hadoop_helper(platform_args, 
+                                  join_switch,
+                                  full_input_list, 
+                                  _output_path(platform_args, join_switch), 
+                                  jobconfs,
+                                  partitioner = True,
+                                  files = files)
+    finally:
+        if files:
+            shutil.rmtree(bloom_dir)
+    return out_path
+
+def _broadcast_jobconfs(platform_args, path):
+    """the jobconfs shipping the files of table 2 (path) to mappers.BroadcastJoinMapper. Text files go through the distributed cache. 
+       Typedbytes files (e.g., the output of a previous select_where) cannot be read as lines, so the tasks read them with readtb instead, 
+       like the merge join reads its table 2 buckets. The files of a path are taken to be all text or all typedbytes, so only one of them is checked
+    """
+    cache_files, typedbytes_files = [], []
+    for p in (path if isinstance(path, list) else [path]):
+        files = _ls_files(platform_args, p)
+        if files and _is_typedbytes(platform_args, files[0]):
+            typedbytes_files += ["{0}{1}".format("" if "://" in f or platform_args.switch == "inprocess" else platform_args.hdfs_prefix, f) for f in files]
+        else:
+            cache_files += ["{0}{1}#{2}{3}".format("" if "://" in f else platform_args.hdfs_prefix, f, mappers.BROADCAST_FILE_PREFIX, len(cache_files) + i) 
+                            for i, f in enumerate(files)]
+    jobconfs = []
+    if cache_files:
+        jobconfs += ['mapred.cache.files={0}'.format(",".join(cache_files)),
+                     'mapred.create.symlink=yes']
+    if typedbytes_files:
+        jobconfs += ['table_2_broadcast_files={0}'.format(",".join(typedbytes_files)),
+                     'join_broadcast_reader={0}'.format("inprocess" if platform_args.switch == "inprocess" else "hadoopy")]
+    return jobconfs
+
+def _join_table_jobconfs(platform_args, table, path, key_columns, delimiter, filter_columns, filter_vals, invert_flags, filter_operators, target_columns):
+    """the table_<table>_* jobconfs of mappers.join_mapper; see join for the args"""
+    if isinstance(path, list):
+        path_str = ",".join(["{0}{1}".format(platform_args.hdfs_prefix,i) for i in path])
     else:
-        t2_path_str = "{0}{1}".format(platform_args.hdfs_prefix, table_2_path)
-        full_input_list += [table_2_path]
+        path_str = "{0}{1}".format(platform_args.hdfs_prefix, path)
+    prefix = "table_{0}_".format(table)
+    return (['{0}path={1}'.format(prefix, path_str),
+             '{0}delimiter={1}'.format(prefix, delimiter)] + 
+            _select_where_jobconfs(key_columns, target_columns, filter_columns, filter_vals, invert_flags, filter_operators, prefix = prefix))
 
-    t1_filter_vals = []
-    for i in table_1_filter_vals:
-        t1_filter_vals.append(",".join(i))
-    t1_filter_str = "|".join(t1_filter_vals)
-        
-    t2_filter_vals = []
-    for i in table_2_filter_vals:
-        t2_filter_vals.append(",".join(i))
-    t2_filter_str = "|".join(t2_filter_vals)
+def multi_join(platform_args,          #an instance of PlatformArgs
+               tables,                 #list of N >= 2 dicts, one per table, table 1 first. Each holds the arguments of join for that table, without the table_<i>_ prefix:
+                                       #"path" and "key_columns" (MANDATORY), "delimiter", "filter_columns", "filter_vals", "invert_flags", "filter_operators", "target_columns" (OPTIONAL)
+               join_switch = "inner_join", #either "inner_join" or "left_join"
+               many_to_many = False,       #see join; applies to every table other than table 1
+               group_max_bytes = 64*1024*1024): #" "
+    """Executes SELECT .. FROM T1 INNER (or LEFT) JOIN T2 ON .. INNER (or LEFT) JOIN T3 ON .. .. WHERE .., with all of the tables joined on the same key, 
+       in a single job. 
+       
+       Table 1 is the large (fact) table; every other table must have a unique row per join key (a dimension), unless many_to_many is set, 
+       in which case each table 1 row is joined with every combination of one row of each other table. All N tables are read by the same 
+       mappers and tagged (see mappers.join_tag), so each reducer gets, per join key, the rows of tables 2..N and then the streamed table 1 rows, 
+       and outputs each table 1 row followed by the rows of tables 2..N in order. 
+       Compared to chaining N-1 two table joins, the N-2 intermediate outputs are never written, read back or shuffled. 
+       
+       For a LEFT JOIN, a table with no row for a key contributes empty fields instead, so every table other than table 1 needs explicit target_columns
+    """
+    assert(join_switch == "inner_join" or join_switch == "left_join")
+    assert 2 <= len(tables) <= mappers.MAX_JOIN_TABLES
+    
+    jobconfs = ['join_num_tables={0}'.format(len(tables))]
+    full_input_list = []
+    for table, t in enumerate(tables, 1):
+        t = dict(t)
+        t["path"], t["filter_columns"], t["filter_vals"], t["invert_flags"], t["filter_operators"] = _partition_pruned(
+            platform_args, t["path"], t.get("filter_columns", []), t.get("filter_vals", []), t.get("invert_flags", []), t.get("filter_operators"), 
+            t["key_columns"], t.get("target_columns", "*"))
+        jobconfs += _join_table_jobconfs(platform_args, table, t["path"], t["key_columns"], t.get("delimiter", ","), t.get("filter_columns", []), 
+                                         t.get("filter_vals", []), t.get("invert_flags", []), t.get("filter_operators"), t.get("target_columns", "*"))
+        if join_switch == "left_join" and table > 1:
+            assert t.get("target_columns", "*") != "*", "a LEFT multi_join pads missing rows with one empty field per target column, so table {0} needs target_columns".format(table)
+            jobconfs += ['table_{0}_missing={1}'.format(table, "," * len(t["target_columns"]))]
+        full_input_list += t["path"] if isinstance(t["path"], list) else [t["path"]]
         
-    t1_key_str = ",".join([str(i) for i in table_1_key_columns])
-    t2_key_str = ",".join([str(i) for i in table_2_key_columns])
-    
-    t1_target_col_str = ",".join([str(i) for i in table_1_target_columns])
-    t2_target_col_str = ",".join([str(i) for i in table_2_target_columns])
-    
-    t1_filter_col_str = ",".join([str(i) for i in table_1_filter_columns])
-    t2_filter_col_str = ",".join([str(i) for i in table_2_filter_columns])
-    
-    t1_invert_str = ",".join([str(i) for i in table_1_invert_flags]) 
-    t2_invert_str = ",".join([str(i) for i in table_2_invert_flags]) 
-    
-    jobconfs =['table_1_path={0}'.format(t1_path_str),
-              'table_1_key_columns={0}'.format(t1_key_str),  
-              'table_1_filter_columns={0}'.format(t1_filter_col_str),
-              'table_1_filter_vals={0}'.format(t1_filter_str), 
-              'table_1_invert_filter_vals={0}'.format(t1_invert_str),
-              'table_1_delimiter={0}'.format(table_1_delimiter),
-              'table_2_path={0}'.format(t2_path_str),
-              'table_2_delimiter={0}'.format(table_2_delimiter),
-              'table_2_key_columns={0}'.format(t2_key_str),  
-              'table_2_filter_columns={0}'.format(t2_filter_col_str),
-              'table_2_filter_vals={0}'.format(t2_filter_str), 
-              'table_2_invert_filter_vals={0}'.format(t2_invert_str),
-              'table_1_target_columns={0}'.format(t1_target_col_str),  
-              'table_2_target_columns={0}'.format(t2_target_col_str)
-              ]
+    #see join
+    jobconfs += ['mapred.text.key.partitioner.options=-k1,1',
+                 'mapreduce.partition.keypartitioner.options=-k1,1']
+    jobconfs += _many_to_many_jobconfs(many_to_many, group_max_bytes)
+    
+    return _hadoop_helper(platform_args, 
+                          join_switch,
+                          full_input_list, 
+                          _output_path(platform_args, join_switch), 
+                          jobconfs,
+                          partitioner = True)
 
-    out_path = _hadoop_helper(platform_args, 
-                              join_switch,
-                              full_input_list, 
-                              platform_args.output_root + "/{0}".format(join_switch) + "/%f" % time.time() , 
-                              jobconfs)
-    return out_path
+def _many_to_many_jobconfs(many_to_many, group_max_bytes):
+    """see reducers._StreamingJoinReducer"""
+    return ['join_many_to_many=1', 'join_group_max_bytes={0}'.format(group_max_bytes)] if many_to_many else []
+
+def _bucket_files(platform_args, path, num_buckets):
+    """the part files of a bucketed table, ordered by bucket number"""
+    files = sorted(_ls_files(platform_args, path), key=mappers.bucket_number)
+    if [mappers.bucket_number(f) for f in files] != list(range(num_buckets)):
+        raise Exception("{0} should hold exactly one part file per bucket, 0 to {1}".format(path, num_buckets - 1))
+    return ["{0}{1}".format("" if "://" in f or platform_args.switch == "inprocess" else platform_args.hdfs_prefix, f) for f in files]
+
+def _build_bloom_filter(platform_args, local_dir, fp_rate, in_path, key_columns, filter_columns, filter_vals, invert_flags, filter_operators, delimiter):
+    """Semi-join reduction for join: collects the distinct join keys (key_1+key_2+...) of the rows of in_path (already partition pruned 
+       by join) matching the where clause with a select count(*) .. groupby job, and writes a Bloom filter of them, sized for fp_rate, to local_dir. Returns the file's path
+    """
+    keys_path = _select_count_star_helper(platform_args, in_path, key_columns, 
+                                          target_columns = key_columns, #nothing past the key columns needs to be split
+                                          filter_columns = filter_columns, 
+                                          filter_vals = filter_vals, 
+                                          invert_flags = invert_flags, 
+                                          filter_operators = filter_operators,
+                                          delimiter = delimiter)
+    num_keys = sum(1 for kv in _readtb(platform_args, keys_path))
+    bloom_filter = bloom.BloomFilter.for_capacity(num_keys, fp_rate)
+    for k, v in _readtb(platform_args, keys_path):
+        bloom_filter.add(k)
+    logger.info("Bloom filter of {0} table 2 keys: {1} bits, {2} hashes".format(num_keys, bloom_filter.num_bits, bloom_filter.num_hashes))
+    path = os.path.join(local_dir, mappers.BLOOM_FILTER_FILE)
+    bloom_filter.save(path)
+    return path
     
-def _select_where_helper(platform_args,       #an instance of PlatformArgs  
-                         in_path,             #str or list of str; the input HDFS path(s). Can contain asterisks. 
-                         key_columns,         #list of ints; these are concatenated to form the key of returned rows (not used for select where, but used for select count * where groupby 
-                         target_columns,      #list of ints; determines which columns to select
-                         filter_columns,      #See below
-                         filter_vals,         #list of lists of strings or ints; filter_columns[0] is checked to see if it is in filter_vals[0], same for the other columns
-                         invert_flags,        #list of boolean; determines whether to select "NOT IN" instead of "IN" for each column (invert_flags[0] applied to filter_columns[0], etc)
-                         delimiter,           #str; the delimiter the HDFS files at in_path are split by
-                         switch):             #str; either "select_where" or ""select_count_star_where_and_groupby"
-                      
-    """internal helper function for the below two functions that simply switches between "select_where" and "select_count_star_where_and_groupby"""
+def _sample_hot_keys(platform_args, in_path, key_columns, filter_columns, filter_vals, invert_flags, filter_operators, delimiter, sample_rate, top_n):
+    """Cheap sampling pass for skewed joins: counts the key_columns of a sample_rate fraction of the rows of in_path (already partition 
+       pruned by join) that match the where clause and returns the top_n most frequent keys (key_1+key_2+...) 
+    """
+    counts_path = _select_count_star_helper(platform_args, in_path, key_columns, 
+                                            target_columns = "*",
+                                            filter_columns = filter_columns, 
+                                            filter_vals = filter_vals, 
+                                            invert_flags = invert_flags, 
+                                            filter_operators = filter_operators,
+                                            delimiter = delimiter,
+                                            sample_rate = sample_rate,
+                                            top_n = top_n)
+    return [k for k, v in _readtb(platform_args, counts_path)]
     
+def _select_where_jobconfs(key_columns, target_columns, filter_columns, filter_vals, invert_flags, filter_operators = None, prefix = ""):
+    """the jobconfs mappers.select_where reads (less the delimiter), each name prefixed with prefix; see _select_where_helper for the args"""
     key_col_str = ",".join([str(i) for i in key_columns])
     
     target_col_str = ",".join([str(i) for i in target_columns])
 
+    for c in filter_columns:
+        assert isinstance(c, int), "Cannot filter on {0} here: partition columns are only filtered on when the input paths are planned (see _partition_pruned)".format(c)
     filter_col_str = "|".join([str(i) for i in filter_columns])
     
     ftr_vals = []
     for i in filter_vals:
-        ftr_vals.append(",".join(i))
+        ftr_vals.append(predicates.encode_filter_vals(i) if filter_operators else ",".join(i))
     filter_str = "|".join(ftr_vals)
 
-    invert_str = "|".join([str(i) for i in invert_flags]) 
+    invert_str = "|".join([str(int(i)) for i in invert_flags]) 
+    
+    jobconfs = ['{0}target_columns={1}'.format(prefix, target_col_str),
+                '{0}filter_columns={1}'.format(prefix, filter_col_str),
+                '{0}filter_vals={1}'.format(prefix, filter_str), 
+                '{0}invert_filter_vals={1}'.format(prefix, invert_str),
+                '{0}key_columns={1}'.format(prefix, key_col_str)]
+    if filter_operators:
+        assert len(filter_operators) == len(filter_columns)
+        for op in filter_operators:
+            assert op in predicates.OPERATORS, "Unsupported WHERE operator: {0}".format(op)
+        jobconfs.append('{0}filter_operators={1}'.format(prefix, "|".join(filter_operators)))
+    return jobconfs
+
+
+def _select_where_helper(platform_args,       #an instance of PlatformArgs  
+                         in_path,             #str or list of str; the input HDFS path(s). Can contain asterisks. 
+                         key_columns,         #list of ints; these are concatenated to form the key of returned rows (not used for select where, but used for select count * where groupby 
+                         target_columns,      #list of ints; determines which columns to select
+                         filter_columns,      #See below
+                         filter_vals,         #list of lists of strings or ints; filter_columns[0] is checked to see if it is in filter_vals[0], same for the other columns
+                         invert_flags,        #list of boolean; determines whether to select "NOT IN" instead of "IN" for each column (invert_flags[0] applied to filter_columns[0], etc)
+                         delimiter,           #str; the delimiter the HDFS files at in_path are split by
+                         switch,              #str; either "select_where" or ""select_count_star_where_and_groupby"
+                         extra_jobconfs = [], #list of str; job specific jobconfs appended to the ones built here
+                         filter_operators = None, #list of str; the operator of each filter column, see predicates.py. If None, all are "in" (invert_flags gives "not in")
+                         num_buckets = None,  #int; if given, the output is bucketed (see select_where) 
+                         shuffle_bytes = None): #int; the expected shuffle size, see _hadoop_helper
+                      
+    """internal helper function for the below two functions that simply switches between "select_where" and "select_count_star_where_and_groupby"""
     
-    jobconfs = ['target_columns={0}'.format(target_col_str),
-               'filter_columns={0}'.format(filter_col_str),
-               'filter_vals={0}'.format(filter_str), 
-               'invert_filter_vals={0}'.format(invert_str),
-               'key_columns={0}'.format(key_col_str),
-               'delimiter={0}'.format(delimiter)]
+    assert not num_buckets or key_columns != "*" #the buckets are keyed by the key columns
+    jobconfs = _select_where_jobconfs(key_columns, target_columns, filter_columns, filter_vals, invert_flags, filter_operators) + ['delimiter={0}'.format(delimiter)] + extra_jobconfs
     
     out_path = _hadoop_helper(platform_args, 
                               switch,
                               in_path, #nothing fancy needed here because hadoopy accepts single paths and lists
-                              platform_args.output_root + "/{0}".format(switch) + "/%f" % time.time(), 
-                              jobconfs)
+                              _output_path(platform_args, switch), 
+                              jobconfs,
+                              map_only = platform_args.map_only and switch == "select_where" and not num_buckets, #the count job needs its reducer
+                              num_reducers = num_buckets,
+                              shuffle_bytes = shuffle_bytes)
+    if num_buckets:
+        _write_text(platform_args, out_path + "/" + BUCKETS_FILE, 
+                    json.dumps({"num_buckets": num_buckets, "key_columns": key_columns, "target_columns": target_columns}))
     return out_path
  
     
@@ -239,15 +885,43 @@ def select_where(platform_args,        #see _select_where_helper
                  filter_columns = [],  #" "
                  filter_vals = [],     #" "
                  invert_flags = [],    #" "
-                 delimiter = ","):     #" "
+                 delimiter = ",",      #" "
+                 filter_operators = None, #" "
+                 num_buckets = None,   #int; if given, the output is a bucketed table, see below
+                 approx = None,        #float in (0, 1]; if given, only this fraction of the input is read (or of its rows selected), see below
+                 approx_unit = "files"): #either "files" or "rows", see approx.py
     """Executes a select where like statement. 
        Transforms easy to use list syntax into the jobconf syntax required by mappers.select_where
     
        This job uses identity_reducer as it's reducer and calls select_where.py
+       If platform_args.map_only is set, the reducer is skipped entirely
+       
+       If num_buckets is given, the output is a bucketed table: exactly num_buckets part files (one per reducer), the rows of each 
+       hash partitioned on key_columns and sorted by them, with the bucketing recorded in a BUCKETS_FILE next to them. 
+       Joins between two tables bucketed on their join keys into the same number of buckets need no shuffle (see join, "merge"); 
+       the sort is paid once here instead of in every join. 
+       
+       If approx is given, the query runs over a deterministic sample of the input (see approx.py) and the sampling rate is recorded 
+       in an APPROX_FILE next to the output; approx_row_count then estimates the number of rows the exact query would have selected
+       
+       If in_path is a table stored as Hive style partitions (in_path/name=value/...), the partition columns can be used by name in 
+       filter_columns, key_columns and target_columns (here and in the other select functions); only the partitions passing the filters 
+       on them are read (see _partition_pruned)
 
     """
-    switch = "select_where"
-    return _select_where_helper(**locals())
+    in_path, filter_columns, filter_vals, invert_flags, filter_operators = _partition_pruned(platform_args, in_path, filter_columns, filter_vals, invert_flags, 
+                                                                                             filter_operators, key_columns, target_columns)
+    extra_jobconfs, rate = [], None
+    if approx:
+        in_path, extra_jobconfs, rate = _approx_sample(platform_args, in_path, approx, approx_unit)
+    out_path = _select_where_helper(platform_args, in_path, key_columns, target_columns, filter_columns, filter_vals, invert_flags, delimiter, 
+                                    switch = "select_where",
+                                    extra_jobconfs = extra_jobconfs,
+                                    filter_operators = filter_operators,
+                                    num_buckets = num_buckets)
+    if approx:
+        _write_text(platform_args, out_path + "/" + APPROX_FILE, json.dumps({"sample_rate": rate}))
+    return out_path
 
 def  select_count_star_where_and_groupby(platform_args,        #see _select_where_helper
                                          in_path,              #" "
@@ -256,14 +930,103 @@ def  select_count_star_where_and_groupby(platform_args,        #see _select_wher
                                          filter_columns = [],  #" "
                                          filter_vals = [],     #" "
                                          invert_flags = [],    #" "
-                                         delimiter = ","):     #" "
+                                         delimiter = ",",      #" "
+                                         filter_operators = None, #" "
+                                         group_buffer_size = 100000, #int; max number of distinct groups each mapper holds in memory before flushing its partial counts
+                                         sample_rate = None,   #float in (0, 1]; if given, only this (deterministic, hash based) fraction of the rows is counted
+                                         top_n = None,         #int; if given, only the top_n groups with the highest counts are output (ORDER BY count(*) DESC LIMIT top_n)
+                                         approx = None,        #float in (0, 1]; if given, the counts are estimated from this fraction of the input, see below
+                                         approx_unit = "files", #either "files" or "rows", see approx.py
+                                         confidence = 0.95):   #float in (0, 1); approx only, the confidence of the intervals
     """Executes a select count(*) where .. groupby .. statement
        Transforms easy to use list syntax into the jobconf syntax required by mappers.select_where
     
-       This job uses count_reducer as it's reducer and calls select_count_star_where_and_groupby.py
+       This job uses mappers.SelectWhereCountMapper, which counts in memory and emits partial counts, 
+       with sum_reducer as it's combiner and reducer, and calls select_count_star_where_and_groupby.py
+       
+       If top_n is given, the reducers are reducers.SumTopNReducer (select_count_star_where_and_groupby_top_n.py), which only write the 
+       top_n groups of their partition, and a top_n job with a single reducer merges them. The full counts are never written
+       
+       If approx is given, the counts are computed over a deterministic sample of the input (see approx.py) and scaled up by 
+       reducers.ApproxCountReducer (select_count_star_where_and_groupby_approx.py): the output is then 
+       (k, [estimated count, lower bound, upper bound]), the bounds forming a confidence interval at the given confidence
+    """
+    assert not approx or not (top_n or sample_rate), "approx cannot be combined with top_n or sample_rate"
+    in_path, filter_columns, filter_vals, invert_flags, filter_operators = _partition_pruned(platform_args, in_path, filter_columns, filter_vals, invert_flags, 
+                                                                                             filter_operators, key_columns, target_columns)
+    return _select_count_star_helper(platform_args, in_path, key_columns, target_columns, filter_columns, filter_vals, invert_flags, delimiter, 
+                                     filter_operators, group_buffer_size, sample_rate, top_n, approx, approx_unit, confidence)
+
+def _select_count_star_helper(platform_args, in_path, key_columns, target_columns, filter_columns, filter_vals, invert_flags, delimiter, 
+                              filter_operators, group_buffer_size = 100000, sample_rate = None, top_n = None, approx = None, approx_unit = "files", confidence = 0.95):
+    """select_count_star_where_and_groupby of an input already partition pruned (see _partition_pruned), e.g. a table of a join: 
+       in_path holds the partitions to read and the filters are on data columns only. Pruning again would find no partition 
+       directories below the leaf ones
     """
-    switch = "select_count_star_where_and_groupby"
-    return _select_where_helper(**locals())
+    use_combiner, shuffle_bytes = _group_by_plan(platform_args, in_path, key_columns)
+    switch = "select_count_star_where_and_groupby" if use_combiner else "select_count_star_where_and_groupby_no_combiner"
+    if top_n:
+        switch = "select_count_star_where_and_groupby_top_n"
+    extra_jobconfs = []
+    if approx:
+        switch = "select_count_star_where_and_groupby_approx"
+        in_path, extra_jobconfs, rate = _approx_sample(platform_args, in_path, approx, approx_unit)
+        extra_jobconfs += _approx_count_jobconfs(rate, confidence)
+    out_path = _select_where_helper(platform_args, in_path, key_columns, target_columns, filter_columns, filter_vals, invert_flags, delimiter,
+                                    switch = switch,
+                                    extra_jobconfs = ['group_buffer_size={0}'.format(group_buffer_size)] + 
+                                                     (['sample_rate={0}'.format(sample_rate)] if sample_rate else []) + 
+                                                     (['top_n={0}'.format(top_n)] if top_n else []) + extra_jobconfs,
+                                    filter_operators = filter_operators,
+                                    shuffle_bytes = shuffle_bytes)
+    return top_n_counts(platform_args, out_path, top_n) if top_n else out_path
+
+
+def select_aggregates_where_and_groupby(platform_args,        #see _select_where_helper
+                                        in_path,              #" "
+                                        key_columns,          #required here; the groupby columns
+                                        aggregate_columns,    #list of (name, column) pairs, e.g. [("sum", 3), ("avg", 3), ("count", "*")]; see aggregates.py for the names. A column can be a partition column name
+                                        filter_columns = [],  #" "
+                                        filter_vals = [],     #" "
+                                        invert_flags = [],    #" "
+                                        delimiter = ",",      #" "
+                                        filter_operators = None, #" "
+                                        group_buffer_size = 100000): #int; max number of distinct groups each mapper holds in memory before flushing its partial states
+    """Executes a select agg_1(column_1), agg_2(column_2), .. where .. groupby .. statement
+       Transforms easy to use list syntax into the jobconf syntax required by mappers.SelectAggregatesMapper
+       
+       Every aggregate is a mergeable partial state (see aggregates.py), aggregated in the mapper, the combiner (reducers.AggregatesCombiner) 
+       and the reducer (reducers.AggregatesReducer), so the metrics are computed in one distributed pass. 
+       The output is (k, [result of aggregate 1, result of aggregate 2, ...]) per group; calls select_aggregates_where_and_groupby.py
+    """
+    in_path, filter_columns, filter_vals, invert_flags, filter_operators = _partition_pruned(platform_args, in_path, filter_columns, filter_vals, invert_flags, 
+                                                                                             filter_operators, key_columns, aggregates.columns(aggregate_columns))
+    use_combiner, shuffle_bytes = _group_by_plan(platform_args, in_path, key_columns)
+    return _select_where_helper(platform_args, in_path, key_columns, 
+                                aggregates.columns(aggregate_columns) or key_columns, #the columns the rows are split up to
+                                filter_columns, filter_vals, invert_flags, delimiter,
+                                switch = "select_aggregates_where_and_groupby" if use_combiner else "select_aggregates_where_and_groupby_no_combiner",
+                                extra_jobconfs = ['aggregates={0}'.format(aggregates.encode_aggregates(aggregate_columns)),
+                                                  'group_buffer_size={0}'.format(group_buffer_size)],
+                                filter_operators = filter_operators,
+                                shuffle_bytes = shuffle_bytes)
+
+
+def top_n_counts(platform_args,  #an instance of PlatformArgs
+                 in_path,        #str or list of str; HDFS path(s) of (key, count) pairs, e.g. the output of select_count_star_where_and_groupby
+                 top_n):         #int
+    """Executes a SELECT key, count FROM in_path ORDER BY count DESC LIMIT top_n, on the cluster (top_n.py)
+       
+       Every mapper keeps the top_n pairs of its split in a bounded heap (mappers.TopNMapper) and a single reducer merges them 
+       (reducers.top_n_reducer), so nothing is sorted and the client never reads more than top_n pairs. 
+       The output is top_n (key, count) pairs, largest count first; read it with hdfs_tools.tb_topn_dict
+    """
+    return _hadoop_helper(platform_args, 
+                          "top_n",
+                          in_path,
+                          _output_path(platform_args, "top_n"), 
+                          ['top_n={0}'.format(top_n)],
+                          num_reducers = 1)
 
 
 def select_where_interlace_multiple_tables(platform_args,            #see _select_where_helper
@@ -275,17 +1038,99 @@ def select_where_interlace_multiple_tables(platform_args,            #see _selec
                                                                      
     """Executes a select where from N tables and then dumps the results from all N calls into a single output file. 
        All keys are suppressed so the output table looks just like the input table (modulo target columns and filtering criteria) 
+       The N select wheres run concurrently (at most platform_args.max_concurrent_jobs at a time) 
     """ 
+    jobs = scheduler.JobScheduler(platform_args.max_concurrent_jobs) #not platform_args.scheduler, so this can itself be submit()ted without deadlocking on its slots
     out_paths = [] 
-    for k, v in mult_select_where_dict.iteritems():
-        out_paths.append(v["hdfs_hotstart_path"] if "hdfs_hotstart_path" in v else select_where(platform_args, **v)) #do all of the select wheres
-    return interlace_tables(platform_args, out_paths) #concatenate the results   
-        
-    
-
-
-
+    for k, v in mult_select_where_dict.items():
+        out_paths.append(v["hdfs_hotstart_path"] if "hdfs_hotstart_path" in v else jobs.submit(select_where, platform_args, **v)) #do all of the select wheres
+    return jobs.submit(interlace_tables, platform_args, out_paths).result() #concatenate the results once they are all done
 
 
+def select_where_batch(platform_args,        #see _select_where_helper
+                       in_path,              #" "; shared by all of the queries
+                       queries,              #list of dicts; one per query, each with a "switch" key that is either "select_where" or "select_count_star_where_and_groupby",
+                                             #plus the keyword arguments of that function except platform_args, in_path and delimiter 
+                                             #(key_columns, target_columns, filter_columns, filter_vals, invert_flags, filter_operators)
+                       delimiter = ",",      #" "
+                       group_buffer_size = 100000): #int; see select_count_star_where_and_groupby. Bounds the groups of all count queries together 
+    """Executes N select where / select count(*) where .. groupby .. statements over the same input with a single scan of it. 
+       Returns a list of N output paths, one per query, in the order of queries; each holds exactly what the corresponding 
+       select_where or select_count_star_where_and_groupby call would have written.
+    
+       The scan is one job calling select_where_batch.py (mappers.MultiQueryMapper, reducers.MultiQueryReducer), in which every query has 
+       reducers of its own: the mapper prefixes each key with a route of its query, a string the partitioner sends to one of the query's 
+       reducers (see _query_routes), and the reducer strips it. The part files of query i are then moved (renamed, not read) into 
+       <output>/query_<i>. Hadoop streaming has no MultipleOutputs, so this is how the one job writes N outputs. 
+       As the rows have to be routed, the scan always has reducers, even if platform_args.map_only is set. 
+       
+       Each query is planned like the corresponding call would be. Its filters on partition columns prune the partitions it reads 
+       (see _partition_pruned): the job reads the union of the partitions of the queries, and a map task only runs the queries that read 
+       its file. With a stats catalog, each query gets reducers for its expected shuffle (see _group_by_plan, _planned_reducers), and the 
+       combiner is skipped unless a count query needs it; without one, each query gets platform_args.num_reducers reducers (or 1). 
+    """
+    assert len(queries) > 0
+    jobconfs = ['num_queries={0}'.format(len(queries)), 
+                'delimiter={0}'.format(delimiter), 
+                'group_buffer_size={0}'.format(group_buffer_size),
+                'mapred.text.key.partitioner.options=-k1,1',
+                'mapreduce.partition.keypartitioner.options=-k1,1']
+    query_paths, query_reducers, use_combiner = [], [], False
+    for i, q in enumerate(queries):
+        assert q["switch"] in ["select_where", "select_count_star_where_and_groupby"]
+        key_columns, target_columns = q.get("key_columns", "*"), q.get("target_columns", "*")
+        path, filter_columns, filter_vals, invert_flags, filter_operators = _partition_pruned(platform_args, in_path, q.get("filter_columns", []), 
+                                                                                              q.get("filter_vals", []), q.get("invert_flags", []), 
+                                                                                              q.get("filter_operators"), key_columns, target_columns)
+        shuffle_bytes = None
+        if q["switch"] == "select_count_star_where_and_groupby":
+            combine, shuffle_bytes = _group_by_plan(platform_args, path, key_columns)
+            use_combiner = use_combiner or combine
+        query_paths.append(path)
+        query_reducers.append(_planned_reducers(platform_args, path, shuffle_bytes) if platform_args.stats is not None else platform_args.num_reducers or 1)
+        prefix = "query_{0}_".format(i)
+        jobconfs += ['{0}switch={1}'.format(prefix, q["switch"])]
+        jobconfs += _select_where_jobconfs(key_columns, target_columns, filter_columns, filter_vals, invert_flags, filter_operators, prefix)
+        if path != in_path: #partition pruned
+            jobconfs += ['{0}path={1}'.format(prefix, ",".join(["{0}{1}".format(platform_args.hdfs_prefix, p) for p in path]))]
+    
+    routes = _query_routes(sum(query_reducers))
+    first_reducers = [sum(query_reducers[:i]) for i in range(len(queries))]
+    for i, first in enumerate(first_reducers):
+        jobconfs += ['query_{0}_routes={1}'.format(i, ",".join(routes[first:first + query_reducers[i]]))]
     
-    
\ No newline at end of file
+    if any(path == in_path for path in query_paths):
+        scan_path = in_path
+    else: #every query is partition pruned; read the partitions any of them reads
+        scan_path = []
+        for path in query_paths:
+            scan_path += [p for p in path if p not in scan_path]
+    out_path = _hadoop_helper(platform_args, 
+                              "select_where_batch" if use_combiner else "select_where_batch_no_combiner",
+                              scan_path, 
+                              _output_path(platform_args, "select_where_batch"), 
+                              jobconfs,
+                              partitioner = True,
+                              num_reducers = len(routes))
+    
+    with _result_cache_lock(out_path): #an output reused from the result cache (see _hadoop_helper) may be split already, or being split
+        parts = dict((mappers.bucket_number(f), f) for f in _ls_files(platform_args, out_path) if os.path.basename(f).startswith("part-"))
+        for i, first in enumerate(first_reducers):
+            moved = [parts[r] for r in range(first, first + query_reducers[i]) if r in parts]
+            if moved:
+                _mv_into(platform_args, moved, "{0}/query_{1}".format(out_path, i))
+    return ["{0}/query_{1}".format(out_path, i) for i in range(len(queries))]
+
+def _query_routes(num_reducers):
+    """the routes of select_where_batch: route r is a key field that KeyFieldBasedPartitioner sends to reducer r (see mappers.key_field_partition), 
+       the first of "0", "1", "2", ... that it does
+    """
+    routes = [None] * num_reducers
+    missing, n = num_reducers, 0
+    while missing:
+        r = mappers.key_field_partition(str(n), num_reducers)
+        if routes[r] is None:
+            routes[r] = str(n)
+            missing -= 1
+        n += 1
+    return routes
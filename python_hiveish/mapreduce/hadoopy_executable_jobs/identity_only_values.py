@@ -26,12 +26,13 @@ THE SOFTWARE.
 
 import hadoopy
 
+from python_hiveish.mapreduce.mappers import identity_mapper as mapper
+from python_hiveish.mapreduce.reducers import identity_only_values_reducer as reducer
+
 if __name__ == "__main__":
     """
          Identity mapper and reducer, but the reducer kills the keys. 
          Used to simply take multiple intput paths and write them into the same file. 
          Can be chained with other jobs, for example select wheres, to concatenate the results of multiple SELECT WHERE clauses
     """
-    from python_hiveish.mapreduce.mappers import identity_mapper as mapper
-    from python_hiveish.mapreduce.reducers import  identity_only_values_reducer as reducer
     hadoopy.run(mapper, reducer, doc=__doc__)
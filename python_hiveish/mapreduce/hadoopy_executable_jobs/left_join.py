@@ -26,6 +26,9 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
 """
 
+from python_hiveish.mapreduce.mappers import join_mapper as mapper
+from python_hiveish.mapreduce.reducers import JoinLeftReducer as reducer
+
 if __name__ == "__main__":
     """
            When run on tables I_1, I_2 that share keys "1,2,3", 
@@ -40,6 +43,4 @@ if __name__ == "__main__":
             
             Implemented from: https://chamibuddhika.wordpress.com/2012/02/26/joins-with-map-reduce/ 
     """
-    from python_hiveish.mapreduce.mappers import join_mapper as mapper
-    from python_hiveish.mapreduce.reducers import join_left_reducer as reducer
     hadoopy.run(mapper, reducer, doc=__doc__)
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Tommy Carpenter
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import hadoopy
+from python_hiveish.mapreduce.mappers import MergeJoinMapper as mapper
+
+if __name__ == "__main__":
+    """
+           Map only (sort-merge) INNER or LEFT JOIN of two tables bucketed on the join key, depending on the join_switch jobconf. 
+           The input of the job is table 1, one map task per bucket file; each task streams the matching bucket file of table 2 
+           and merges the two sorted files. No shuffle happens. See mappers.MergeJoinMapper
+            
+           Must be launched with zero reducers (see execute._hadoop_helper map_only)
+    """
+    hadoopy.run(mapper, doc=__doc__)
@@ -26,6 +26,10 @@ THE SOFTWARE.
 
 import hadoopy
 
+from python_hiveish.mapreduce.mappers import SelectWhereCountMapper as mapper
+from python_hiveish.mapreduce.reducers import sum_reducer as reducer
+combiner = reducer
+
 if __name__ == "__main__":
     """ 
             SELECT (k, v)
@@ -34,10 +38,10 @@ if __name__ == "__main__":
             FROM (input dataset)
             GROUP BY target_column_1, ..., target_column_N;
             WHERE filter_column_1 (not) in [filter_vals_1] and filter_column_2 (not) in [filter_vals_2] and ...
+            
+            Counts are partially aggregated in the mapper and again in the combiner, so only (key, int) pairs are shuffled
     """
-    from python_hiveish.mapreduce.mappers import select_where as mapper
-    from python_hiveish.mapreduce.reducers import count_reducer as reducer
-    hadoopy.run(mapper, reducer, doc=__doc__)
+    hadoopy.run(mapper, reducer, combiner=combiner, doc=__doc__)
 
 
 
@@ -0,0 +1,39 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Tommy Carpenter
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import hadoopy
+
+from python_hiveish.mapreduce.mappers import SelectWhereCountMapper as mapper
+from python_hiveish.mapreduce.reducers import SumTopNReducer as reducer
+from python_hiveish.mapreduce.reducers import sum_reducer as combiner
+
+if __name__ == "__main__":
+    """ 
+            select_count_star_where_and_groupby.py, except that each reducer only outputs the top_n groups of its partition:
+            
+            SELECT (k, v) ... GROUP BY target_column_1, ..., target_column_N ORDER BY v DESC LIMIT top_n (per reducer)
+            
+            The overall top_n is then the top_n of this (small) output, see top_n.py
+    """
+    hadoopy.run(mapper, reducer, combiner=combiner, doc=__doc__)
@@ -26,6 +26,9 @@ THE SOFTWARE.
 
 import hadoopy
 
+from python_hiveish.mapreduce.mappers import select_where as mapper
+from python_hiveish.mapreduce.reducers import identity_reducer as reducer
+
 if __name__ == "__main__":
     """
             SELECT (k, v)
@@ -34,6 +37,4 @@ if __name__ == "__main__":
             FROM (input dataset)
             WHERE filter_column_1 (not) in [filter_vals_1] and filter_column_2 (not) in [filter_vals_2] and ...
     """
-    from python_hiveish.mapreduce.mappers import select_where as mapper
-    from python_hiveish.mapreduce.reducers import identity_reducer as reducer
     hadoopy.run(mapper, reducer, doc=__doc__)
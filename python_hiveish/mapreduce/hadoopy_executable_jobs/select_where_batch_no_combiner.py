@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Tommy Carpenter
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import hadoopy
+from python_hiveish.mapreduce.mappers import MultiQueryMapper as mapper
+from python_hiveish.mapreduce.reducers import MultiQueryReducer as reducer
+
+if __name__ == "__main__":
+    """
+            select_where_batch.py without the combiner, for batches whose count queries all have about as many groups as rows, 
+            or that have no count queries at all, where combining saves nothing (see execute._group_by_plan)
+            
+            Shared scan of N select where / select count(*) where .. groupby .. queries over the same input:
+            for each query i,
+                SELECT (k, v)
+                FROM (input dataset)
+                WHERE (query i's where clause)
+            where v is query i's target columns, or for a count query, count(*) grouped by k
+            
+            Each query has reducers of its own, so each part file holds the results of one query; see execute.select_where_batch
+            Must be launched with KeyFieldBasedPartitioner on the first key field (see execute._hadoop_helper partitioner)
+    """
+    hadoopy.run(mapper, reducer, doc=__doc__)
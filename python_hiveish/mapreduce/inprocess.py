@@ -0,0 +1,412 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Tommy Carpenter
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import glob
+import heapq
+import importlib
+import inspect
+import itertools
+import multiprocessing
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import zlib
+
+import hadoopy
+from python_hiveish.mapreduce import mappers
+
+"""
+A multi core, in process MapReduce engine for the jobs in hadoopy_executable_jobs; used by execute when PlatformArgs.switch == "inprocess".
+
+There is no JVM, no cluster and no Hadoop streaming: the mapper/reducer/combiner of the job script are imported and called directly.
+It mimics what Hadoop does closely enough for the jobs in this library:
+    - input paths (local, can contain asterisks) are expanded to files and text files are cut into splits on line boundaries
+    - map tasks run in a process pool, one fresh process per task, with the jobconfs set as environment variables like streaming does
+    - map output is hash partitioned (or partitioned on key fields, like KeyFieldBasedPartitioner), sorted, combined,
+      and spilled to local disk whenever the buffer exceeds the sort buffer (io.sort.mb)
+    - reduce tasks merge the sorted spills of their partition (an external merge sort) and run the reducer
+    - the output directory holds part-NNNNN files, as typedbytes or as key<TAB>value text lines
+
+Inputs and outputs are LOCAL paths, so use hdfs_prefix = "" with this switch.
+"""
+
+TYPEDBYTES_MARKER = "_TYPEDBYTES" #written into output directories whose part files are typedbytes, so chained jobs can read them back
+JOB_PACKAGE = "python_hiveish.mapreduce.hadoopy_executable_jobs"
+DEFAULT_SPLIT_BYTES = 64 * 1024 * 1024
+DEFAULT_SORT_BUFFER_MB = 100
+_TEXT_TYPE = type(u"")
+_INT_TYPES = tuple(set([type(0), type(2**64)]))
+
+
+def _jobconf_dict(jobconfs):
+    out = {}
+    for jc in jobconfs:
+        k, v = jc.split("=", 1)
+        out[k.strip()] = v
+    return out
+
+
+def _task_environ(jobconf_dict):
+    """streaming exports every jobconf to the task environment with the non alphanumeric characters replaced by underscores"""
+    return dict(("".join(c if c.isalnum() else "_" for c in k), v) for k, v in jobconf_dict.items())
+
+
+def ls_files(path):
+    """expands local path(s), which can contain asterisks, to the data files they represent (Hadoop's rules: directories are expanded
+       one level, and names starting with _ or . are skipped)
+    """
+    files = []
+    for p in (path if isinstance(path, list) else [path]):
+        matches = sorted(glob.glob(p))
+        if not matches:
+            raise Exception("Input path does not exist: {0}".format(p))
+        for m in matches:
+            if os.path.isdir(m):
+                files += [os.path.join(m, f) for f in sorted(os.listdir(m)) if not f.startswith(("_", ".")) and os.path.isfile(os.path.join(m, f))]
+            else:
+                files.append(m)
+    return [os.path.abspath(f) for f in files]
+
+
+def du(path):
+    """local equivalent of hdfs_tools.hdfs_du"""
+    return sum(os.path.getsize(f) for f in ls_files(path))
+
+
+def stat_files(path):
+    """local equivalent of hdfs_tools.hdfs_stat_files"""
+    return [(f, os.path.getsize(f), int(os.path.getmtime(f))) for f in ls_files(path)]
+
+
+def ls_dirs(path):
+    """local equivalent of hdfs_tools.hdfs_ls_dirs"""
+    return [d for p in (path if isinstance(path, list) else [path]) for d in sorted(glob.glob(p)) if os.path.isdir(d)]
+
+
+def stat_dirs(path):
+    """local equivalent of hdfs_tools.hdfs_stat_dirs"""
+    out = []
+    for d in sorted(glob.glob(path)):
+        size = sum(os.path.getsize(os.path.join(root, f)) for root, _, fnames in os.walk(d) for f in fnames)
+        out.append((d, size, int(os.path.getmtime(d))))
+    return out
+
+
+def is_typedbytes(fname):
+    """local equivalent of hdfs_tools.hdfs_is_typedbytes: the part files of an output directory holding TYPEDBYTES_MARKER are typedbytes"""
+    return os.path.exists(os.path.join(os.path.dirname(fname), TYPEDBYTES_MARKER))
+
+
+def mv_into(paths, directory):
+    """local equivalent of hdfs_tools.hdfs_mv_into; the markers of the output directory the paths are in (TYPEDBYTES_MARKER, _SUCCESS) are copied along"""
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    for p in paths:
+        for marker in [TYPEDBYTES_MARKER, "_SUCCESS"]:
+            if os.path.exists(os.path.join(os.path.dirname(p), marker)) and not os.path.exists(os.path.join(directory, marker)):
+                open(os.path.join(directory, marker), "w").close()
+        os.rename(p, os.path.join(directory, os.path.basename(p)))
+
+
+def _text(line):
+    return line if isinstance(line, str) else line.decode("utf-8")
+
+
+def readtb(path):
+    """local equivalent of hadoopy.readtb for outputs written by this engine; text part files yield (key, value) split on the first tab"""
+    for fname in ls_files(path):
+        if is_typedbytes(fname):
+            for kv in hadoopy.TypedBytesFile(fname, "r"):
+                yield kv
+        else:
+            with open(fname, "rb") as f:
+                for line in f:
+                    k, _, v = _text(line).rstrip("\r\n").partition("\t")
+                    yield k, v
+
+
+def _splits(files, jobconf_dict):
+    """cuts the input files into (file, start, end) splits; typedbytes files are never split"""
+    split_bytes = int(jobconf_dict.get("mapred.max.split.size", DEFAULT_SPLIT_BYTES))
+    split_bytes = max(split_bytes, int(jobconf_dict.get("mapred.min.split.size", 1)))
+    splits = []
+    for fname in files:
+        size = os.path.getsize(fname)
+        if is_typedbytes(fname) or size <= split_bytes:
+            splits.append((fname, 0, size))
+        else:
+            splits += [(fname, start, min(start + split_bytes, size)) for start in range(0, size, split_bytes)]
+    return splits
+
+
+def _read_split(fname, start, end):
+    """yields the (key, value) records of a split; for text, (byte offset, line) for every line that STARTS in [start, end), like LineRecordReader"""
+    if is_typedbytes(fname):
+        for kv in hadoopy.TypedBytesFile(fname, "r"):
+            yield kv
+        return
+    with open(fname, "rb") as f:
+        pos = start
+        if start > 0:
+            f.seek(start - 1)
+            f.readline() #the partial line belongs to the previous split
+            pos = f.tell()
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            yield pos, _text(line).rstrip("\r\n")
+            pos += len(line)
+
+
+def _sort_key(key):
+    """orders keys like Hadoop orders typedbytes keys (raw bytes; for strings that is length first, then bytes),
+       so jobs that rely on the shuffle order (e.g., the tagged join keys of mappers.join_mapper) behave the same here
+    """
+    if isinstance(key, _TEXT_TYPE):
+        key = key.encode("utf-8")
+    if isinstance(key, bytes):
+        return (1, len(key), key)
+    if isinstance(key, (tuple, list)):
+        return (2, len(key), tuple(_sort_key(k) for k in key))
+    if isinstance(key, _INT_TYPES + (float,)):
+        return (0, key, b"")
+    return (3, 0, pickle.dumps(key))
+
+
+def _partitioner(jobconf_dict, use_key_fields, num_reducers):
+    """returns key -> partition; hash of the whole key, or with use_key_fields, of the -kS,E fields with the same hash as KeyFieldBasedPartitioner 
+       (see mappers.key_field_partition), so keys picked to reach a given reducer (see execute._query_routes) do here too
+    """
+    fields = None
+    if use_key_fields:
+        options = jobconf_dict.get("mapred.text.key.partitioner.options", jobconf_dict.get("mapreduce.partition.keypartitioner.options", "-k1"))
+        start, _, end = options.strip()[2:].partition(",")
+        fields = (int(start.split(".")[0]) - 1, int(end.split(".")[0]) if end else None)
+    separator = jobconf_dict.get("map.output.key.field.separator", "\t")
+
+    def partition(key):
+        if fields is not None and isinstance(key, (bytes, _TEXT_TYPE)):
+            return mappers.key_field_partition(separator.join(_text(key).split(separator)[fields[0]:fields[1]]), num_reducers)
+        return (zlib.crc32(_sort_key(key)[2] if isinstance(key, (bytes, _TEXT_TYPE)) else pickle.dumps(key)) & 0xffffffff) % num_reducers
+    return partition
+
+
+def _instance(task):
+    """hadoopy accepts functions or classes for mappers/reducers; classes are instantiated once per task"""
+    return task() if inspect.isclass(task) else task
+
+
+def _call(task, method, *args):
+    """calls task.method(*args) (or task(*args) for functions) and yields its output, which may be None"""
+    out = getattr(task, method)(*args) if hasattr(task, method) else task(*args)
+    if out is not None:
+        for kv in out:
+            yield kv
+
+
+def _close(task):
+    if hasattr(task, "close"):
+        out = task.close()
+        if out is not None:
+            for kv in out:
+                yield kv
+
+
+def _run_task(task, method, records):
+    """runs a mapper (method="map"; records are (key, value)) or a reducer/combiner (method="reduce"; records are (key, values)) to completion"""
+    task = _instance(task)
+    for record in records:
+        for kv in _call(task, method, *record):
+            yield kv
+    for kv in _close(task):
+        yield kv
+
+
+def _grouped(sorted_records):
+    """(key, values iterator) pairs of a stream of (sort key, ..., key, value) records sorted by sort key"""
+    for _, group in itertools.groupby(sorted_records, key=lambda r: r[0]):
+        first = next(group)
+        yield first[-2], itertools.chain([first[-1]], (r[-1] for r in group))
+
+
+def _write_output(fname, records, as_text):
+    if as_text:
+        with open(fname, "wb") as f:
+            for k, v in records:
+                line = "{0}\t{1}\n".format(k, v)
+                f.write(line if isinstance(line, bytes) else line.encode("utf-8"))
+    else:
+        tbf = hadoopy.TypedBytesFile(fname, "w")
+        tbf.writes(records)
+        tbf.close()
+
+
+def _dump_records(fname, records):
+    with open(fname, "wb") as f:
+        for kv in records:
+            pickle.dump(kv, f, pickle.HIGHEST_PROTOCOL)
+
+
+def _load_records(fname):
+    with open(fname, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def _setup_task(job, task_dir, extra_env):
+    """what the TaskTracker does before running a streaming task: a fresh working directory with the shipped files
+       and the distributed cache symlinked into it, and the jobconfs in the environment
+    """
+    os.makedirs(task_dir)
+    for f in job["files"]:
+        os.symlink(os.path.abspath(f), os.path.join(task_dir, os.path.basename(f)))
+    for cache_file in filter(None, job["jobconfs"].get("mapred.cache.files", "").split(",")):
+        src, _, link = cache_file.partition("#")
+        os.symlink(os.path.abspath(src), os.path.join(task_dir, link or os.path.basename(src)))
+    os.chdir(task_dir)
+    os.environ.update(_task_environ(job["jobconfs"]))
+    os.environ.update(extra_env)
+    return importlib.import_module("{0}.{1}".format(JOB_PACKAGE, job["script"]))
+
+
+def _map_task(args):
+    job, task_id, (fname, start, end) = args
+    script = _setup_task(job, os.path.join(job["work_dir"], "map_{0:05d}".format(task_id)),
+                         {"mapreduce_map_input_file": fname, "map_input_file": fname,
+                          "mapreduce_map_input_start": str(start), "mapreduce_map_input_length": str(end - start),
+                          "mapreduce_task_partition": str(task_id), "mapred_task_is_map": "true"})
+    output = _run_task(script.mapper, "map", _read_split(fname, start, end))
+
+    if job["num_reducers"] == 0:
+        _write_output(os.path.join(job["out_name"], "part-{0:05d}".format(task_id)), output, job["as_text"])
+        return []
+
+    combiner = getattr(script, "combiner", None)
+    partition = _partitioner(job["jobconfs"], job["partitioner"], job["num_reducers"])
+    budget = job["sort_buffer_bytes"]
+    spills = []
+
+    def spill(buf):
+        buf.sort(key=lambda r: r[:3])
+        run = []
+        for p, group in itertools.groupby(buf, key=lambda r: r[0]):
+            fname = os.path.join(job["work_dir"], "spill_{0:05d}_{1:05d}_{2:05d}".format(task_id, len(spills), p))
+            records = ((r[3], r[4]) for r in group)
+            if combiner is not None:
+                records = _run_task(combiner, "reduce", _grouped((_sort_key(k), k, v) for k, v in records))
+            _dump_records(fname, records)
+            run.append((p, fname))
+        spills.append(run)
+
+    buf = []
+    used = 0
+    for k, v in output:
+        buf.append((partition(k), _sort_key(k), len(buf), k, v))
+        used += sys.getsizeof(k) + sys.getsizeof(v) + 128
+        if used >= budget:
+            spill(buf)
+            buf = []
+            used = 0
+    if buf:
+        spill(buf)
+    return [pf for run in spills for pf in run]
+
+
+def _run(run_index, fname):
+    """the records of a sorted spill file as (sort key, run index, record index, key, value); a function of its own so that 
+       each run is bound to its own run_index (a generator expression in a loop would see the last one)
+    """
+    return ((_sort_key(k), run_index, record_index, k, v) for record_index, (k, v) in enumerate(_load_records(fname)))
+
+
+def _merge_runs(spill_files):
+    """merges sorted spill files into one stream sorted by key; records of equal keys come run by run, in their order within each run, 
+       so heapq.merge never compares the keys or values themselves (which can be unorderable, e.g., dicts)
+    """
+    return heapq.merge(*[_run(run_index, f) for run_index, f in enumerate(spill_files)])
+
+
+def _reduce_task(args):
+    job, partition, spill_files = args
+    script = _setup_task(job, os.path.join(job["work_dir"], "reduce_{0:05d}".format(partition)),
+                         {"mapreduce_task_partition": str(partition), "mapred_task_is_map": "false"})
+    output = _run_task(script.reducer, "reduce", _grouped(_merge_runs(spill_files)))
+    _write_output(os.path.join(job["out_name"], "part-{0:05d}".format(partition)), output, job["as_text"])
+
+
+def launch_inprocess(in_name,             #str or list of str; local input path(s); can contain asterisks
+                     out_name,            #str; local output directory, must not exist
+                     script_path,         #path of a job in hadoopy_executable_jobs; only the file name is used, the job is imported from the package
+                     jobconfs = (),       #list of "key=value" strings
+                     files = (),          #local files symlinked into every task's working directory
+                     partitioner = False, #if True, partition on key fields like KeyFieldBasedPartitioner (see _partitioner)
+                     num_mappers = None,  #number of worker processes; default is the number of cores
+                     num_reducers = None, #number of reduce tasks; default is the number of worker processes. 0 means map only
+                     use_seqoutput = True,#if False, the output is key<TAB>value text lines instead of typedbytes
+                     temp_path = None,    #local scratch directory for spills and task working directories
+                     **kw):               #the remaining hadoopy.launch args (python_cmd, cmdenvs, ...) are accepted and ignored
+    """Same calling convention as hadoopy.launch, so execute._hadoop_helper can use it as just another launcher. See the module docstring"""
+    jobconf_dict = _jobconf_dict(jobconfs)
+    processes = num_mappers or multiprocessing.cpu_count()
+    if os.path.exists(out_name):
+        raise Exception("Output path already exists: {0}".format(out_name))
+    os.makedirs(out_name)
+    work_dir = tempfile.mkdtemp(prefix="hiveish_", dir=temp_path if temp_path and os.path.isdir(temp_path) else None)
+    job = {"script": os.path.splitext(os.path.basename(script_path))[0],
+           "jobconfs": jobconf_dict,
+           "files": list(files),
+           "partitioner": partitioner,
+           "num_reducers": processes if num_reducers is None else num_reducers,
+           "as_text": not use_seqoutput,
+           "out_name": os.path.abspath(out_name),
+           "work_dir": work_dir,
+           "sort_buffer_bytes": int(jobconf_dict.get("io.sort.mb", jobconf_dict.get("mapreduce.task.io.sort.mb", DEFAULT_SORT_BUFFER_MB))) * 1024 * 1024}
+
+    pool = multiprocessing.Pool(processes, maxtasksperchild=1) #a fresh process per task, like Hadoop, so per task state (e.g., mutable default caches) never leaks
+    try:
+        spills = pool.map(_map_task, [(job, i, s) for i, s in enumerate(_splits(ls_files(in_name), jobconf_dict))], chunksize=1)
+        if job["num_reducers"]:
+            by_partition = dict((p, []) for p in range(job["num_reducers"]))
+            for task_spills in spills:
+                for p, fname in task_spills:
+                    by_partition[p].append(fname)
+            pool.map(_reduce_task, [(job, p, fnames) for p, fnames in sorted(by_partition.items())], chunksize=1)
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        shutil.rmtree(work_dir)
+
+    if use_seqoutput:
+        open(os.path.join(out_name, TYPEDBYTES_MARKER), "w").close()
+    open(os.path.join(out_name, "_SUCCESS"), "w").close()
+    return {"output": out_name}
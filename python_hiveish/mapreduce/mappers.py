@@ -22,7 +22,11 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
 """
 
+import fnmatch
 import os
+import zlib
+
+from python_hiveish.mapreduce import aggregates, bloom, predicates, tokenizer, topn
 
 """
 Warning; here be dragons. Documentation needed. 
@@ -31,40 +35,155 @@ No try excepts here unless the MR job can complete without them!
 Fail fast and have the exception stack show up in the Hadoop interface logs
 """
 
-def _filtering_parsing_helper(filter_cols_key, filter_vals_key, filter_invert_key):
-    filter_vals = os.environ[filter_vals_key].split("|")
-    inverts = [int(y) for y in os.environ[filter_invert_key].split("|")]
-    filter_dict = {}
-    for xindex, x in enumerate([int(y) for y in os.environ[filter_cols_key].split("|")]):
-        filter_dict[x] = {} 
-        filter_dict[x]["filter_vals"] = filter_vals[xindex].split(",")
-        filter_dict[x]["invert"] = inverts[xindex]
-    return filter_dict
+def _filtering_parsing_helper(filter_cols_key, filter_vals_key, filter_invert_key, filter_operators_key):
+    """compiles the where clause jobconfs into a single predicate on the split row; see predicates.compile_where"""
+    columns = [int(y) for y in os.environ[filter_cols_key].split("|")]
+    inverts = [bool(int(y)) for y in os.environ[filter_invert_key].split("|")]
+    if os.environ.get(filter_operators_key):
+        operators = os.environ[filter_operators_key].split("|")
+        filter_vals = [predicates.decode_filter_vals(x) for x in os.environ[filter_vals_key].split("|")]
+    else: #IN lists written as is
+        operators = ["in"] * len(columns)
+        filter_vals = [x.split(",") for x in os.environ[filter_vals_key].split("|")]
+    return predicates.compile_where(columns, operators, filter_vals, inverts)
             
-def _filtering_passed_helper(filter_dict, vals):
-    yield_row = True
-    for filter_col in filter_dict.keys():
-        if (filter_dict[filter_col]["invert"] and vals[filter_col] in filter_dict[filter_col]["filter_vals"]) or (not filter_dict[filter_col]["invert"] and vals[filter_col] not in filter_dict[filter_col]["filter_vals"]):
-            yield_row = False
-            break     
-    return yield_row
-    
 def _kv_helper(cache, value):
     """shared code between select_where and select_join
     
-       splits vals, see if filtering passes, forms the key from key_columns and forms the values from target_columns
+       splits vals (only as far as the query looks, see tokenizer.py), see if filtering passes, forms the key from key_columns and forms the values from target_columns
     """
-    vals = [v.replace('"','') for v in value.split(cache["delimiter"])]
-    if "filtering" not in cache or _filtering_passed_helper(cache["filtering"], vals):  #yield if filtering criteria met or no filtering criteria    
-        k = "+".join(vals) if cache["key_columns"] == "*" else "+".join(vals[l] for l in cache["key_columns"])            
-        v = ",".join(vals) if cache["target_columns"] == "*" else ",".join([vals[l] for l in cache["target_columns"]])
-        return k, v
+    return cache["kv"](value)
+
+def _kv_from_vals_helper(cache, vals):
+    """_kv_helper on an already split row; lets several queries share one split (see MultiQueryMapper)"""
+    if "filtering" not in cache or cache["filtering"](vals):  #yield if filtering criteria met or no filtering criteria    
+        return cache["key"](vals), cache["value"](vals)
     return None, None
+
+def _projection_cache_helper(cache):
+    """the row splitter and the key and value builders of the query parsed into cache by the two helpers below"""
+    if not "split" in cache:
+        cache["max_column"] = tokenizer.max_column(cache["key_columns"], cache["target_columns"], cache["filtering"].columns if "filtering" in cache else [])
+        cache["split"] = tokenizer.make_splitter(cache["delimiter"], cache["max_column"])
+        partitions = _task_partition_values(cache["key_columns"], cache["target_columns"])
+        cache["key"] = tokenizer.make_joiner(cache["key_columns"], "+", partitions)
+        cache["value"] = tokenizer.make_joiner(cache["target_columns"], ",", partitions)
+        cache["kv"] = _kv_function(cache["split"], cache.get("filtering"), cache["key"], cache["value"])
+
+def _kv_function(split, passed, key, value):
+    """_kv_helper as a closure over the task's query, so the per row path does no dict lookups or checks for missing config"""
+    if passed is None:
+        def kv(line):
+            vals = split(line)
+            return key(vals), value(vals)
+    else:
+        def kv(line):
+            vals = split(line)
+            if passed(vals):
+                return key(vals), value(vals)
+            return None, None
+    return kv
+
+def _parse_columns(columns_str):
+    """a key_columns/target_columns jobconf: "*", or a comma delimited list of column indices and partition column names"""
+    if columns_str == "*":
+        return "*"
+    if columns_str == "":
+        return []
+    return [int(x) if x.isdigit() else x for x in columns_str.split(",")] #list
+
+def partition_values(path):
+    """the partition columns of a file (or directory) of a Hive style partitioned table, as a dict, from the name=value directories in its path, 
+       e.g. {"dt": "2026-10-01", "region": "us"} for /data/events/dt=2026-10-01/region=us/part-00000. Values are unescaped like Hive's (%XX)
+    """
+    values = {}
+    for part in path.rstrip("/").split("/"):
+        if "=" in part:
+            name, value = part.split("=", 1)
+            values[name] = predicates.unquote(value)
+    return values
+
+def _task_partition_values(*column_lists):
+    """the partition values of the file being mapped, if any of column_lists names a partition column; else None"""
+    names = [c for columns in column_lists if columns != "*" for c in columns if not isinstance(c, int)]
+    if not names:
+        return None
+    path = os.environ["mapreduce_map_input_file"]
+    values = partition_values(os.path.dirname(path))
+    for name in names:
+        if name not in values:
+            raise Exception("{0} is not a partition column of {1}".format(name, path))
+    return values
+
+def _path_matches(pattern, path):
+    """True if path is pattern, or is below a directory matched by pattern. 
+       pattern can contain shell wildcards (*, ?, [..]), which are matched one path component at a time, like hadoop fs -ls does, 
+       so * never matches across a /. Components are compared whole, so /data/t1 does not match /data/t10/part-00000
+    """
+    pattern_parts = pattern.rstrip("/").split("/")
+    path_parts = path.split("/")
+    if len(pattern_parts) > len(path_parts):
+        return False
+    for pattern_part, path_part in zip(pattern_parts, path_parts):
+        if not fnmatch.fnmatchcase(path_part, pattern_part):
+            return False
+    return True
+        
+def _select_where_cache_helper(cache, prefix = ""):
+    """parses the select_where jobconfs (see the select_where docstring) into cache, once per task
+       prefix is prepended to every jobconf name; used by MultiQueryMapper, whose query i has its jobconfs named query_<i>_...
+    """
+    if not "filtering" in cache and os.environ.get(prefix + "filter_columns") and prefix + "filter_vals" in os.environ and prefix + "invert_filter_vals" in os.environ:
+        cache["filtering"] = _filtering_parsing_helper(prefix + "filter_columns", prefix + "filter_vals", prefix + "invert_filter_vals", prefix + "filter_operators")
+        
+    if not "delimiter" in cache:
+        cache["delimiter"] = os.environ["delimiter"]
+
+    if not "target_columns" in cache:
+        cache["target_columns"] = _parse_columns(os.environ[prefix + "target_columns"])
+
+    if not "key_columns" in cache:
+        cache["key_columns"] = _parse_columns(os.environ[prefix + "key_columns"])
+    _projection_cache_helper(cache)
+        
+def _join_cache_helper(cache, prefix):
+    """parses the table_<prefix>_* join jobconfs (see the join_mapper docstring) into cache, once per task"""
+    if not "filtering" in cache and os.environ.get("table_{0}_filter_columns".format(prefix)) and "table_{0}_filter_vals".format(prefix) in os.environ and "table_{0}_invert_filter_vals".format(prefix) in os.environ:
+        cache["filtering"] = _filtering_parsing_helper("table_{0}_filter_columns".format(prefix), "table_{0}_filter_vals".format(prefix), "table_{0}_invert_filter_vals".format(prefix), "table_{0}_filter_operators".format(prefix))    
+        
+    if not "key_columns" in cache:
+        cache["key_columns"] = _parse_columns(os.environ["table_{0}_key_columns".format(prefix)])
+
+    if not "target_columns" in cache:
+        cache["target_columns"] = _parse_columns(os.environ["table_{0}_target_columns".format(prefix)])
+            
+    if not "delimiter" in cache:
+        cache["delimiter"] = os.environ["table_{0}_delimiter".format(prefix)]
+    _projection_cache_helper(cache)
+        
+def _to_bytes(x):
+    return x if isinstance(x, bytes) else str(x).encode("utf-8")
+
+def _sample_seed():
+    """per task seed for _sampled; the file being mapped, so rows at the same offset of different files are sampled independently"""
+    return zlib.crc32(_to_bytes(os.environ.get("mapreduce_map_input_file", "")))
+
+def _sampled(seed, key, value, threshold):
+    """deterministic row sampling; True for the rows whose crc32 (of input file, byte offset and row) is below threshold (sample_rate * 2**32)
+       the same row is always in or out of the sample, and identical rows at different offsets are sampled independently
+    """
+    return (zlib.crc32(_to_bytes(value), zlib.crc32(_to_bytes(key), seed)) & 0xffffffff) < threshold
         
 def identity_mapper(key, value):
     """ Does Nothing; used when all work done in reduce phase  
     """
     yield key, value
+
+def identity_only_values_mapper(key, value):
+    """ Map side version of reducers.identity_only_values_reducer; kills the keys
+        Used to implement execute.interlace_tables as a map only job (zero reducers) so the concatenation skips the shuffle
+    """
+    yield value.strip(), ""
         
 def token_count_mapper(key, value):
     """ Purpose:
@@ -80,7 +199,7 @@ def token_count_mapper(key, value):
     for token in value.split():
         yield token, 1
 
-def select_where(key, value, cache={}):
+class SelectWhereMapper(object):
     """
         PURPOSE: 
            When combined with an identiy reducer this implements:
@@ -102,7 +221,7 @@ def select_where(key, value, cache={}):
             WHERE filter_column_1 (not) in [filter_vals_1] and filter_column_2 (not) in [filter_vals_2] and ...
       
         Args:
-            key: byte offset (not used in this function; returned as is)
+            key: byte offset (not used in this function)
             value: (string)
             via jobconfs (MANDATORY) - target_columns: can be 
                                                            1) "*" : all columns selected as return value
@@ -121,7 +240,12 @@ def select_where(key, value, cache={}):
                                                           this list is split, and used to trigger "not in" instead of in (like WHERE NOT)try i is 1, then values are selected where filter column i is 
                                                           NOT in filter_vals list i
                                                           
-            All three of these must be passed in or nothing happens (no where clause) 
+            via jobconfs (OPTIONAL) - filter_operators: pipe delimited list of operators, one per filter column: 
+                                                          in, prefix, regex, range, <, <=, >, >=, ==, != (see predicates.py). 
+                                                          If given, every value in filter_vals must be URL quoted (see predicates.encode_filter_vals). 
+                                                          If not, every column uses "in"
+                                                          
+            The first three of these must be passed in or nothing happens (no where clause) 
             
              EXAMPLE:
                      jobconf = ['filter_columns=1|2, filtervals=a,b|c,d, invert_filter_vals = 0|1
@@ -133,41 +257,244 @@ def select_where(key, value, cache={}):
                jobconf = ['filter_columns=1|1, filtervals=a,b|c,d, invert_filter_vals = 0|1
             to get a "column[1] in ["a","b"] but not in ["c","d"] effect. 
             
+                     jobconf = ['filter_columns=1|3, filtervals=10,20|%5Eab, invert_filter_vals = 0|0, filter_operators=range|regex
+                     
+                     Does a 
+                            SELECT * where 10 <= column[1] <= 20 and column[3] matches the regex "^ab"
+            
+            via jobconfs (OPTIONAL) - sample_rate: float in (0, 1]; if given, only this (deterministic) fraction of the rows is selected, 
+                                                   see SelectWhereCountMapper
+            
         Yields:
             (k, v)
                 where k = target_column_1+target_column_2+...,+target_column_N,
                 where v = target_column_1, ..., target_column_N)
             for the subset of (key, value) inputs matching the where clause
     """
-    if not "filtering" in cache and "filter_columns" in os.environ and "filter_vals" in os.environ and "invert_filter_vals" in os.environ:
-        cache["filtering"] = _filtering_parsing_helper("filter_columns", "filter_vals", "invert_filter_vals")
+    def __init__(self):
+        cache = {}
+        _select_where_cache_helper(cache) #parses the jobconfs and compiles the where clause, once per task
+        self.kv = cache["kv"]
+        self.sample_threshold = int(float(os.environ["sample_rate"]) * 2**32) if "sample_rate" in os.environ else None
+        self.sample_seed = _sample_seed()
         
-    if not "delimiter" in cache:
-        cache["delimiter"] = os.environ["delimiter"]
+    def map(self, key, value):
+        if self.sample_threshold is not None and not _sampled(self.sample_seed, key, value, self.sample_threshold):
+            return
+        k, v = self.kv(value)
+        if k and v:
+            yield k, v                 
 
-    if not "target_columns" in cache:
-        if os.environ["target_columns"] == "*":
-            cache["target_columns"] = "*"  
-        else:
-            cache["target_columns"] = [int(x) for x in os.environ["target_columns"].split(",")] #list
+#hadoopy instantiates mapper classes itself, so this name can still be used in job scripts like the function it replaced
+select_where = SelectWhereMapper
 
-    if not "key_columns" in cache:
-        if os.environ["key_columns"] == "*":
-            cache["key_columns"] = "*"  
-        else:
-            cache["key_columns"] = [int(x) for x in os.environ["key_columns"].split(",")] #list
-                  
-    k, v = _kv_helper(cache, value)
-    if k and v:
-        yield k,v                 
+
+class SelectWhereCountMapper(object):
+    """
+        PURPOSE:
+           Map side half of SELECT COUNT(*) WHERE .. GROUP BY ..; takes the exact same jobconfs as select_where (see that docstring)
+           
+           Instead of emitting one (k, projected row) per matching row, counts are aggregated in a dict inside the mapper
+           and only (k, partial count) pairs are emitted. Use with reducers.sum_reducer as both the combiner and the reducer.
+           
+        Args:
+            via jobconfs (OPTIONAL) - group_buffer_size: the max number of distinct groups held in memory. 
+                                                         When the dict reaches this size it is flushed (emitted and cleared), 
+                                                         so memory is bounded regardless of the group by cardinality. Default 100000
+            via jobconfs (OPTIONAL) - sample_rate: float in (0, 1]; if given, only this fraction of the rows is counted. 
+                                                   Rows are picked by a hash of their file, offset and content, so the sample is the same on every run
+        Yields:
+            (k, n) where n is the number of rows with key k seen by this mapper since the last flush
+    """
+    def __init__(self):
+        cache = {}
+        _select_where_cache_helper(cache)
+        self.kv = cache["kv"]
+        self.group_buffer_size = int(os.environ.get("group_buffer_size", 100000))
+        self.sample_threshold = int(float(os.environ["sample_rate"]) * 2**32) if "sample_rate" in os.environ else None
+        self.sample_seed = _sample_seed()
+        self.counts = {}
+    
+    def _flush(self):
+        for k, n in self.counts.items():
+            yield k, n
+        self.counts = {}
+            
+    def map(self, key, value):
+        if self.sample_threshold is not None and not _sampled(self.sample_seed, key, value, self.sample_threshold):
+            return
+        k, v = self.kv(value)
+        if k and v:
+            self.counts[k] = self.counts.get(k, 0) + 1
+            if len(self.counts) >= self.group_buffer_size:
+                for kv in self._flush():
+                    yield kv
+    
+    def close(self):
+        for kv in self._flush():
+            yield kv
+                       
+
+ALL_ROWS_KEY = "*" #the key of the single group of SelectAggregatesMapper without key_columns (SELECT agg(..) without GROUP BY)
+
+class SelectAggregatesMapper(object):
+    """
+        PURPOSE:
+           Map side of SELECT agg_1(column), agg_2(column), .. WHERE .. GROUP BY ..; takes the same jobconfs as select_where (see that docstring), 
+           with key_columns as the group by columns, plus the aggregates (see aggregates.py). With no key_columns, all of the rows are one group, 
+           keyed ALL_ROWS_KEY. 
+           
+           Like SelectWhereCountMapper, the groups are aggregated in a dict inside the mapper, and only (k, partial states) pairs are emitted. 
+           Use with reducers.AggregatesCombiner and reducers.AggregatesReducer.
+           
+        Args:
+            via jobconfs (MANDATORY) - aggregates: e.g., sum:3|avg:3|count:*, see aggregates.encode_aggregates. The columns can be partition column names
+            via jobconfs (OPTIONAL) - group_buffer_size: the max number of distinct groups held in memory, see SelectWhereCountMapper. Default 100000
+        Yields:
+            (k, [state of aggregate 1, state of aggregate 2, ...]) for the rows with key k seen by this mapper since the last flush
+    """
+    def __init__(self):
+        cache = {}
+        _select_where_cache_helper(cache)
+        self.split = cache["split"]
+        self.passed = cache.get("filtering")
+        self.key = cache["key"] if cache["key_columns"] else (lambda vals: ALL_ROWS_KEY)
+        decoded = aggregates.decode_aggregates(os.environ["aggregates"])
+        self.states = aggregates.GroupStates(decoded, _task_partition_values([column for _, column in decoded if column is not None]))
+        self.group_buffer_size = int(os.environ.get("group_buffer_size", 100000))
+        self.groups = {}
+    
+    def _flush(self):
+        for k, states in self.groups.items():
+            yield k, self.states.wire(states)
+        self.groups = {}
+            
+    def map(self, key, value):
+        vals = self.split(value)
+        if self.passed is not None and not self.passed(vals):
+            return
+        k = self.key(vals)
+        if k:
+            states = self.states.init(vals)
+            self.groups[k] = self.states.merge(self.groups[k], states) if k in self.groups else states
+            if len(self.groups) >= self.group_buffer_size:
+                for kv in self._flush():
+                    yield kv
+    
+    def close(self):
+        for kv in self._flush():
+            yield kv
                        
 
-def join_mapper(key, value, cache={}):
+QUERY_ROUTE_SEPARATOR = "\t" #separates the route of a select_where_batch query from the key; tab is the default field separator of Hadoop's KeyFieldBasedPartitioner
+
+def key_field_partition(fields, num_reducers):
+    """the reducer Hadoop's KeyFieldBasedPartitioner sends a key to, given the text of its partition fields (e.g., its first field for -k1,1): 
+       the Java hash of their UTF-8 bytes (h = 31 * h + b over the signed bytes, as a 32 bit int), made non negative, modulo num_reducers. 
+       Lets execute pick keys that go to a given reducer (see execute._query_routes), and the inprocess engine partition like Hadoop does
+    """
+    h = 0
+    for b in bytearray(fields if isinstance(fields, bytes) else fields.encode("utf-8")):
+        h = (31 * h + (b if b < 128 else b - 256)) & 0xffffffff
+    return (h & 0x7fffffff) % num_reducers
+
+class MultiQueryMapper(object):
+    """
+        PURPOSE:
+           Shared scan: runs several select_where / select count(*) .. groupby queries over the same input in ONE pass. 
+           Each row is split once, then every query's where clause, key and target columns are applied to it. 
+           Each output key is prefixed with a route of its query, a string that the partitioner (KeyFieldBasedPartitioner on the first 
+           field) sends to one of the reducers of that query, so every reducer, and every part file, holds the results of a single query. 
+           The keys of a query are spread over its routes by a hash of the key. Use with reducers.MultiQueryReducer (and MultiQueryCombiner), 
+           which strips the routes. 
+           
+           The select count(*) queries are aggregated in memory like SelectWhereCountMapper does; group_buffer_size bounds the 
+           number of groups held for all of them together
+        
+        Args:
+            key: byte offset (not used in this function)
+            value: (string)
+            via jobconfs (MANDATORY) - num_queries: the number N of queries
+            via jobconfs (MANDATORY) - delimiter: the delimter the file is split on
+            via jobconfs (MANDATORY) - query_<i>_switch, for i in 0..N-1: either "select_where" or "select_count_star_where_and_groupby"
+            via jobconfs (MANDATORY) - query_<i>_routes: comma delimited routes of query i, one per reducer of query i
+            via jobconfs              - query_<i>_target_columns, query_<i>_key_columns, query_<i>_filter_columns, query_<i>_filter_vals, 
+                                        query_<i>_invert_filter_vals: query i's select_where jobconfs (see the select_where docstring)
+            via jobconfs (OPTIONAL) - query_<i>_path: comma delimited path(s) (can contain wildcards, see _path_matches); if given, 
+                                                      query i only runs over the files below them (the partitions it did not prune, see execute._partition_pruned)
+            via jobconfs (OPTIONAL) - group_buffer_size: see SelectWhereCountMapper
+        Yields:
+            (route + QUERY_ROUTE_SEPARATOR + k, v) for select_where query i, and (route + QUERY_ROUTE_SEPARATOR + k, n) for select count(*) query i, 
+            where route is one of query i's routes
+    """
+    def __init__(self):
+        self.queries = []
+        for i in range(int(os.environ["num_queries"])):
+            prefix = "query_{0}_".format(i)
+            if prefix + "path" in os.environ and not any(_path_matches(p, os.environ["mapreduce_map_input_file"]) for p in os.environ[prefix + "path"].split(",")):
+                continue #a partition query i does not read
+            cache = {}
+            _select_where_cache_helper(cache, prefix)
+            routes = [r + QUERY_ROUTE_SEPARATOR for r in os.environ[prefix + "routes"].split(",")]
+            self.queries.append((routes, os.environ[prefix + "switch"] == "select_count_star_where_and_groupby", cache))
+        max_columns = [cache["max_column"] for routes, is_count, cache in self.queries]
+        self.split = tokenizer.make_splitter(os.environ["delimiter"], None if None in max_columns or not max_columns else max(max_columns))
+        self.group_buffer_size = int(os.environ.get("group_buffer_size", 100000))
+        self.counts = {}
+    
+    def _flush(self):
+        for k, n in self.counts.items():
+            yield k, n
+        self.counts = {}
+            
+    def map(self, key, value):
+        if not self.queries:
+            return
+        vals = self.split(value)
+        for routes, is_count, cache in self.queries:
+            k, v = _kv_from_vals_helper(cache, vals)
+            if k and v:
+                k = (routes[(zlib.crc32(_to_bytes(k)) & 0xffffffff) % len(routes)] if len(routes) > 1 else routes[0]) + k
+                if is_count:
+                    self.counts[k] = self.counts.get(k, 0) + 1
+                else:
+                    yield k, v
+        if len(self.counts) >= self.group_buffer_size:
+            for kv in self._flush():
+                yield kv
+    
+    def close(self):
+        for kv in self._flush():
+            yield kv
+                       
+
+JOIN_TAG_SEPARATOR = "\t" #separates the join key from the table tag; tab is the default field separator of Hadoop's KeyFieldBasedPartitioner
+TABLE_2_TAG = "0"         #the tags must have the same length (Hadoop sorts typedbytes keys by length first) 
+TABLE_1_TAG = "1"         #and table 2 must sort first so its (unique) row reaches the reducer before the table 1 rows
+JOIN_SALT_SEPARATOR = "\x1f" #separates a hot join key from its salt in skew mode (see join_mapper)
+MAX_JOIN_TABLES = 79          #tags are the single characters "0" to "~"
+KEY_EXISTENCE_JOINS = ("semi_join", "anti_join") #the joins that output table 1 rows depending only on whether table 2 has their key
+
+def join_tag(table, num_tables):
+    """the tag of table (1 to num_tables) in a join of num_tables tables: tables 2 to num_tables are tagged "0", "1", ... 
+       and table 1, the one whose rows are streamed, gets the highest tag so it sorts last. For two tables these are TABLE_2_TAG and TABLE_1_TAG
+    """
+    return chr(ord("0") + (num_tables - 1 if table == 1 else table - 2))
+
+class JoinMapper(object):
     """"table" refers to all files in one HDFS root directory below:
                  
         PURPOSE: 
            Very similar to "select_where_mapper" except the key output is different. 
-           Outputs (key_1+key_2,..., value) where key_1, key_2,... are given by the columns specified in key_columns. 
+           Outputs (key_1+key_2,...+JOIN_TAG_SEPARATOR+tag, value) where key_1, key_2,... are given by the columns specified in key_columns
+           and tag is TABLE_1_TAG or TABLE_2_TAG depending on the table the row came from. 
+           
+           The tag is part of the key so that, with the job launched with a partitioner on the first field of the key only 
+           (see execute.join), all rows of a join key go to the same reducer and the table 2 rows sort right before the table 1 rows. 
+           This lets the join reducers stream table 1 rows instead of buffering them. 
+           
+           The same goes for a join of N tables on one key (execute.multi_join, join_num_tables jobconf): the tables are tagged by join_tag, 
+           so the rows of tables 2..N of a key reach the reducer first, in table order, and the table 1 rows last. 
             
            When run on tables I_1, I_2 that share keys "1,2,3", 
            where I_1 has the shared keys in columns A,B,C 
@@ -180,10 +507,13 @@ def join_mapper(key, value, cache={}):
             and I_2.filter_column_1  (not) in filter_vals_1_for_I_2, I_2.filter_column_2  (not) in filter_vals_2_for_I_2, ...
       
         Args:
-            key: byte offset (not used in this function; returned as is)
+            key: byte offset (not used in this function)
             value: (string)
-            via jobconfs (MANDATORY)  - table_1_path='...' string representing the HDFS path(s) (if multiple, should be a string with commas between the individual paths) of the files of "table 1". used to parse out the key columns from this table when table 2 has the same keys but in different columns
+            via jobconfs (MANDATORY)  - table_1_path='...' string representing the HDFS path(s) (if multiple, should be a string with commas between the individual paths) of the files of "table 1". used to parse out the key columns from this table when table 2 has the same keys but in different columns. 
+                                                       The paths can contain wildcards (see _path_matches); the file a task reads is matched against them once, when the task starts
             via jobconfs (MANDATORY)  - table_2_path='...' " "
+            via jobconfs (OPTIONAL)   - join_num_tables: N, for a join of N tables; default 2. All of the table_2_* jobconfs are then also given for 
+                                        table_3 to table_N. A file matching the paths of several tables belongs to the first of them
             via jobconfs (MANDATORY)  - table_1_key_columns=1,2,3': comma delimited list of ints as a string like "1,2,3"
             via jobconfs (MANDATORY)  - table_2_key_columns=1,2,3': " "
             via jobconfs (MANDATORY)  - table_1_delimiter: the delimter the file 1 is split on
@@ -202,47 +532,272 @@ def join_mapper(key, value, cache={}):
             via jobconfs (OPTIONAL) - table_2_filter_columns
             via jobconfs (OPTIONAL) - table_2_filter_vals
             via jobconfs (OPTIONAL) - table_2_invert_filter_vals
+            
+            Skew mode; both must be given to turn it on:
+            via jobconfs (OPTIONAL) - join_skew_keys: pipe delimited list of hot join keys (key_1+key_2+...)
+            via jobconfs (OPTIONAL) - join_skew_salts: int N. The table 1 rows of a hot key are spread round robin over N salted keys 
+                                                       (key+JOIN_SALT_SEPARATOR+salt), and the table 2 rows of a hot key are replicated once per salt, 
+                                                       so a hot key is joined by N reducers instead of one. The reducers strip the salt
+            
+            via jobconfs (OPTIONAL) - join_switch: if "semi_join" or "anti_join", only the keys of table 2 matter: its rows are output with an empty value, 
+                                                   and a key already output by the task is skipped (the task remembers up to group_buffer_size keys, jobconf, default 100000)
+            via jobconfs (OPTIONAL) - join_bloom_filter: name of a file shipped into the task's working directory holding a bloom.BloomFilter 
+                                                         of table 2's join keys (inner and semi joins only; left and anti joins keep the table 1 rows whose key is not in table 2).
+                                                         Table 1 rows whose key is not in it are dropped
         Yields:
-            a subset of the (key_1+key_2+..., value) for each input pair
+            a subset of the (key_1+key_2+...+JOIN_TAG_SEPARATOR+tag, value) for each input pair, where value is the row projected on 
+            the target columns and already in its output shape (joined by commas), so the reducers only concatenate; 
+            the table is identified by the one character tag in the key alone, never by anything in the value
     """
-    PREFIX = None
-    INPUT = os.environ["mapreduce_map_input_file"]
-    
-    #Determine what table this row is a part of. 
-    #To resolve the known issue listed in the readme about paths not containing asterisks, this needs 
-    #to be updated to include some fancy regex logic
-    for t1p in os.environ["table_1_path"].split(","):
-        if INPUT.startswith(t1p):
-            PREFIX = "1"
-            break
-    if not PREFIX:
-        for t2p in os.environ["table_2_path"].split(","):
-            if INPUT.startswith(t2p):
-                PREFIX = "2"
+    def __init__(self):
+        #Determine what table the rows of this task are a part of; a map task reads a single file
+        INPUT = os.environ["mapreduce_map_input_file"]
+        num_tables = int(os.environ.get("join_num_tables", 2))
+        PREFIX = None
+        for table in range(1, num_tables + 1):
+            if any(_path_matches(p, INPUT) for p in os.environ["table_{0}_path".format(table)].split(",")):
+                PREFIX = str(table)
                 break
-    if not PREFIX:
-        raise Exception("Bug: File {0} matches neither input path 1 ({1}) or input path 2 ({2})".format(INPUT, os.environ["table_1_path"], os.environ["table_2_path"]))
-    
-    TABLE = os.environ["table_{0}_path".format(PREFIX)]
+        if not PREFIX:
+            raise Exception("Bug: File {0} matches none of the input paths ({1})".format(INPUT, "; ".join(os.environ["table_{0}_path".format(t)] for t in range(1, num_tables + 1))))
+        
+        cache = {}
+        _join_cache_helper(cache, PREFIX)
+        self.kv = cache["kv"]
+        self.is_table_1 = PREFIX == "1"
+        self.tag = JOIN_TAG_SEPARATOR + join_tag(int(PREFIX), num_tables)
+        
+        skew_salts = int(os.environ.get("join_skew_salts", 0))
+        self.skew_keys = frozenset(os.environ["join_skew_keys"].split("|")) if skew_salts else frozenset()
+        self.salted_tags = [JOIN_SALT_SEPARATOR + str(salt) + self.tag for salt in range(skew_salts)]
+        self.next_salt = 0
+        
+        self.bloom_filter = bloom.BloomFilter.load(os.environ["join_bloom_filter"]) if self.is_table_1 and os.environ.get("join_bloom_filter") else None
+        
+        #semi and anti joins only need to know which keys table 2 has: its rows are sent as (key, ""), each key once per task as far as memory allows
+        self.keys_only = not self.is_table_1 and os.environ.get("join_switch") in KEY_EXISTENCE_JOINS
+        self.keys_sent = set()
+        self.keys_buffer_size = int(os.environ.get("group_buffer_size", 100000))
+        
+    def map(self, key, value):
+        k, v = self.kv(value)
+        if k and v:
+            if self.bloom_filter is not None and k not in self.bloom_filter:
+                return #has no table 2 row to join to (inner and semi joins only)
+            if self.keys_only:
+                if k in self.keys_sent:
+                    return
+                if len(self.keys_sent) >= self.keys_buffer_size:
+                    self.keys_sent = set()
+                self.keys_sent.add(k)
+                v = ""
+            if k in self.skew_keys:
+                if self.is_table_1:
+                    self.next_salt = (self.next_salt + 1) % len(self.salted_tags)
+                    yield k + self.salted_tags[self.next_salt], v
+                else:
+                    for salted_tag in self.salted_tags:
+                        yield k + salted_tag, v
+            else:
+                yield k + self.tag, v
+                
+join_mapper = JoinMapper
+
+
+BLOOM_FILTER_FILE = "join_bloom_filter" #the name the Bloom filter of a semi-join reduced join is shipped under (see execute.join, bloom_fp_rate)
+
+BROADCAST_FILE_PREFIX = "broadcast_table_2_" #the distributed cache symlinks of the table 2 files are named BROADCAST_FILE_PREFIX + i
+
+class BroadcastJoinMapper(object):
+    """ PURPOSE:
+           Map side (broadcast) version of join_mapper + join_inner_reducer/join_left_reducer. Used as a map only job (zero reducers). 
+           
+           The text files of table 2 are shipped to every map task through the distributed cache (symlinked into the task working directory 
+           as BROADCAST_FILE_PREFIX0, BROADCAST_FILE_PREFIX1, ...); its typedbytes files (e.g., the output of a previous job) are read by each 
+           task with readtb. They are filtered and loaded ONCE per task into a dict from join key to the already projected table 2 row. The input of the job is table 1 only; each table 1 row that passes its where clause 
+           is joined against the dict, so nothing is shuffled. 
+           
+           Only use this when (filtered, projected) table 2 fits in the map task's memory. 
+           
+           The output is exactly what the reduce side join produces, including the "unique table 2 key" check: 
+           a table 1 row joining to a key that appears more than once in table 2 raises.
+        
+        Args:
+            key: byte offset (not used in this function)
+            value: (string) a table 1 row
+            via jobconfs (MANDATORY) - join_switch: either "inner_join", "left_join", "semi_join" or "anti_join"
+            via jobconfs (MANDATORY) - all of the table_1_* and table_2_* jobconfs of join_mapper (see that docstring)
+            via jobconfs (OPTIONAL) - mapred.cache.files with the table 2 text files symlinked as described above
+            via jobconfs (OPTIONAL) - table_2_broadcast_files: comma delimited list of the table 2 typedbytes files (job outputs), whose values are the rows
+            via jobconfs (OPTIONAL) - join_broadcast_reader: with table_2_broadcast_files, "hadoopy" or "inprocess" (see MergeJoinMapper, join_merge_reader)
+        Yields:
+            the same (key, value) pairs as join_inner_reducer/join_left_reducer (or, for semi and anti joins, reducers.JoinSemiReducer/JoinAntiReducer)
+    """
+    def __init__(self):
+        self.join_switch = os.environ["join_switch"]
+        cache = {}
+        _join_cache_helper(cache, "1")
+        self.kv = cache["kv"]
+        
+        table_2_cache = {}
+        _join_cache_helper(table_2_cache, "2")
+        
+        #table 2 rows are stored already in the shape they are appended to table 1 rows with
+        self.table_2 = {} 
+        self.duplicate_counts = {} #only keys appearing more than once in table 2 are in here 
+        for row in self._table_2_rows():
+            k, v = _kv_helper(table_2_cache, row)
+            if k and v:
+                if k in self.table_2:
+                    self.duplicate_counts[k] = self.duplicate_counts.get(k, 1) + 1
+                else:
+                    self.table_2[k] = "," + v if self.join_switch not in KEY_EXISTENCE_JOINS else ""
     
-    if not "filtering" in cache and "table_{0}_filter_columns".format(PREFIX) in os.environ and "table_{0}_filter_vals".format(PREFIX) in os.environ and "table_{0}_invert_filter_vals".format(PREFIX) in os.environ:
-        cache["filtering"] = _filtering_parsing_helper("table_{0}_filter_columns".format(PREFIX), "table_{0}_filter_vals".format(PREFIX), "table_{0}_invert_filter_vals".format(PREFIX))    
+    @staticmethod
+    def _table_2_rows():
+        """the rows of table 2: the lines of its text files in the distributed cache, and the values of its typedbytes files 
+           (the row, as in any join_mapper input), read with readtb like MergeJoinMapper reads its table 2 bucket
+        """
+        for fname in sorted(os.listdir(".")):
+            if fname.startswith(BROADCAST_FILE_PREFIX):
+                with open(fname) as f:
+                    for line in f:
+                        yield line.rstrip("\r\n")
+        if os.environ.get("table_2_broadcast_files"):
+            if os.environ["join_broadcast_reader"] == "inprocess":
+                from python_hiveish.mapreduce.inprocess import readtb #only importable where the inprocess engine runs
+            else:
+                from hadoopy import readtb
+            for fname in os.environ["table_2_broadcast_files"].split(","):
+                for _, v in readtb(fname):
+                    yield v
         
-    if not "key_columns" in cache:
-        cache["key_columns"] = [int(x) for x in os.environ["table_{0}_key_columns".format(PREFIX)].split(",")] #list
+    def map(self, key, value):
+        k, v = self.kv(value)
+        if k and v:
+            if self.join_switch in KEY_EXISTENCE_JOINS:
+                if (k in self.table_2) == (self.join_switch == "semi_join"):
+                    yield k, v
+                return
+            if k in self.duplicate_counts:
+                raise Exception("{0} table 2 rows have the same 'unique' join key!".format(self.duplicate_counts[k]))
+            t2 = self.table_2.get(k)
+            if t2 is None:
+                if self.join_switch == "left_join":
+                    yield k, v
+            else:
+                yield k, v + t2
 
-    if not "target_columns" in cache:
-        if os.environ["table_{0}_target_columns".format(PREFIX)] == "*":
-            cache["target_columns"] = "*"  
+
+def bucket_number(path):
+    """the bucket a part file of a bucketed table holds: the number at the end of its name (part-00003 or part-r-00003)"""
+    return int(os.path.basename(path).rsplit("-", 1)[1])
+
+def _typedbytes_order(key):
+    """sort order of a string key in a typedbytes job output, which Hadoop sorts by raw bytes: length first, then the bytes"""
+    b = _to_bytes(key)
+    return (len(b), b)
+
+class MergeJoinMapper(object):
+    """ PURPOSE:
+           Map side (sort-merge) version of join_mapper + join_inner_reducer/join_left_reducer for two tables bucketed on the join key 
+           into the same number of buckets (see execute.select_where, num_buckets). Used as a map only job (zero reducers) over table 1, 
+           with one map task per bucket file. 
+           
+           Both bucket i files are sorted by the join key, so the task streams the table 2 bucket i file alongside its own input, 
+           advancing it as the table 1 keys go up, and joins each table 1 row with the table 2 row of the same key. 
+           Memory is O(1); nothing is shuffled or sorted. 
+           
+           The output is exactly what the reduce side join produces, including the "unique table 2 key" check.
+        
+        Args:
+            key: the bucket key of the row (the table was written with it as its key)
+            value: (string) a table 1 row
+            via jobconfs (MANDATORY) - join_switch: either "inner_join", "left_join", "semi_join" or "anti_join"
+            via jobconfs (MANDATORY) - all of the table_1_* and table_2_* jobconfs of join_mapper (see that docstring) except the paths
+            via jobconfs (MANDATORY) - table_2_buckets: comma delimited list of the table 2 bucket files, in bucket order
+            via jobconfs (MANDATORY) - join_merge_reader: "hadoopy" to read the table 2 bucket from HDFS with hadoopy.readtb, 
+                                                          "inprocess" to read it from the local disk (the inprocess engine)
+        Yields:
+            the same (key, value) pairs as join_inner_reducer/join_left_reducer
+    """
+    def __init__(self):
+        self.join_switch = os.environ["join_switch"]
+        cache = {}
+        _join_cache_helper(cache, "1")
+        self.kv = cache["kv"]
+        table_2_cache = {}
+        _join_cache_helper(table_2_cache, "2")
+        self.table_2_kv = table_2_cache["kv"]
+        
+        table_2_file = os.environ["table_2_buckets"].split(",")[bucket_number(os.environ["mapreduce_map_input_file"])]
+        if os.environ["join_merge_reader"] == "inprocess":
+            from python_hiveish.mapreduce.inprocess import readtb #only importable where the inprocess engine runs
         else:
-            cache["target_columns"] = [int(x) for x in os.environ["table_{0}_target_columns".format(PREFIX)].split(",")] #list
-            
-    if not "delimiter" in cache:
-        cache["delimiter"] = os.environ["table_{0}_delimiter".format(PREFIX)]
-
-    k, v = _kv_helper(cache, value)
-    if k and v:
-        outdict = {}
-        outdict["table"] = TABLE    
-        outdict["row"] = v
-        yield k, outdict
+            from hadoopy import readtb
+        self.table_2 = iter(readtb(table_2_file))
+        self.table_2_next = next(self.table_2, None)
+        
+        self.group_order = None #the key the table 2 stream was last advanced to, and the table 2 rows found for it
+        self.group_row = None
+        self.group_count = 0
+        
+    def _advance(self, order):
+        """moves the table 2 stream past the key with sort order `order`, collecting its rows that pass the table 2 where clause"""
+        self.group_order = order
+        self.group_row = None
+        self.group_count = 0
+        while self.table_2_next is not None:
+            k2, v2 = self.table_2_next
+            order_2 = _typedbytes_order(k2)
+            if order_2 > order:
+                break
+            if order_2 == order:
+                k, v = self.table_2_kv(v2)
+                if k and v:
+                    if self.group_count == 0:
+                        self.group_row = "," + v
+                    self.group_count += 1
+            self.table_2_next = next(self.table_2, None)
+        
+    def map(self, key, value):
+        k, v = self.kv(value)
+        if k and v:
+            order = _typedbytes_order(key)
+            if order != self.group_order:
+                self._advance(order)
+            if self.join_switch in KEY_EXISTENCE_JOINS:
+                if (self.group_count > 0) == (self.join_switch == "semi_join"):
+                    yield k, v
+            elif self.group_row is not None:
+                #there should only be one table 2 value. or else you have two rows in table 2 joining to table 1   
+                if self.group_count > 1:
+                    raise Exception("{0} table 2 rows have the same 'unique' join key!".format(self.group_count))
+                yield k, v + self.group_row
+            elif self.join_switch == "left_join":
+                yield k, v
+
+
+TOP_N_KEY = "top_n" #the single key of TopNMapper's output, so that one reducer merges the partial top Ns
+
+
+class TopNMapper(object):
+    """Purpose:
+            Keeps the top_n (key, count) pairs with the highest counts of its input split, e.g. of the output of select_count_star_where_and_groupby, 
+            and outputs them when the task ends. Each map task thus outputs at most top_n pairs, whatever the size of its split
+        Args:
+            key: the group
+            value: its count
+            via jobconfs (MANDATORY) - top_n: int
+        Yields:
+            at close, TOP_N_KEY, [count, key] for each of the task's top_n pairs
+    """
+    def __init__(self):
+        self.top = topn.TopN(int(os.environ["top_n"]))
+        
+    def map(self, key, value):
+        self.top.add(key, value)
+        
+    def close(self):
+        for key, count in self.top.items():
+            yield TOP_N_KEY, [count, key]
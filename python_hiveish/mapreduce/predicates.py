@@ -0,0 +1,190 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Tommy Carpenter
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import operator
+import re
+try:
+    from urllib import quote, unquote
+except ImportError: #python 3
+    from urllib.parse import quote, unquote
+
+"""
+Compiled WHERE clauses for the mappers.
+
+compile_where turns the filter jobconfs (see mappers.select_where) into ONE callable, built once per task, that takes a split row 
+and returns whether it passes. Every condition is precompiled into a small closure: IN lists become frozensets, regexes are compiled, 
+numbers are parsed once. 
+
+Conditions are ANDed, so the order they run in does not change the result, only the cost: a row is rejected by the first condition 
+it fails. They start ordered by a fixed cost per operator (cheapest first) and are then reordered every REORDER_EVERY rows by how many 
+rows each one actually rejected per unit of cost, so that the most selective cheap conditions run first on the data at hand.
+
+Operators (filter_operators jobconf, one per filter column; "in" for every column if it is not given):
+    in        column value is one of the values
+    prefix    column value starts with one of the values
+    regex     column value matches (re.search) one of the values, which are regular expressions
+    <, <=, >, >=, ==, != 
+              numeric comparison with the single value
+    range     lo <= column value <= hi, with the two values lo and hi; either can be empty for no bound. 
+              If a bound is not a number, the values are compared as strings instead (e.g. ISO dates, 2026-10-01)
+Inverting a condition (invert_filter_vals) gives NOT IN, NOT LIKE, etc. As with NULL in SQL, a column value that is not a number fails 
+every numeric condition, inverted or not.
+
+On the wire, the values of each column are joined by commas and the columns by pipes. Without filter_operators the values are written 
+as is (so cannot contain commas or pipes). With filter_operators, each value is URL quoted (see encode_filter_vals) so regexes and 
+IN values can contain anything.
+"""
+
+COMPARISONS = {"<" : operator.lt, "<=" : operator.le, ">" : operator.gt, ">=" : operator.ge, "==" : operator.eq, "!=" : operator.ne}
+OPERATORS = frozenset(["in", "prefix", "regex", "range"]) | frozenset(COMPARISONS)
+
+#rough relative cost of one evaluation; only used to order the conditions until they have been observed
+_COSTS = {"in" : 1.0, "prefix" : 2.0, "regex" : 10.0, "range" : 4.0}
+_COMPARISON_COST = 3.0
+
+REORDER_EVERY = 4096 #rows between two reorderings of the conditions
+
+
+def encode_filter_vals(values):
+    """one column's filter values as written into the filter_vals jobconf when filter_operators is given"""
+    return ",".join(quote(str(v), safe="") for v in values)
+
+def decode_filter_vals(s):
+    """inverse of encode_filter_vals"""
+    return [unquote(v) for v in s.split(",")]
+
+
+def _number(s):
+    return float(s) if s != "" else None
+
+def _is_number(s):
+    try:
+        float(s)
+        return True
+    except ValueError:
+        return False
+
+def _test(column, op, values, invert):
+    """the closure for one condition"""
+    if op == "in":
+        s = frozenset(values)
+        if invert:
+            return lambda vals: vals[column] not in s
+        return lambda vals: vals[column] in s
+    
+    if op == "prefix":
+        t = tuple(values)
+        if invert:
+            return lambda vals: not vals[column].startswith(t)
+        return lambda vals: vals[column].startswith(t)
+    
+    if op == "regex":
+        search = re.compile("|".join("(?:{0})".format(v) for v in values)).search
+        if invert:
+            return lambda vals: search(vals[column]) is None
+        return lambda vals: search(vals[column]) is not None
+    
+    if op == "range":
+        if len(values) != 2:
+            raise Exception("range needs exactly two values (lo,hi), got {0}".format(values))
+        if any(v != "" and not _is_number(v) for v in values): #e.g. dates; compared as strings
+            lo_s, hi_s = values
+            if invert:
+                return lambda vals: not ((lo_s == "" or lo_s <= vals[column]) and (hi_s == "" or vals[column] <= hi_s))
+            return lambda vals: (lo_s == "" or lo_s <= vals[column]) and (hi_s == "" or vals[column] <= hi_s)
+        lo, hi = _number(values[0]), _number(values[1])
+        if lo is None: 
+            lo = float("-inf")
+        if hi is None:
+            hi = float("inf")
+        cmp = lambda x: lo <= x <= hi
+    elif op in COMPARISONS:
+        if len(values) != 1:
+            raise Exception("{0} needs exactly one value, got {1}".format(op, values))
+        bound, compare = float(values[0]), COMPARISONS[op]
+        cmp = lambda x: compare(x, bound)
+    else:
+        raise Exception("Unsupported WHERE operator: {0}".format(op))
+    
+    def numeric_test(vals):
+        try:
+            x = float(vals[column])
+        except ValueError:
+            return False #not a number; fails inverted or not
+        return cmp(x) != invert 
+    return numeric_test
+
+
+class CompiledPredicate(object):
+    """The AND of a list of conditions, self-reordering (see the module docstring). Call it with a split row."""
+    def __init__(self, tests, costs, columns):
+        self.columns = columns #the columns the conditions look at
+        order = sorted(range(len(tests)), key=lambda i: costs[i])
+        self.tests = [tests[i] for i in order]
+        self.costs = [costs[i] for i in order]
+        self.reached = [0.0] * len(tests)   #decayed number of rows each condition was evaluated on
+        self.failed = [0.0] * len(tests)    #decayed number of rows each condition rejected
+        self.rejected = [0] * len(tests)    #rows each condition rejected since the last reordering; the only per row bookkeeping
+        self.calls = 0                      #rows since the last reordering
+        
+    def __call__(self, vals):
+        if self.calls == REORDER_EVERY:
+            self._reorder()
+        self.calls += 1
+        for i, test in enumerate(self.tests):
+            if not test(vals):
+                self.rejected[i] += 1
+                return False
+        return True
+    
+    def _reorder(self):
+        """sorts the conditions by rejections per evaluation per unit cost, highest first. 
+           How many rows reached each condition follows from the current order and the rejections of the conditions before it. 
+           The history is halved each time so the order follows changes in the data (e.g., from one input file to the next)
+        """
+        reached = self.calls
+        for i in range(len(self.tests)):
+            self.reached[i] = self.reached[i] / 2 + reached
+            self.failed[i] = self.failed[i] / 2 + self.rejected[i]
+            reached -= self.rejected[i]
+        scores = [(self.failed[i] + 1) / (self.reached[i] + 2) / self.costs[i] for i in range(len(self.tests))]
+        order = sorted(range(len(self.tests)), key=lambda i: -scores[i])
+        self.tests = [self.tests[i] for i in order]
+        self.costs = [self.costs[i] for i in order]
+        self.reached = [self.reached[i] for i in order]
+        self.failed = [self.failed[i] for i in order]
+        self.rejected = [0] * len(self.tests)
+        self.calls = 0
+
+
+def compile_where(columns,   #list of ints; the filter columns
+                  operators, #list of str in OPERATORS, one per column
+                  values,    #list of lists of str, one per column
+                  inverts):  #list of bool, one per column
+    """returns the CompiledPredicate of "columns[0] operators[0] values[0] AND columns[1] ..." """
+    if not (len(columns) == len(operators) == len(values) == len(inverts)):
+        raise Exception("WHERE clause has {0} columns, {1} operators, {2} value lists and {3} invert flags".format(len(columns), len(operators), len(values), len(inverts)))
+    tests = [_test(c, op, v, inv) for c, op, v, inv in zip(columns, operators, values, inverts)]
+    costs = [_COSTS.get(op, _COMPARISON_COST) for op in operators]
+    return CompiledPredicate(tests, costs, columns)
@@ -23,6 +23,10 @@ THE SOFTWARE.
 """
 
 import os 
+import pickle
+import tempfile
+from python_hiveish.mapreduce import aggregates, approx, topn
+from python_hiveish.mapreduce.mappers import JOIN_TAG_SEPARATOR, JOIN_SALT_SEPARATOR, QUERY_ROUTE_SEPARATOR, join_tag
 
 """
 No try excepts here unless the MR job can complete without them!
@@ -56,79 +60,360 @@ def count_reducer(key, values):
     yield key, sum([1 for x in values]) #len([x for x in values]) would also work, but not len(values) because it is not a list
 
 
-def _join_records_splitter(values):
-    """Purpose:
-            Helper function used for JOIN reducers to split the records that came from table 1 and table 2. 
-            
-       Args:
-            values: same set of values that was passed into the reducer
+def sum_reducer(key, values):
+    """Sums the partial counts emitted for key
+       Associative and commutative, so the same function is used as the combiner and the reducer 
+       (see mappers.SelectWhereCountMapper) 
+    
+        Args:
+            key: string
+            values: integers
+        Yields:
+            A tuple in the form of (key, value)
+                key: same as input key
+                value: int // sum(values)
+    """
+    yield key, sum(values)
+
+
+class AggregatesCombiner(object):
+    """Merges the partial aggregate states of mappers.SelectAggregatesMapper (see aggregates.py) 
+       
+        Yields:
+            key, [merged state of aggregate 1, merged state of aggregate 2, ...]
+    """
+    def __init__(self):
+        self.states = aggregates.GroupStates(aggregates.decode_aggregates(os.environ["aggregates"]))
+        
+    def reduce(self, key, values):
+        yield key, self.states.wire(self.states.merge_all(values))
         
+
+class AggregatesReducer(AggregatesCombiner):
+    """Merges the partial aggregate states of a group like AggregatesCombiner, then computes the results 
+       
         Yields:
-            two subsets of values that union to the exact set of values, the set of records from table 1, and the set of records from table 2
-    """
-    table_1_rows = []
-    table_2_rows = []
-    for v in values:
-        if v["table"] == os.environ["table_1_path"]:
-            table_1_rows.append(v)
-        elif v["table"] == os.environ["table_2_path"]:
-            table_2_rows.append(v)
-        else:
-            raise Exception("table matches neither table_1_path or table_2_path! Tsble: {0}".format(v["table"]))   
-    return table_1_rows, table_2_rows
-            
-            
-def join_inner_reducer(key, values):
-    """ Purpose:
-            To be used in conjunection with join_inner_mapper to implement INNER JOIN between two tables
+            key, [result of aggregate 1, result of aggregate 2, ...]
+    """
+    def reduce(self, key, values):
+        yield key, self.states.final(self.states.merge_all(values))
         
-        Notes: 
-            RE the cache: values gets consumed when iterated over; it is a generator type input (type is something like 'Hadoopy-Group')
-            you can't iterate over values twice like an Iterable (for i in values); the second time there's nothing there
-            to iterate over them twice, therefore, we cache values
+
+class SumTopNReducer(object):
+    """sum_reducer that only outputs the top_n (jobconf, int) groups with the highest sums of its partition, largest first, when the task ends. 
+       Fuses the top N into select_count_star_where_and_groupby: the counts of all the other groups are never written (see execute.top_n)
+    """
+    def __init__(self):
+        self.top = topn.TopN(int(os.environ["top_n"]))
         
-        Args:
-             (TODO)
+    def reduce(self, key, values):
+        self.top.add(key, sum(values))
+        
+    def close(self):
+        for key, count in self.top.items():
+            yield key, count
+            
+
+def top_n_reducer(key, values):
+    """Merges the partial top Ns of mappers.TopNMapper (all under the one key TOP_N_KEY) into the overall top_n (jobconf, int)
+    
+        Yields:
+            key, count for the top_n groups with the highest counts, largest first
+    """
+    top = topn.TopN(int(os.environ["top_n"]))
+    for count, k in values:
+        top.add(k, count)
+    for k, count in top.items():
+        yield k, count
 
+
+class ApproxCountReducer(object):
+    """sum_reducer for counts over a sample of the input: scales the sum by the sampling rate and adds a confidence interval (see approx.py)
+    
+        Args:
+            via jobconfs (MANDATORY) - approx_sample_rate: float in (0, 1]; the fraction of the input that was counted
+            via jobconfs (MANDATORY) - approx_z: float; the z score of the confidence interval, e.g. 1.96 for 95%
         Yields:
-             key, value where value are the two rows joined by a comma regardless of their original delimiter. 
-                         the original delimiter is used to split the respective tables. 
-        
-    """
-    #for each key, which is handled prior to this function by the partiioner, 
-    # there should only be one table 2 value. or else you have two rows in table 2 joining to table 1   
-    table_1_rows, table_2_rows = _join_records_splitter(values)
-    num_2_rows = len(table_2_rows) 
-    for i in table_1_rows:
-        if num_2_rows == 0:    
-            pass #only difference from left join
-        elif num_2_rows == 1:
-           yield key, ",".join((i["row"].split(os.environ["table_1_delimiter"]) + table_2_rows[0]["row"].split(os.environ["table_2_delimiter"])))
+            key, [estimated count, lower bound, upper bound]
+    """
+    def __init__(self):
+        self.sample_rate = float(os.environ["approx_sample_rate"])
+        self.z = float(os.environ["approx_z"])
+        
+    def reduce(self, key, values):
+        yield key, approx.scaled_count(sum(values), self.sample_rate, self.z)
+
+
+class MultiQueryCombiner(object):
+    """To be used with mappers.MultiQueryMapper; keys are route + QUERY_ROUTE_SEPARATOR + key, the route telling the query
+       Sums the partial counts of the select count(*) queries (see sum_reducer) and passes the rows of the select_where queries through 
+       (see identity_reducer)
+    """
+    def __init__(self):
+        self.count_routes = frozenset(route for i in range(int(os.environ["num_queries"])) 
+                                      if os.environ["query_{0}_switch".format(i)] == "select_count_star_where_and_groupby"
+                                      for route in os.environ["query_{0}_routes".format(i)].split(","))
+        
+    def reduce(self, key, values):
+        if key.split(QUERY_ROUTE_SEPARATOR, 1)[0] in self.count_routes:
+            yield key, sum(values)
+        else:
+            for value in values:
+                yield key, value
+
+class MultiQueryReducer(MultiQueryCombiner):
+    """MultiQueryCombiner that strips the routes, so that the part files of each query hold exactly what select_where or 
+       select_count_star_where_and_groupby would have written
+    """
+    def reduce(self, key, values):
+        k = key.split(QUERY_ROUTE_SEPARATOR, 1)[1]
+        for _, value in MultiQueryCombiner.reduce(self, key, values):
+            yield k, value
+
+
+class _RowGroup(object):
+    """The rows of one table for one join key, for many to many joins. 
+       Held in memory up to max_bytes, then spilled to a local temp file (deleted when closed) so a huge group cannot exhaust the reducer's memory. 
+       Can be iterated any number of times.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.rows = []
+        self.size = 0
+        self.spill = None
+        self.spilled = 0
+        
+    def add(self, row):
+        if self.spill is None:
+            self.rows.append(row)
+            self.size += len(row)
+            if self.size > self.max_bytes:
+                self.spill = tempfile.TemporaryFile()
+                for r in self.rows:
+                    pickle.dump(r, self.spill, pickle.HIGHEST_PROTOCOL)
+                self.spilled = len(self.rows)
+                self.rows = []
+        else:
+            pickle.dump(row, self.spill, pickle.HIGHEST_PROTOCOL)
+            self.spilled += 1
+            
+    def __iter__(self):
+        if self.spill is None:
+            for row in self.rows:
+                yield row
         else:
-            raise Exception("{0} table 2 rows have the same 'unique' join key!".format(num_2_rows))   
+            self.spill.seek(0)
+            for i in range(self.spilled):
+                yield pickle.load(self.spill)
+            
+    def close(self):
+        if self.spill is not None:
+            self.spill.close()
+
+
+def _combinations(groups, i = 0):
+    """every concatenation of one row of each of groups[i:], in order"""
+    if i == len(groups):
+        yield ""
+    else:
+        for row in groups[i]:
+            for rest in _combinations(groups, i + 1):
+                yield row + rest
 
 
+class _StreamingJoinReducer(object):
+    """Purpose:
+            Shared code of the JOIN reducers. To be used in conjunction with mappers.join_mapper
+            
+            The mapper appends a table tag to the join key, and the job is partitioned on the join key only, so for each join key 
+            this reducer is called first with the table 2 key (if there are any table 2 rows) and then with the table 1 key.
+            The table 2 row is remembered until the table 1 rows of the same join key are streamed past it, 
+            so memory is O(1) per key regardless of how many table 1 rows share it. 
+            
+            With N tables (join_num_tables jobconf, see execute.multi_join), the rows of tables 2..N of a key arrive first, in table order, 
+            and each table 1 row is joined with one row of each of them, in table order. 
+            
+            The values are the projected rows exactly as they appear in the output (target columns joined by commas, see mappers.join_mapper), 
+            so joining rows is a single concatenation; nothing is split or decoded here. 
+            
+            In skew mode (join_skew_salts jobconf, see mappers.join_mapper) hot keys arrive salted; the salt is stripped from the output key.
+            
+            Many to many mode (join_many_to_many jobconf): instead of raising when a table other than table 1 has several rows for a key, 
+            each table 1 row is joined with every combination of them (the cross product). Those rows are kept in a _RowGroup per table, which spills to 
+            local disk past join_group_max_bytes (jobconf, default 64MB). The table 1 rows are then taken in blocks of up to the same size, and the 
+            groups are read once per block, so a spilled group is read back len(table 1 rows) * row size / join_group_max_bytes times, not once per row. 
+    """
+    keep_unjoined = False #whether a table 1 row missing a row of another table is output (LEFT JOIN) or dropped (INNER JOIN)
+    
+    def __init__(self):
+        self.salted = int(os.environ.get("join_skew_salts", 0)) > 0
+        num_tables = int(os.environ.get("join_num_tables", 2))
+        self.table_1_tag = join_tag(1, num_tables)
+        #what stands in for a missing row of table i in a LEFT JOIN: nothing for two tables, as many empty fields as it has target columns for more (see execute.multi_join)
+        self.missing = [os.environ.get("table_{0}_missing".format(table), "") for table in range(2, num_tables + 1)]
+        self.join_key = None
+        self.rows = [None] * (num_tables - 1) #by tag: the first row of each of tables 2..N for join_key, and how many rows it has 
+        self.counts = [0] * (num_tables - 1)
+        self.many_to_many = os.environ.get("join_many_to_many", "0") == "1"
+        self.group_max_bytes = int(os.environ.get("join_group_max_bytes", 64*1024*1024))
+        self.groups = [None] * (num_tables - 1) #by tag, in many to many mode: all of the rows of each of tables 2..N for join_key
+    
+    def reduce(self, key, values):
+        join_key, tag = key.rsplit(JOIN_TAG_SEPARATOR, 1)
+        if join_key != self.join_key:
+            self.join_key = join_key
+            self.rows = [None] * len(self.rows)
+            self.counts = [0] * len(self.counts)
+            self._close_groups()
+            
+        if tag != self.table_1_tag:
+            table = ord(tag) - ord("0")
+            if self.many_to_many:
+                self.groups[table] = _RowGroup(self.group_max_bytes)
+                for v in values:
+                    self.groups[table].add("," + v)
+                return
+            for v in values:
+                if self.counts[table] == 0:
+                    self.rows[table] = "," + v
+                self.counts[table] += 1
+            return
+        
+        out_key = join_key.split(JOIN_SALT_SEPARATOR, 1)[0] if self.salted else join_key
+        if self.many_to_many:
+            for kv in self._reduce_many_to_many(out_key, values):
+                yield kv
+            return
+        
+        joined = []
+        for table, row in enumerate(self.rows):
+            if row is None:
+                if not self.keep_unjoined:
+                    return #only difference from left join
+                joined.append(self.missing[table])
+            else:
+                #there should only be one value per table. or else you have two rows in that table joining to table 1   
+                if self.counts[table] > 1:
+                    raise Exception("{0} table {1} rows have the same 'unique' join key!".format(self.counts[table], table + 2))  
+                joined.append(row)
+        joined = "".join(joined)
+        
+        for v in values:
+            yield out_key, v + joined
+            
+    def _reduce_many_to_many(self, out_key, values):
+        groups = []
+        for table, group in enumerate(self.groups):
+            if group is None:
+                if not self.keep_unjoined:
+                    return
+                groups.append([self.missing[table]])
+            else:
+                groups.append(group)
+        
+        block, block_size = [], 0
+        for v in values:
+            block.append(v)
+            block_size += len(v)
+            if block_size > self.group_max_bytes:
+                for kv in self._join_block(out_key, block, groups):
+                    yield kv
+                block, block_size = [], 0
+        for kv in self._join_block(out_key, block, groups):
+            yield kv
+            
+    def _join_block(self, out_key, block, groups):
+        for joined in _combinations(groups):
+            for v in block:
+                yield out_key, v + joined
+        
+    def _close_groups(self):
+        for group in self.groups:
+            if group is not None:
+                group.close()
+        self.groups = [None] * len(self.groups)
+        
+    def close(self):
+        self._close_groups()
+            
+            
+class JoinInnerReducer(_StreamingJoinReducer):
+    """ Purpose:
+            To be used in conjunection with join_mapper to implement INNER JOIN between two (or more) tables
+            See _StreamingJoinReducer for how the rows of the tables are matched
+        
+        Yields:
+             key, value where value are the rows joined by a comma regardless of their original delimiter. 
+    """
+    keep_unjoined = False
+        
 
-def join_left_reducer(key, values):
+class JoinLeftReducer(_StreamingJoinReducer):
     """ Purpose:
              Exactly like the above (see that docstring) except it is a LEFT JOIN
          
         Yields:
              key, value where value is either:
                        1)  the two rows (one from table 1, one from table 2) delimited and joined by a comma regardless of their original delimiter. 
-                           the original delimiter is used to split the respective tables. 
                        2) the oun-joined row from table 1  delimited by a comma, regardless of its original delimiter
+                       With more than two tables, a missing row of a table is replaced by empty fields, so every output row has the same columns
     """
-    #for each key, which is handled prior to this function by the partiioner, 
-    # there should only be one table 2 value. or else you have two rows in table 2 joining to table 1   
-    table_1_rows, table_2_rows = _join_records_splitter(values)
-    num_2_rows = len(table_2_rows) 
-    for i in table_1_rows:
-        if num_2_rows == 0:    
-            yield key, i["row"]
-        elif num_2_rows == 1:
-           yield key, i["row"] + "," + table_2_rows[0]["row"]
-        else:
-            raise Exception("{0} table 2 rows have the same 'unique' join key!".format(num_2_rows))   
+    keep_unjoined = True
+        
+        
+class _KeyExistenceJoinReducer(object):
+    """Purpose:
+            Shared code of the SEMI and ANTI JOIN reducers. To be used in conjunction with mappers.join_mapper (join_switch jobconf "semi_join" or "anti_join")
+            
+            Table 2 only sends its keys (with empty values), and like in _StreamingJoinReducer its key sorts right before the table 1 key, 
+            so this only remembers whether the current join key has table 2 rows, and streams the table 1 rows past it.
+    """
+    keep_matched = True #whether the table 1 rows with a table 2 key are output (SEMI JOIN) or the ones without (ANTI JOIN)
+    
+    def __init__(self):
+        self.salted = int(os.environ.get("join_skew_salts", 0)) > 0
+        self.table_1_tag = join_tag(1, 2)
+        self.table_2_key = None
+        
+    def reduce(self, key, values):
+        join_key, tag = key.rsplit(JOIN_TAG_SEPARATOR, 1)
+        if tag != self.table_1_tag:
+            self.table_2_key = join_key #the values are not even looked at
+        elif (join_key == self.table_2_key) == self.keep_matched:
+            out_key = join_key.split(JOIN_SALT_SEPARATOR, 1)[0] if self.salted else join_key
+            for v in values:
+                yield out_key, v
+                
+
+class JoinSemiReducer(_KeyExistenceJoinReducer):
+    """ Purpose:
+            SELECT T1.* FROM T1 WHERE T1.key IN (SELECT key FROM T2 WHERE ..); see _KeyExistenceJoinReducer
+        Yields:
+             key, value where value is a table 1 row whose key is in table 2
+    """
+    keep_matched = True
+    
+
+class JoinAntiReducer(_KeyExistenceJoinReducer):
+    """ Purpose:
+            SELECT T1.* FROM T1 WHERE T1.key NOT IN (SELECT key FROM T2 WHERE ..); see _KeyExistenceJoinReducer
+        Yields:
+             key, value where value is a table 1 row whose key is not in table 2
+    """
+    keep_matched = False
+    
+
+def key_existence_join_combiner(key, values):
+    """Combiner of the semi and anti joins: a table 2 key is sent once per map task instead of once per row; table 1 rows pass through"""
+    if key.rsplit(JOIN_TAG_SEPARATOR, 1)[1] == join_tag(1, 2):
+        for value in values:
+            yield key, value
+    else:
+        yield key, ""
         
-        
\ No newline at end of file
+
+#hadoopy instantiates reducer classes itself, so these names can still be used in job scripts like the functions they replaced
+join_inner_reducer = JoinInnerReducer
+join_left_reducer = JoinLeftReducer
+join_semi_reducer = JoinSemiReducer
+join_anti_reducer = JoinAntiReducer
@@ -0,0 +1,130 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Tommy Carpenter
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import sys
+import threading
+
+"""
+Concurrent job submission for the functions in execute.
+
+Every execute function blocks until its MapReduce job finishes. JobScheduler runs them on background threads instead
+(the work happens on the cluster, so threads are enough) and hands back a JobHandle right away.
+A JobHandle passed as an argument to another submit() is a dependency: the dependent job starts when all of its inputs are
+ready, and the handle is replaced by its result (the output path). At most max_concurrent_jobs jobs run at once.
+
+    scheduler = JobScheduler(max_concurrent_jobs = 4)
+    t1 = scheduler.submit(execute.select_where, platform_args, in_path = ...)
+    t2 = scheduler.submit(execute.select_where, platform_args, in_path = ...)
+    both = scheduler.submit(execute.interlace_tables, platform_args, [t1, t2]) #starts when t1 and t2 are done
+    print(both.result())
+"""
+
+class JobHandle(object):
+    """the future of a submitted job"""
+    def __init__(self, name):
+        self.name = name
+        self._done = threading.Event()
+        self._result = None
+        self._exc_info = None
+
+    def done(self):
+        """True once the job has finished, successfully or not"""
+        return self._done.is_set()
+
+    def result(self, timeout = None):
+        """blocks until the job finishes and returns what the job function returned; re-raises its exception if it failed"""
+        if not self._done.wait(timeout):
+            raise Exception("Timed out waiting for job {0}".format(self.name))
+        if self._exc_info:
+            raise self._exc_info[1]
+        return self._result
+
+    def exception(self, timeout = None):
+        """blocks until the job finishes and returns its exception, or None if it succeeded"""
+        self._done.wait(timeout)
+        return self._exc_info[1] if self._exc_info else None
+
+
+def _dependencies(x):
+    """all of the JobHandles in x, looking inside lists, tuples and dict values (e.g., the input_paths list of interlace_tables)"""
+    if isinstance(x, JobHandle):
+        return [x]
+    if isinstance(x, (list, tuple)):
+        return [h for i in x for h in _dependencies(i)]
+    if isinstance(x, dict):
+        return [h for i in x.values() for h in _dependencies(i)]
+    return []
+
+def _resolve(x):
+    """x with every JobHandle replaced by its result"""
+    if isinstance(x, JobHandle):
+        return x.result()
+    if isinstance(x, list):
+        return [_resolve(i) for i in x]
+    if isinstance(x, tuple):
+        return tuple(_resolve(i) for i in x)
+    if isinstance(x, dict):
+        return dict((k, _resolve(v)) for k, v in x.items())
+    return x
+
+
+class JobScheduler(object):
+    def __init__(self, max_concurrent_jobs = 4): #int; cap on the number of jobs running at the same time
+        self._slots = threading.BoundedSemaphore(max_concurrent_jobs)
+        self._pending = set() #the handles of the jobs not yet done; a done handle is only kept by whoever submitted it
+        self._pending_lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) in the background once every JobHandle among its arguments is done, and returns a JobHandle.
+           If a dependency failed, fn is not run and the handle fails with the dependency's exception.
+        """
+        handle = JobHandle(getattr(fn, "__name__", str(fn)))
+        dependencies = _dependencies(args) + _dependencies(kwargs)
+
+        def run():
+            try:
+                for d in dependencies:
+                    d.result()
+                with self._slots:
+                    handle._result = fn(*_resolve(args), **_resolve(kwargs))
+            except Exception:
+                handle._exc_info = sys.exc_info()
+            finally:
+                with self._pending_lock:
+                    self._pending.discard(handle)
+                handle._done.set()
+
+        with self._pending_lock:
+            self._pending.add(handle)
+        threading.Thread(target=run, name="hiveish-{0}".format(handle.name)).start()
+        return handle
+
+    def wait(self):
+        """blocks until every job submitted so far is done; raises the first failure among the jobs still running when called, if any
+           (jobs that were already done are not tracked; check their handles)
+        """
+        with self._pending_lock:
+            pending = list(self._pending)
+        for h in pending:
+            h.result()
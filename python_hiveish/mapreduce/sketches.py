@@ -0,0 +1,161 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Tommy Carpenter
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import hashlib
+import math
+import struct
+
+"""
+Probabilistic sketches for GROUP BY aggregates (see aggregates.py, approx_count_distinct and heavy_hitters).
+
+Both are mergeable: the mappers build one sketch per group, and the combiners and reducers merge them, so what is shuffled per group 
+is bounded by the sketch size instead of growing with the number of distinct values.
+
+HyperLogLog (approximate COUNT(DISTINCT ..)): 
+    2**p registers, each the highest "rank" (position of the first 1 bit) among the hashes falling in it. The relative standard error 
+    of the estimate is about 1.04 / sqrt(2**p); hll_precision picks p for a wanted error. A sketch starts sparse (a dict of the registers 
+    that are set, so small groups stay small) and becomes dense (one byte per register) once a quarter of its registers are set. 
+    Merging takes the max of each register.
+    
+Space-Saving (heavy hitters, the most frequent values of a column):
+    k counters of [count, error] per value. A value that is not counted while all counters are in use replaces the least counted one, 
+    inheriting its count as its error. Every value occurring more than N/k times in a group of N rows is in the summary, and each 
+    count is an over estimate by at most its error (and by at most N/k). Summaries are merged by adding counters, a value missing from 
+    a full summary being counted as that summary's smallest count, and keeping the k largest (Agarwal et al., Mergeable Summaries).
+"""
+
+def _to_bytes(x):
+    return x if isinstance(x, bytes) else x.encode("utf-8")
+
+def _hash64(value):
+    return struct.unpack("<Q", hashlib.md5(_to_bytes(value)).digest()[:8])[0]
+
+
+def hll_precision(error): #float; the wanted relative standard error
+    """the number of index bits p of a HyperLogLog whose relative standard error is at most error, between 4 and 16"""
+    return min(16, max(4, int(math.ceil(math.log((1.04 / error) ** 2, 2)))))
+
+def hll_init(p):
+    """returns a function column value -> the sparse sketch of that single value ({} for an empty value)"""
+    bits = 64 - p
+    mask = (1 << bits) - 1
+    def init(value):
+        if value == "":
+            return {}
+        h = _hash64(value)
+        return {h >> bits: bits - (h & mask).bit_length() + 1}
+    return init
+
+def _dense(state, m):
+    """state as a bytearray of m registers; a bytearray is returned as is (so can be updated in place)"""
+    if isinstance(state, bytearray):
+        return state
+    if isinstance(state, dict):
+        registers = bytearray(m)
+        for i, r in state.items():
+            registers[i] = r
+        return registers
+    return bytearray(state) #dense, as read from the shuffle
+
+def hll_merge(p):
+    """returns a function merging two sketches of precision p; the first one may be updated in place and returned"""
+    m = 1 << p
+    sparse_max = m // 4
+    def merge(a, b):
+        if isinstance(a, dict) and isinstance(b, dict):
+            if len(a) < len(b):
+                a, b = b, a
+            for i, r in b.items():
+                if r > a.get(i, 0):
+                    a[i] = r
+            return a if len(a) <= sparse_max else _dense(a, m)
+        if isinstance(a, dict): 
+            a, b = b, a #the dense one first
+        a = _dense(a, m)
+        if isinstance(b, dict):
+            for i, r in b.items():
+                if r > a[i]:
+                    a[i] = r
+        else:
+            for i, r in enumerate(bytearray(b)):
+                if r > a[i]:
+                    a[i] = r
+        return a
+    return merge
+
+def hll_wire(state):
+    """a sketch as it is shuffled: a dense one as bytes"""
+    return bytes(state) if isinstance(state, bytearray) else state
+
+def hll_estimate(p):
+    """returns a function sketch of precision p -> the estimated number of distinct values (an int)"""
+    m = 1 << p
+    alpha = 0.7213 / (1 + 1.079 / m)
+    def estimate(state):
+        registers = list(state.values()) + [0] * (m - len(state)) if isinstance(state, dict) else bytearray(state)
+        e = alpha * m * m / sum(2.0 ** -r for r in registers)
+        zeros = registers.count(0)
+        if e <= 2.5 * m and zeros: #small range correction: linear counting
+            e = m * math.log(float(m) / zeros)
+        return int(round(e))
+    return estimate
+
+
+def space_saving_init(value):
+    """the summary of a single column value ({} for an empty value)"""
+    return {value: [1, 0]} if value != "" else {}
+
+def space_saving_merge(k):
+    """returns a function merging two summaries of k counters; the first one may be updated in place and returned"""
+    def merge(a, b):
+        if len(a) < len(b):
+            a, b = b, a
+        if len(b) == 1: #one row at a time, in the mappers
+            (x, (count, error)), = b.items()
+            if x in a:
+                a[x][0] += count
+                a[x][1] += error
+                return a
+            if len(a) < k:
+                a[x] = [count, error]
+                return a
+            y = min(a, key=lambda v: a[v][0]) #the least counted value makes room for x
+            smallest = a.pop(y)[0]
+            a[x] = [smallest + count, smallest + error]
+            return a
+        min_a = min(c for c, _ in a.values()) if len(a) >= k else 0
+        min_b = min(c for c, _ in b.values()) if len(b) >= k else 0
+        merged = {}
+        for x in set(a) | set(b):
+            count_a, error_a = a.get(x, (min_a, min_a))
+            count_b, error_b = b.get(x, (min_b, min_b))
+            merged[x] = [count_a + count_b, error_a + error_b]
+        if len(merged) > k:
+            merged = dict(sorted(merged.items(), key=lambda item: item[1][0], reverse=True)[:k])
+        return merged
+    return merge
+
+def space_saving_top(state):
+    """the [value, estimated count, max error] of every counter of a summary, most frequent first"""
+    return [[x, count, error] for x, (count, error) in sorted(state.items(), key=lambda item: (-item[1][0], item[0]))]
@@ -0,0 +1,95 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Tommy Carpenter
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+"""
+A local catalog of table statistics, so that execute can size and plan jobs without hand tuning (see PlatformArgs, stats_catalog).
+
+Per input path (a table: a path, a glob, or a list of paths) it records:
+    bytes            the size of the input; recorded as a by-product of every job reading it while the catalog is in use, unless 
+                     it is the output of another job (see execute._catalogued)
+    rows             the number of rows                                               (execute.collect_stats)
+    distinct         per column, the estimated number of distinct values             (execute.collect_stats, HyperLogLog)
+    heavy_hitters    per column, the most frequent values and their estimated counts (execute.collect_stats, Space-Saving)
+    updated          when bytes was last recorded, in seconds since the epoch
+
+and execute uses them to choose the number of reducers of a job, between a broadcast and a repartition join, whether a group by 
+is worth a combiner, and the hot keys of a skewed join. The catalog is a JSON file on the client, rewritten on every update.
+"""
+
+def table_key(path):
+    """the catalog key of an input path or list of paths"""
+    return ",".join(sorted(path)) if isinstance(path, list) else path
+
+
+class StatsCatalog(object):
+    def __init__(self, path): #str; the local JSON file, created on the first update
+        self.path = path
+        self._lock = threading.Lock() #jobs submitted concurrently update the catalog from several threads
+        self.tables = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.tables = json.load(f)
+    
+    def get(self, table):
+        """the stats of the table (see the module docstring), or {} if there are none"""
+        with self._lock:
+            return dict(self.tables.get(table_key(table), {}))
+    
+    def update(self, table, **stats):
+        """records stats of the table, keeping the ones not given, and saves the catalog"""
+        with self._lock:
+            self.tables.setdefault(table_key(table), {}).update(stats)
+            fd, tmp = tempfile.mkstemp(dir = os.path.dirname(os.path.abspath(self.path)), prefix = ".stats_")
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.tables, f, indent = 1, sort_keys = True)
+            os.rename(tmp, self.path) #atomic, so a crash never leaves half a catalog
+    
+    def bytes(self, table, max_age = None):
+        """the recorded size of the table, or None if unknown or recorded more than max_age seconds ago"""
+        stats = self.get(table)
+        if "bytes" not in stats or (max_age is not None and time.time() - stats.get("updated", 0) > max_age):
+            return None
+        return stats["bytes"]
+    
+    def distinct(self, table, columns): #list of ints
+        """the estimated number of distinct combinations of the columns (their product of distinct values, at most the number of rows), 
+           or None if any of them is unknown
+        """
+        stats = self.get(table)
+        d = 1
+        for c in columns:
+            if str(c) not in stats.get("distinct", {}):
+                return None
+            d *= stats["distinct"][str(c)]
+        return min(d, stats["rows"]) if "rows" in stats else d
+    
+    def heavy_hitters(self, table, column): #int
+        """the [value, estimated count] of the most frequent values of the column, most frequent first, or None if unknown"""
+        return self.get(table).get("heavy_hitters", {}).get(str(column))
@@ -0,0 +1,118 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Tommy Carpenter
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import operator
+
+"""
+Row tokenizing for the mappers, built once per task and called once per row.
+
+make_splitter(delimiter, max_column) returns a function splitting a line into its fields, but only as far as max_column, the highest 
+column the query references (filter, key and target columns): on a 200 column table where the query touches columns 1 and 3, 
+only the first 4 fields are cut out, and the rest of the line is left as one unparsed field.
+
+Quotes:
+    A line without any double quote is split with str.split (the common case; nothing else is done to it). 
+    Otherwise the line is parsed field by field: a field starting with a double quote runs to the matching closing quote, so it can 
+    contain the delimiter, and "" inside it is a literal double quote. Any other double quote (a stray one, in the middle of an unquoted field) 
+    is removed, as the mappers always did.
+    
+make_joiner(columns, separator) returns a function building the separator joined string of some columns of a split row, 
+with the column lookups precompiled. A column can also be a name, whose value is given per task in constants 
+(the partition columns of a Hive style partitioned table, see mappers.partition_values); max_column skips names.
+"""
+
+def _split_quoted(line, delimiter, maxsplit):
+    """the slow path of make_splitter, for lines containing a double quote"""
+    fields = []
+    n = len(line)
+    i = 0
+    while True:
+        if len(fields) == maxsplit: 
+            fields.append(line[i:]) #past max_column; left as is
+            return fields
+        if line.startswith('"', i):
+            parts = []
+            j = i + 1
+            while True:
+                q = line.find('"', j)
+                if q == -1: #unterminated; the field runs to the end of the line
+                    parts.append(line[j:])
+                    i = n
+                    break
+                parts.append(line[j:q])
+                if line.startswith('"', q + 1): #escaped quote
+                    parts.append('"')
+                    j = q + 2
+                else:
+                    i = q + 1
+                    break
+            d = line.find(delimiter, i)
+            end = n if d == -1 else d
+            parts.append(line[i:end].replace('"', '')) #anything between the closing quote and the delimiter
+            fields.append("".join(parts))
+        else:
+            d = line.find(delimiter, i)
+            end = n if d == -1 else d
+            fields.append(line[i:end].replace('"', ''))
+        if d == -1:
+            return fields
+        i = d + len(delimiter)
+
+def make_splitter(delimiter,          #str
+                  max_column = None): #int or None; the highest column index that will be looked at, None for all of them
+    """returns a function line -> list of fields; see the module docstring"""
+    maxsplit = -1 if max_column is None else max_column + 1
+    def split(line):
+        if '"' not in line:
+            return line.split(delimiter, maxsplit)
+        return _split_quoted(line, delimiter, maxsplit)
+    return split
+
+def make_joiner(columns,          #list of ints (or names), or "*" for all of the columns
+                separator,        #str
+                constants = None): #dict; the value of each name in columns
+    """returns a function split row -> separator.join(the row's columns)"""
+    if columns == "*":
+        return separator.join
+    if not columns:
+        return lambda vals: ""
+    if any(not isinstance(c, int) for c in columns):
+        parts = [(c, None) if isinstance(c, int) else (None, constants[c]) for c in columns]
+        return lambda vals: separator.join([vals[c] if value is None else value for c, value in parts])
+    if len(columns) == 1:
+        column = columns[0]
+        return lambda vals: vals[column]
+    get = operator.itemgetter(*columns)
+    return lambda vals: separator.join(get(vals))
+
+def max_column(*column_lists): #each a list of ints or "*"
+    """the highest column index in column_lists, or None if any of them is "*" (all of the columns)"""
+    highest = -1
+    for columns in column_lists:
+        if columns == "*":
+            return None
+        for c in columns:
+            if isinstance(c, int) and c > highest:
+                highest = c
+    return highest
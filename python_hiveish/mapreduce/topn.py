@@ -0,0 +1,48 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015 Tommy Carpenter
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import heapq
+
+"""
+Bounded top N, used to find the most frequent groups of a count without sorting (or even holding) all of them.
+
+TopN keeps the n largest (count, key) pairs seen so far in a min heap: each new pair costs O(log n) and memory stays O(n), 
+so a top 10 over hundreds of millions of groups can be taken while streaming them (see hdfs_tools.tb_topn_dict), 
+and partial top Ns (one per map or reduce task) are merged by another TopN (see execute.top_n).
+"""
+
+class TopN(object):
+    def __init__(self, n): #int; the number of pairs kept
+        self.n = n
+        self.heap = [] #(count, key); the smallest kept count is heap[0]
+
+    def add(self, key, count):
+        if len(self.heap) < self.n:
+            heapq.heappush(self.heap, (count, key))
+        elif (count, key) > self.heap[0]:
+            heapq.heapreplace(self.heap, (count, key))
+
+    def items(self):
+        """the kept (key, count) pairs, largest count first"""
+        return [(key, count) for count, key in sorted(self.heap, reverse=True)]
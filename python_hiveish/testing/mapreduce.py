@@ -23,7 +23,7 @@ THE SOFTWARE.
 """
 
 from python_hiveish import hdfs_tools, logger
-from python_hiveish.mapreduce import execute
+from python_hiveish.mapreduce import execute, scheduler
 
 """Same exact API as execute.join; luckily select_where is a subset of this"""
 def   join_test(platform_args,               #an instance of PlatformArgs                        
@@ -57,22 +57,26 @@ def   join_test(platform_args,               #an instance of PlatformArgs
              
              
     """
-    join_out_path = execute.join(**locals()) 
-    logger.info("lines in JOIN: {0}".format(hdfs_tools.count_hdfs_lines(join_out_path)))
-    t1_test =   execute.select_where(platform_args = platform_args,
+    join_args = dict(locals())
+    jobs = scheduler.JobScheduler(platform_args.max_concurrent_jobs) #the three jobs are independent; run them concurrently
+    join_out_path = jobs.submit(execute.join, **join_args) 
+    t1_test =   jobs.submit(execute.select_where, 
+                                     platform_args = platform_args,
                                      in_path = table_1_path,          
                                      key_columns = table_1_key_columns,                     
                                      filter_columns = table_1_filter_columns,        
                                      filter_vals = table_1_filter_vals,            
                                      invert_flags = table_1_invert_flags,          
                                      delimiter = table_1_delimiter)
-    logger.info("matching lines in table 1: {0}".format(hdfs_tools.count_hdfs_lines(t1_test)))
-    t2_test =   execute.select_where(platform_args = platform_args,
+    t2_test =   jobs.submit(execute.select_where, 
+                                     platform_args = platform_args,
                                      in_path = table_2_path, 
                                      key_columns = table_2_key_columns,                     
                                      filter_columns = table_2_filter_columns,        
                                      filter_vals = table_2_filter_vals,            
                                      invert_flags = table_2_invert_flags,          
                                      delimiter = table_2_delimiter)
-    logger.info("matching lines in table 2: {0}".format(hdfs_tools.count_hdfs_lines(t2_test)))  
+    logger.info("lines in JOIN: {0}".format(hdfs_tools.count_hdfs_lines(join_out_path.result())))
+    logger.info("matching lines in table 1: {0}".format(hdfs_tools.count_hdfs_lines(t1_test.result())))
+    logger.info("matching lines in table 2: {0}".format(hdfs_tools.count_hdfs_lines(t2_test.result())))  
             
\ No newline at end of file
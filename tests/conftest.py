@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def write_table(tmp_path):
+    """writes rows (lists of strings) as a comma delimited text table, split over num_files files, and returns its directory"""
+    def write(name, rows, num_files = 1):
+        path = tmp_path / "tables" / name
+        path.mkdir(parents = True)
+        for i in range(num_files):
+            with open(str(path / "part-{0:05d}".format(i)), "w") as f:
+                for row in rows[i::num_files]:
+                    f.write(",".join(row) + "\n")
+        return str(path)
+    return write
+
+
+@pytest.fixture
+def platform_args(tmp_path):
+    """PlatformArgs for the inprocess engine, writing under tmp_path"""
+    pytest.importorskip("hadoopy")
+    from python_hiveish.mapreduce import execute
+    os.makedirs(str(tmp_path / "tmp"))
+    return execute.PlatformArgs("python", str(tmp_path / "tmp"), str(tmp_path / "out"), "", "", "inprocess", [], num_mappers = 2, num_reducers = 2)
+
+
+@pytest.fixture
+def read_output():
+    from python_hiveish.mapreduce import inprocess
+    return lambda path: sorted(inprocess.readtb(path))
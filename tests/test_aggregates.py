@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from python_hiveish.mapreduce import aggregates
+
+
+VALUES = ["1", "2.5", "", "x", "-4", "1", "7", "", "2.5", "abc", "0"]
+
+
+def _aggregate(aggregate_columns, rows, num_chunks):
+    """aggregates rows the way the jobs do: rows are cut into chunks (map tasks), each chunk's states are merged, put on the wire and 
+       merged again in a shuffled order (combiners and reducer)"""
+    states = aggregates.GroupStates(aggregates.decode_aggregates(aggregates.encode_aggregates(aggregate_columns)))
+    partials = [states.wire(states.merge_all(states.init(r) for r in rows[i::num_chunks])) for i in range(num_chunks)]
+    random.shuffle(partials)
+    return states.final(states.merge_all(partials))
+
+
+@pytest.mark.parametrize("num_chunks", [1, 2, 5])
+def test_aggregates_match_sql(num_chunks):
+    random.seed(num_chunks)
+    rows = [[random.choice(VALUES), "g"] for _ in range(200)]
+    numbers = [float(r[0]) for r in rows if r[0] not in ("", "x", "abc")]
+    result = _aggregate([("sum", 0), ("min", 0), ("max", 0), ("avg", 0), ("count", 0), ("count", "*"), ("count_distinct", 0)], rows, num_chunks)
+    assert result[0] == pytest.approx(sum(numbers))
+    assert result[1] == min(numbers) and result[2] == max(numbers)
+    assert result[3] == pytest.approx(sum(numbers) / len(numbers))
+    assert result[4] == sum(1 for r in rows if r[0] != "") #COUNT(column) counts every non empty value, numbers or not
+    assert result[5] == len(rows)
+    assert result[6] == len(set(r[0] for r in rows if r[0] != ""))
+
+
+def test_a_group_without_values():
+    rows = [["", "x"], ["y", ""]]
+    assert _aggregate([("sum", 0), ("min", 0), ("avg", 0), ("count", 0), ("count", 1), ("count_distinct", 0)], rows, 2) == [aggregates.NO_VALUE] * 3 + [1, 1, 1]
+
+
+def test_encoding():
+    encoded = aggregates.encode_aggregates([("sum", 3), ("count", "*"), ("approx_count_distinct", 2, 0.01), ("heavy_hitters", 1)])
+    assert encoded == "sum:3|count:*|approx_count_distinct:2:0.01|heavy_hitters:1:100"
+    decoded = aggregates.decode_aggregates(encoded)
+    assert [(a.name, column) for a, column in decoded] == [("sum", 3), ("count", None), ("approx_count_distinct", 2), ("heavy_hitters", 1)]
+    assert aggregates.columns([("sum", 3), ("count", "*"), ("avg", 1), ("max", 3)]) == [1, 3]
+    #partition columns are referenced by name
+    assert [(a.name, column) for a, column in aggregates.decode_aggregates(aggregates.encode_aggregates([("count_distinct", "dt"), ("max", 10)]))] == [("count_distinct", "dt"), ("max", 10)]
+    assert aggregates.columns([("count_distinct", "region"), ("sum", 2), ("count", "dt")]) == [2, "dt", "region"]
+    with pytest.raises(AssertionError):
+        aggregates.encode_aggregates([("median", 1)])
+    with pytest.raises(AssertionError):
+        aggregates.encode_aggregates([("sum", "*")])
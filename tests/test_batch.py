@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+execute = pytest.importorskip("python_hiveish.mapreduce.execute")
+from python_hiveish.mapreduce import mappers
+
+
+QUERIES = [dict(switch = "select_where", key_columns = [0], target_columns = [0, 2], filter_columns = [1], filter_vals = [["b"]], invert_flags = [False]),
+           dict(switch = "select_count_star_where_and_groupby", key_columns = [1]),
+           dict(switch = "select_where", target_columns = [2], filter_columns = [2], filter_vals = [["10", "20"]], invert_flags = [False], filter_operators = ["range"]),
+           dict(switch = "select_count_star_where_and_groupby", key_columns = [0, 1], filter_columns = [1], filter_vals = [["a"]], invert_flags = [True])]
+
+
+@pytest.fixture
+def table(write_table):
+    return write_table("t", [["k{0}".format(i % 13), "abc"[i % 3], str(i)] for i in range(300)], num_files = 3)
+
+
+def _single(platform_args, path, q):
+    q = dict(q)
+    return getattr(execute, q.pop("switch"))(platform_args, path, **q)
+
+
+@pytest.mark.parametrize("num_reducers", [1, 3])
+def test_each_query_gets_what_its_own_call_writes(platform_args, table, read_output, num_reducers):
+    platform_args.num_reducers = num_reducers
+    out_paths = execute.select_where_batch(platform_args, table, QUERIES)
+    assert len(out_paths) == len(QUERIES)
+    for q, out in zip(QUERIES, out_paths):
+        assert read_output(out) == read_output(_single(platform_args, table, q))
+        #the query's own part files, moved out of the one job's output
+        assert len([f for f in os.listdir(out) if f.startswith("part-")]) == num_reducers
+    assert not [f for f in os.listdir(os.path.dirname(out_paths[0])) if f.startswith("part-")]
+
+
+def test_result_cache_hit_returns_the_split_outputs(platform_args, table, read_output):
+    platform_args.result_cache = True
+    first = execute.select_where_batch(platform_args, table, QUERIES)
+    second = execute.select_where_batch(platform_args, table, QUERIES)
+    assert first == second
+    for q, out in zip(QUERIES, second):
+        assert read_output(out) == read_output(_single(platform_args, table, q))
+
+
+def test_key_field_partition_is_the_java_hash():
+    assert mappers.key_field_partition("abc", 2**31 - 1) == 96354 #"abc".hashCode()
+    assert mappers.key_field_partition("polygenelubricants", 2**31 - 1) == 0 #hashCode() is Integer.MIN_VALUE, masked to 0
+    assert mappers.key_field_partition(u"\xe9", 1000) == (31 * -61 - 87) % 2**31 % 1000 #signed UTF-8 bytes
+
+
+@pytest.mark.parametrize("num_reducers", [1, 2, 5, 64, 999])
+def test_each_route_reaches_its_reducer(num_reducers):
+    routes = execute._query_routes(num_reducers)
+    assert [mappers.key_field_partition(r, num_reducers) for r in routes] == list(range(num_reducers))
@@ -0,0 +1,35 @@
+from python_hiveish.mapreduce import bloom
+
+
+def test_added_keys_are_always_found():
+    f = bloom.BloomFilter.for_capacity(5000, 0.01)
+    keys = ["key{0}".format(i) for i in range(5000)]
+    for k in keys:
+        f.add(k)
+    assert all(k in f for k in keys)
+
+
+def test_false_positive_rate_is_close_to_the_target():
+    f = bloom.BloomFilter.for_capacity(10000, 0.01)
+    for i in range(10000):
+        f.add("in{0}".format(i))
+    false_positives = sum("out{0}".format(i) in f for i in range(20000))
+    assert false_positives / 20000.0 < 0.02
+
+
+def test_sizing():
+    f = bloom.BloomFilter.for_capacity(1000, 0.01)
+    assert 9000 <= f.num_bits <= 10000 #about 9.6 bits per key at 1%
+    assert f.num_hashes == 7
+    assert bloom.BloomFilter.for_capacity(0, 0.01).num_bits > 0
+
+
+def test_save_and_load(tmp_path):
+    f = bloom.BloomFilter.for_capacity(100, 0.05)
+    for i in range(100):
+        f.add(u"ké{0}".format(i))
+    path = str(tmp_path / "filter")
+    f.save(path)
+    g = bloom.BloomFilter.load(path)
+    assert (g.num_bits, g.num_hashes, g.bits) == (f.num_bits, f.num_hashes, f.bits)
+    assert all(u"ké{0}".format(i) in g for i in range(100))
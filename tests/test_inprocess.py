@@ -0,0 +1,69 @@
+import collections
+import os
+
+import pytest
+
+pytest.importorskip("hadoopy")
+from python_hiveish.mapreduce import execute, inprocess
+
+
+def test_merge_runs_with_unorderable_values(tmp_path):
+    #equal keys in several runs must never make heapq.merge compare the values
+    spill_files = []
+    for run in range(4):
+        fname = str(tmp_path / "spill_{0}".format(run))
+        inprocess._dump_records(fname, [("a", {"run": run}), ("b", {"run": run, "i": 0}), ("b", {"run": run, "i": 1})])
+        spill_files.append(fname)
+    merged = [(r[-2], r[-1]) for r in inprocess._merge_runs(spill_files)]
+    assert [k for k, _ in merged] == ["a"] * 4 + ["b"] * 8
+    assert [v["run"] for k, v in merged if k == "a"] == [0, 1, 2, 3]
+    assert [(v["run"], v["i"]) for k, v in merged if k == "b"] == [(run, i) for run in range(4) for i in range(2)]
+
+
+def test_sketch_states_of_one_key_over_several_spills(platform_args, write_table):
+    #one group, four map tasks, one reducer: the reducer merges four runs that all hold the same key with dict states
+    rows = [["k{0}".format(i % 7), str(i)] for i in range(400)]
+    path = write_table("t", rows, num_files = 4)
+    platform_args.num_reducers = 1
+    out = dict(inprocess.readtb(execute.select_aggregates_where_and_groupby(platform_args, path, [], [("count", "*"), ("heavy_hitters", 0, 10), ("approx_count_distinct", 1, 0.02)])))
+    count, hitters, distinct = out["*"]
+    assert count == 400
+    assert sorted((value, n) for value, n, _ in hitters) == sorted(collections.Counter(r[0] for r in rows).items())
+    assert abs(distinct - 400) <= 400 * 0.1
+
+
+def test_text_splits_cover_every_line_once(tmp_path):
+    fname = str(tmp_path / "lines")
+    lines = ["line {0} {1}".format(i, "x" * (i % 13)) for i in range(500)]
+    with open(fname, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    splits = inprocess._splits([fname], {"mapred.max.split.size": "100"})
+    assert len(splits) > 1
+    assert [line for s in splits for _, line in inprocess._read_split(*s)] == lines
+
+
+def test_sort_key_orders_strings_like_typedbytes():
+    keys = ["bb", "a", "ab", "c", "aaa"]
+    assert sorted(keys, key = inprocess._sort_key) == ["a", "c", "ab", "bb", "aaa"]
+
+
+def test_key_field_partitioner_uses_the_first_field_only():
+    partition = inprocess._partitioner({"mapred.text.key.partitioner.options": "-k1,1"}, True, 5)
+    for key in ["k{0}".format(i) for i in range(50)]:
+        assert partition(key + "\t1") == partition(key + "\t2")
+
+
+def test_count_star_matches_a_counter(platform_args, write_table):
+    rows = [["k{0}".format(i % 37), "v{0}".format(i % 5)] for i in range(2000)]
+    path = write_table("t", rows, num_files = 3)
+    out = dict(inprocess.readtb(execute.select_count_star_where_and_groupby(platform_args, path, [0], filter_columns = [1], filter_vals = [["v0", "v1"]], invert_flags = [True])))
+    assert out == collections.Counter(r[0] for r in rows if r[1] not in ("v0", "v1"))
+
+
+def test_map_only_output_and_success_marker(platform_args, write_table):
+    rows = [["k{0}".format(i), str(i)] for i in range(100)]
+    path = write_table("t", rows, num_files = 2)
+    platform_args.map_only = True
+    out = execute.select_where(platform_args, path, [0], target_columns = [1])
+    assert os.path.exists(os.path.join(out, "_SUCCESS"))
+    assert sorted(inprocess.readtb(out)) == sorted((r[0], r[1]) for r in rows)
@@ -0,0 +1,96 @@
+import random
+
+import pytest
+
+execute = pytest.importorskip("python_hiveish.mapreduce.execute")
+
+
+def _rows(seed, n, num_keys):
+    random.seed(seed)
+    return [["k{0}".format(random.randint(0, num_keys)), "v{0}".format(i)] for i in range(n)]
+
+
+def _reference_join(table_1, table_2, join_switch):
+    """(key, value) rows of a join on column 0 projected to column 1 of each table; table 2 has unique keys"""
+    table_2 = dict((r[0], r[1]) for r in table_2)
+    out = []
+    for k, v in table_1:
+        if join_switch == "inner_join" and k in table_2:
+            out.append((k, v + "," + table_2[k]))
+        elif join_switch == "left_join":
+            out.append((k, v + "," + table_2[k] if k in table_2 else v))
+        elif join_switch == "semi_join" and k in table_2:
+            out.append((k, v))
+        elif join_switch == "anti_join" and k not in table_2:
+            out.append((k, v))
+    return sorted(out)
+
+
+@pytest.mark.parametrize("join_switch", ["inner_join", "left_join", "semi_join", "anti_join"])
+def test_broadcast_join_of_a_job_output(platform_args, write_table, read_output, join_switch):
+    table_1 = _rows(1, 300, 40)
+    table_2 = [["k{0}".format(i), "w{0}".format(i)] for i in range(0, 60, 2)]
+    t1 = write_table("t1", table_1)
+    t2 = execute.select_where(platform_args, write_table("t2", table_2), [0]) #typedbytes, like any job output
+    out = read_output(execute.join(platform_args, t1, t2, [0], [0], table_1_target_columns = [1], table_2_target_columns = [1], 
+                                   join_switch = join_switch, join_strategy = "broadcast"))
+    assert out == _reference_join(table_1, table_2, join_switch)
+
+
+def _reference_many_to_many(table_1, table_2, join_switch):
+    out = []
+    for k, v in table_1:
+        matches = [w for k2, w in table_2 if k2 == k]
+        out += [(k, v + "," + w) for w in matches] or ([(k, v)] if join_switch == "left_join" else [])
+    return sorted(out)
+
+
+@pytest.mark.parametrize("join_strategy", ["repartition", "broadcast", "auto", "merge"])
+@pytest.mark.parametrize("join_switch", ["inner_join", "left_join", "semi_join", "anti_join"])
+def test_join_strategies_match_the_reference(platform_args, write_table, read_output, join_strategy, join_switch):
+    table_1 = _rows(2, 500, 80)
+    table_2 = [["k{0}".format(i), "w{0}".format(i)] for i in range(0, 100, 3)]
+    t1, t2 = write_table("t1", table_1, num_files = 3), write_table("t2", table_2)
+    if join_strategy == "merge":
+        t1 = execute.select_where(platform_args, t1, [0], num_buckets = 4)
+        t2 = execute.select_where(platform_args, t2, [0], num_buckets = 4)
+    out = read_output(execute.join(platform_args, t1, t2, [0], [0], table_1_target_columns = [1], table_2_target_columns = [1], 
+                                   join_switch = join_switch, join_strategy = join_strategy))
+    assert out == _reference_join(table_1, table_2, join_switch)
+
+
+@pytest.mark.parametrize("options", [dict(skew_salts = 3, skew_keys = [["k1"], ["k2"]]), dict(skew_salts = 3, skew_sample_rate = 1.0, skew_top_n = 2), 
+                                     dict(bloom_fp_rate = 0.01)])
+@pytest.mark.parametrize("join_switch", ["inner_join", "left_join"])
+def test_skewed_and_bloom_filtered_joins_match_the_reference(platform_args, write_table, read_output, options, join_switch):
+    table_1 = _rows(3, 400, 30) + [["k1", "hot{0}".format(i)] for i in range(200)] + [["k2", "hot{0}".format(i)] for i in range(100)]
+    table_2 = [["k{0}".format(i), "w{0}".format(i)] for i in range(0, 30, 2)]
+    out = read_output(execute.join(platform_args, write_table("t1", table_1, num_files = 2), write_table("t2", table_2), [0], [0], 
+                                   table_1_target_columns = [1], table_2_target_columns = [1], join_switch = join_switch, **options))
+    assert out == _reference_join(table_1, table_2, join_switch)
+
+
+@pytest.mark.parametrize("group_max_bytes", [64*1024*1024, 20])
+@pytest.mark.parametrize("join_switch", ["inner_join", "left_join"])
+def test_many_to_many_join_matches_the_reference(platform_args, write_table, read_output, group_max_bytes, join_switch):
+    table_1 = _rows(4, 200, 20)
+    table_2 = _rows(5, 150, 25)
+    out = read_output(execute.join(platform_args, write_table("t1", table_1), write_table("t2", table_2), [0], [0], 
+                                   table_1_target_columns = [1], table_2_target_columns = [1], join_switch = join_switch, 
+                                   many_to_many = True, group_max_bytes = group_max_bytes))
+    assert out == _reference_many_to_many(table_1, table_2, join_switch)
+
+
+@pytest.mark.parametrize("join_switch", ["inner_join", "left_join"])
+def test_multi_join_matches_the_reference(platform_args, write_table, read_output, join_switch):
+    table_1 = _rows(6, 300, 40)
+    table_2 = [["k{0}".format(i), "b{0}".format(i)] for i in range(0, 40, 2)]
+    table_3 = [["k{0}".format(i), "c{0}".format(i)] for i in range(0, 40, 3)]
+    tables = [dict(path = write_table(name, rows), key_columns = [0], target_columns = [1]) for name, rows in [("t1", table_1), ("t2", table_2), ("t3", table_3)]]
+    out = read_output(execute.multi_join(platform_args, tables, join_switch = join_switch))
+    b, c = dict(table_2), dict(table_3)
+    if join_switch == "inner_join":
+        expected = [(k, ",".join([v, b[k], c[k]])) for k, v in table_1 if k in b and k in c]
+    else:
+        expected = [(k, ",".join([v, b.get(k, ""), c.get(k, "")])) for k, v in table_1] #a missing table keeps its (empty) columns
+    assert out == sorted(expected)
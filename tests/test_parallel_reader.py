@@ -0,0 +1,62 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("hadoopy")
+from python_hiveish import hdfs_tools
+
+
+@pytest.fixture
+def parts(monkeypatch):
+    """12 fake part files of different lengths, read through hadoopy.readtb"""
+    data = dict(("part-{0:05d}".format(i), [("p{0}".format(i), j) for j in range(i * 37 % 101)]) for i in range(12))
+    
+    def readtb(part):
+        for record in data[part]:
+            if part == "part-00007" and record[1] == 5 and data.get("fail"):
+                raise IOError("cannot read " + part)
+            yield record
+    monkeypatch.setattr(hdfs_tools, "hdfs_ls_files", lambda path: sorted(k for k in data if k.startswith("part")))
+    monkeypatch.setattr(hdfs_tools.hadoopy, "readtb", readtb)
+    return data
+
+
+def _all(data):
+    return [r for part in sorted(k for k in data if k.startswith("part")) for r in data[part]]
+
+
+@pytest.mark.parametrize("num_threads", [1, 3, 16])
+def test_ordered_read_keeps_the_part_order(parts, num_threads):
+    assert list(hdfs_tools.read_hdfs_parallel("t", num_threads = num_threads, prefetch = 1, batch_size = 7)) == _all(parts)
+
+
+def test_unordered_read_returns_every_record(parts):
+    assert sorted(hdfs_tools.read_hdfs_parallel("t", num_threads = 4, ordered = False, batch_size = 5)) == sorted(_all(parts))
+
+
+def test_batches(parts):
+    batches = list(hdfs_tools.read_hdfs_parallel("t", num_threads = 4, batch_size = 10, batches = True))
+    assert all(0 < len(b) <= 10 for b in batches)
+    assert [r for b in batches for r in b] == _all(parts)
+
+
+def test_a_failing_part_raises(parts):
+    parts["fail"] = True
+    with pytest.raises(IOError):
+        list(hdfs_tools.read_hdfs_parallel("t", num_threads = 4, batch_size = 2))
+
+
+def test_abandoned_reader_stops_its_threads(parts):
+    reader = hdfs_tools.read_hdfs_parallel("t", num_threads = 4, prefetch = 1, batch_size = 1)
+    next(reader)
+    reader.close()
+    deadline = time.time() + 5
+    while any(t.name.startswith("hiveish-read-") for t in threading.enumerate()) and time.time() < deadline:
+        time.sleep(0.05)
+    assert not any(t.name.startswith("hiveish-read-") for t in threading.enumerate())
+
+
+def test_count_and_generator(parts):
+    assert hdfs_tools.count_hdfs_lines("t", num_threads = 5) == len(_all(parts))
+    assert list(hdfs_tools.read_hdfs_as_generator("t", read_all_at_once = True)) == _all(parts)
@@ -0,0 +1,104 @@
+import os
+
+import pytest
+
+execute = pytest.importorskip("python_hiveish.mapreduce.execute")
+
+
+@pytest.fixture
+def events(tmp_path):
+    """events/dt=<day>/region=<region>/part-00000 holding user,amount rows; returns (path, rows with dt and region appended)"""
+    rows = []
+    for day in ["2026-10-01", "2026-10-02", "2026-10-03"]:
+        for region in ["us", "eu", "apac"]:
+            d = tmp_path / "events" / "dt={0}".format(day) / "region={0}".format(region)
+            d.mkdir(parents = True)
+            part = [["u{0}".format(i % 5), str(i)] for i in range(len(region) * 10)]
+            with open(str(d / "part-00000"), "w") as f:
+                f.write("".join(",".join(r) + "\n" for r in part))
+            rows += [r + [day, region] for r in part]
+    return str(tmp_path / "events"), rows
+
+
+def test_select_on_partition_columns(platform_args, events, read_output):
+    path, rows = events
+    out = read_output(execute.select_where(platform_args, path, ["region"], target_columns = [1, "dt"], filter_columns = ["dt", 0], 
+                                           filter_vals = [["2026-10-02", "2026-10-03"], ["u1"]], invert_flags = [False, False], 
+                                           filter_operators = ["range", "in"]))
+    assert out == sorted((r[3], r[1] + "," + r[2]) for r in rows if r[2] >= "2026-10-02" and r[0] == "u1")
+
+
+@pytest.mark.parametrize("options", [dict(skew_salts = 2, skew_sample_rate = 1.0, skew_top_n = 1), dict(bloom_fp_rate = 0.01), dict()])
+def test_join_keyed_on_a_partition_column(platform_args, events, write_table, read_output, options):
+    #the helper jobs of the skewed and Bloom filtered joins read the pruned partitions as they are; they must not prune them again
+    path, rows = events
+    regions = write_table("regions", [["us", "America"], ["eu", "Europe"]])
+    out = read_output(execute.join(platform_args, path, regions, ["region"], [0], table_1_target_columns = [1], table_2_target_columns = [1], 
+                                   table_1_filter_columns = ["dt"], table_1_filter_vals = [["2026-10-01"]], table_1_invert_flags = [False], **options))
+    names = {"us": "America", "eu": "Europe"}
+    assert out == sorted((r[3], r[1] + "," + names[r[3]]) for r in rows if r[2] == "2026-10-01" and r[3] in names)
+
+
+def test_filters_matching_no_partition_raise(platform_args, events):
+    path, _ = events
+    with pytest.raises(Exception):
+        execute.select_where(platform_args, path, [0], filter_columns = ["dt"], filter_vals = [["1999-01-01"]], invert_flags = [False])
+    with pytest.raises(Exception):
+        execute.select_where(platform_args, path, [0], filter_columns = ["nope"], filter_vals = [["x"]], invert_flags = [False])
+
+
+def test_bloom_filtered_semi_join_against_a_partition_column(platform_args, events, write_table, read_output):
+    path, rows = events
+    regions = write_table("regions", [["us", "America"], ["eu", "Europe"], ["mars", "Mars"]])
+    out = read_output(execute.join(platform_args, regions, path, [0], ["region"], table_1_target_columns = [1], 
+                                   table_2_filter_columns = ["dt", "region"], table_2_filter_vals = [["2026-10-01"], ["eu", "apac"]], 
+                                   table_2_invert_flags = [False, False], join_switch = "semi_join", bloom_fp_rate = 0.01))
+    assert out == [("eu", "Europe")]
+
+
+@pytest.mark.parametrize("with_unpruned_query", [True, False])
+def test_batch_queries_are_partition_pruned_one_by_one(platform_args, events, read_output, with_unpruned_query):
+    path, _ = events
+    queries = [dict(switch = "select_where", key_columns = [0], target_columns = [1, "region"], filter_columns = ["dt"], filter_vals = [["2026-10-02"]], invert_flags = [False]),
+               dict(switch = "select_count_star_where_and_groupby", key_columns = ["dt"], filter_columns = ["region", 0], filter_vals = [["eu"], ["u1", "u2"]], invert_flags = [False, False])]
+    if with_unpruned_query:
+        queries.append(dict(switch = "select_count_star_where_and_groupby", key_columns = ["region", 0]))
+    out_paths = execute.select_where_batch(platform_args, path, queries)
+    for q, out in zip(queries, out_paths):
+        q = dict(q)
+        assert read_output(out) == read_output(getattr(execute, q.pop("switch"))(platform_args, path, **q))
+
+
+def test_aggregates_over_partition_columns(platform_args, events, read_output):
+    path, rows = events
+    out = read_output(execute.select_aggregates_where_and_groupby(platform_args, path, [0], [("count_distinct", "dt"), ("max", 1), ("heavy_hitters", "region", 10)], 
+                                                                  filter_columns = ["dt"], filter_vals = [["2026-10-01"]], invert_flags = [True]))
+    users = sorted(set(r[0] for r in rows))
+    assert [k for k, _ in out] == users
+    for user, (days, top, regions) in out:
+        picked = [r for r in rows if r[0] == user and r[2] != "2026-10-01"]
+        assert days == 2 and top == max(int(r[1]) for r in picked)
+        assert sorted((value, count) for value, count, _ in regions) == sorted((g, sum(1 for r in picked if r[3] == g)) for g in set(r[3] for r in picked))
+
+
+def test_pruning_lists_each_level_at_once(platform_args, events, monkeypatch):
+    path, _ = events
+    listings = []
+    ls_dirs = execute._ls_dirs
+    monkeypatch.setattr(execute, "_ls_dirs", lambda p, pattern: listings.append(pattern) or ls_dirs(p, pattern))
+    pruned = execute._partition_pruned(platform_args, path, ["region"], [["eu"]], [False], None)[0]
+    assert sorted(os.path.relpath(d, path) for d in pruned) == [os.path.join("dt=" + day, "region=eu") for day in ["2026-10-01", "2026-10-02", "2026-10-03"]]
+    assert len(listings) == 3 #dt, region, and the (empty) level below
+
+
+def test_hdfs_ls_dirs_lists_every_pattern_in_one_call(monkeypatch):
+    from python_hiveish import hdfs_tools
+    calls = []
+    
+    def check_output(cmd, **kwargs):
+        calls.append(cmd)
+        out = b"".join("drwxr-xr-x   - u g 0 2026-10-01 00:00 {0}\n".format(p.replace("*=*", "dt=1")).encode("utf-8") for p in cmd[4:] if "missing" not in p)
+        raise hdfs_tools.subprocess.CalledProcessError(1, cmd, out) #one of the patterns matches nothing
+    monkeypatch.setattr(hdfs_tools.subprocess, "check_output", check_output)
+    assert hdfs_tools.hdfs_ls_dirs(["/t/a/*=*", "/t/missing/*=*", "/t/b/*=*"]) == ["/t/a/dt=1", "/t/b/dt=1"]
+    assert len(calls) == 1
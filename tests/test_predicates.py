@@ -0,0 +1,67 @@
+import random
+import re
+
+import pytest
+
+from python_hiveish.mapreduce import predicates
+
+
+def _reference(op, values, x):
+    """the condition evaluated the slow, obvious way"""
+    if op == "in":
+        return x in values
+    if op == "prefix":
+        return any(x.startswith(v) for v in values)
+    if op == "regex":
+        return any(re.search(v, x) for v in values)
+    try:
+        x = float(x)
+    except ValueError:
+        return None #not a number; fails inverted or not
+    if op == "range":
+        return (values[0] == "" or float(values[0]) <= x) and (values[1] == "" or x <= float(values[1]))
+    return predicates.COMPARISONS[op](x, float(values[0]))
+
+
+CONDITIONS = [("in", ["a", "c"]), ("prefix", ["b", "ab"]), ("regex", ["^a.c$", "x+"]), ("range", ["-5", "5.5"]), ("range", ["", "0"]), 
+              ("<", ["3"]), ("<=", ["3"]), (">", ["-1"]), (">=", ["2"]), ("==", ["1"]), ("!=", ["1"])]
+
+
+@pytest.mark.parametrize("op,values", CONDITIONS)
+@pytest.mark.parametrize("invert", [False, True])
+def test_each_operator_matches_the_reference(op, values, invert):
+    where = predicates.compile_where([1], [op], [values], [invert])
+    for x in ["a", "b", "c", "abc", "ab", "xx", "", "1", "1.0", "3", "-5", "5.5", "5.6", "-7", "2"]:
+        expected = _reference(op, values, x)
+        expected = False if expected is None else expected != invert
+        assert where(["ignored", x]) == expected, (op, values, invert, x)
+
+
+def test_reordering_never_changes_the_result():
+    random.seed(11)
+    columns, operators, values, inverts = [0, 1, 2], ["regex", "in", "<"], [["^1"], ["a", "b"], ["50"]], [False, True, False]
+    where = predicates.compile_where(columns, operators, values, inverts)
+    for i in range(3 * predicates.REORDER_EVERY + 7):
+        row = [str(random.randint(0, 200)), random.choice("abcd"), str(random.randint(0, 100))]
+        expected = row[0].startswith("1") and row[1] not in ("a", "b") and float(row[2]) < 50
+        assert where(row) == expected
+    assert sorted(where.columns) == columns
+
+
+def test_date_ranges_compare_strings():
+    where = predicates.compile_where([0], ["range"], [["2026-10-01", "2026-10-31"]], [False])
+    assert where(["2026-10-15"]) and where(["2026-10-01"]) and not where(["2026-11-01"])
+
+
+def test_filter_values_round_trip():
+    values = ["a,b", "c|d", "^x.*$", "100%", ""]
+    assert predicates.decode_filter_vals(predicates.encode_filter_vals(values)) == values
+
+
+def test_bad_clauses_raise():
+    with pytest.raises(Exception):
+        predicates.compile_where([0], ["range"], [["1"]], [False])
+    with pytest.raises(Exception):
+        predicates.compile_where([0], ["like"], [["1"]], [False])
+    with pytest.raises(Exception):
+        predicates.compile_where([0, 1], ["in"], [["1"]], [False])
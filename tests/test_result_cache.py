@@ -0,0 +1,64 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip("hadoopy")
+from python_hiveish import hdfs_tools
+from python_hiveish.mapreduce import execute, inprocess
+
+
+def test_identical_concurrent_jobs_share_one_complete_output(platform_args, write_table):
+    path = write_table("t", [["k{0}".format(i % 11), str(i)] for i in range(500)], num_files = 2)
+    platform_args.result_cache = True
+    handles = [execute.submit(platform_args, execute.select_count_star_where_and_groupby, path, [0]) for _ in range(4)]
+    outs = set(h.result() for h in handles)
+    assert len(outs) == 1
+    out = outs.pop()
+    assert os.path.basename(out).startswith(execute.RESULT_CACHE_PREFIX)
+    assert os.path.exists(os.path.join(out, "_SUCCESS"))
+    assert sum(v for _, v in inprocess.readtb(out)) == 500
+    #nothing but the cached output is left behind
+    assert [d for d in os.listdir(os.path.dirname(out))] == [os.path.basename(out)]
+
+
+def test_merge_join_key_covers_the_table_2_buckets(platform_args, write_table, read_output):
+    platform_args.result_cache = True
+    t1 = execute.select_where(platform_args, write_table("t1", [["k{0}".format(i), "a"] for i in range(20)]), [0], num_buckets = 2)
+    t2_rows = [["k{0}".format(i), "b"] for i in range(0, 20, 2)]
+    t2 = execute.select_where(platform_args, write_table("t2", t2_rows), [0], num_buckets = 2)
+    first = execute.join(platform_args, t1, t2, [0], [0], join_strategy = "merge")
+    assert len(read_output(first)) == 10
+    
+    t2_rows.append(["k1", "b"]) #table 2 changes; the input of the job (table 1) does not
+    t2_changed = execute.select_where(platform_args, write_table("t2_changed", t2_rows), [0], num_buckets = 2)
+    os.rename(t2, t2 + "_old")
+    os.rename(t2_changed, t2)
+    second = execute.join(platform_args, t1, t2, [0], [0], join_strategy = "merge")
+    assert second != first
+    assert len(read_output(second)) == 11
+
+
+def test_eviction_on_hdfs(monkeypatch):
+    """the hadoop switch lists the cached outputs with hadoop fs -du and -stat, whose output is bytes under python 3"""
+    now = time.time()
+    cached = ["/out/select_where/cache_old", "/out/join/cache_new", "/out/join/cache_kept"]
+    
+    def check_output(cmd, **kwargs):
+        if cmd[:4] == ["hadoop", "fs", "-du", "-s"]:
+            return b"".join("{0}  {0}  {1}\n".format(100, d).encode("utf-8") for d in cached)
+        if cmd[:3] == ["hadoop", "fs", "-stat"]:
+            mtimes = {"cache_old": now - 7200, "cache_new": now - 60, "cache_kept": now}
+            return b"".join("{0}\n".format(int(mtimes[d.split("/")[-1]] * 1000)).encode("utf-8") for d in cmd[4:])
+        raise AssertionError(cmd)
+    removed = []
+    monkeypatch.setattr(hdfs_tools.subprocess, "check_output", check_output)
+    monkeypatch.setattr(execute.hadoopy, "rmr", removed.append)
+    p = execute.PlatformArgs("python", "/tmp", "/out", "", "", "hadoop", [], result_cache = True, result_cache_max_age = 3600)
+    execute._evict_result_cache(p, "/out/join/cache_kept")
+    assert removed == ["/out/select_where/cache_old"]
+    
+    removed[:] = []
+    p.result_cache_max_age, p.result_cache_max_bytes = None, 150
+    execute._evict_result_cache(p, "/out/join/cache_kept")
+    assert removed == ["/out/join/cache_new", "/out/select_where/cache_old"]
@@ -0,0 +1,40 @@
+import threading
+
+import pytest
+
+from python_hiveish.mapreduce import scheduler
+
+
+def test_dependencies_are_resolved():
+    s = scheduler.JobScheduler(max_concurrent_jobs = 2)
+    a = s.submit(lambda: 1)
+    b = s.submit(lambda: 2)
+    total = s.submit(lambda xs, y: sum(xs) + y, [a, b], y = a)
+    assert total.result(timeout = 10) == 4
+
+
+def test_failed_dependency_fails_the_dependent_job():
+    s = scheduler.JobScheduler()
+    def fail():
+        raise ValueError("boom")
+    ran = []
+    dependent = s.submit(ran.append, s.submit(fail))
+    with pytest.raises(ValueError):
+        dependent.result(timeout = 10)
+    assert ran == []
+
+
+def test_done_jobs_are_not_kept():
+    s = scheduler.JobScheduler()
+    handles = [s.submit(lambda i: i, i) for i in range(50)]
+    assert [h.result(timeout = 10) for h in handles] == list(range(50))
+    assert not s._pending
+
+
+def test_wait_blocks_for_running_jobs():
+    s = scheduler.JobScheduler()
+    release = threading.Event()
+    h = s.submit(release.wait, 10)
+    threading.Timer(0.1, release.set).start()
+    s.wait()
+    assert h.done()
@@ -0,0 +1,88 @@
+import collections
+import random
+
+import pytest
+
+from python_hiveish.mapreduce import sketches
+
+
+def _hll(values, p, num_chunks = 1):
+    init, merge = sketches.hll_init(p), sketches.hll_merge(p)
+    partials = []
+    for i in range(num_chunks):
+        state = {}
+        for v in values[i::num_chunks]:
+            state = merge(state, init(v))
+        partials.append(sketches.hll_wire(state))
+    state = {}
+    for s in partials:
+        state = merge(state, s)
+    return sketches.hll_estimate(p)(state)
+
+
+@pytest.mark.parametrize("n", [0, 1, 10, 1000, 50000])
+@pytest.mark.parametrize("num_chunks", [1, 7])
+def test_hll_estimate_is_within_a_few_standard_errors(n, num_chunks):
+    values = ["v{0}".format(i) for i in range(n)] * 2 #duplicates do not count
+    p = sketches.hll_precision(0.02)
+    assert abs(_hll(values, p, num_chunks) - n) <= max(2, 4 * 0.02 * n)
+
+
+def test_hll_precision():
+    assert sketches.hll_precision(0.02) == 12
+    assert sketches.hll_precision(0.5) == 4
+    assert sketches.hll_precision(0.0001) == 16
+
+
+def test_hll_merge_is_order_independent():
+    p = 8
+    init, merge = sketches.hll_init(p), sketches.hll_merge(p)
+    sketches_ = [init("v{0}".format(i)) for i in range(500)]
+    forward, backward = {}, {}
+    for s in sketches_:
+        forward = merge(forward, dict(s))
+    for s in reversed(sketches_):
+        backward = merge(backward, dict(s))
+    assert bytes(forward) == bytes(backward) #dense after 500 values in 256 registers
+
+
+def test_empty_values_are_skipped():
+    assert sketches.hll_init(8)("") == {}
+    assert sketches.space_saving_init("") == {}
+
+
+def _space_saving(values, k, num_chunks):
+    merge = sketches.space_saving_merge(k)
+    partials = []
+    for i in range(num_chunks):
+        state = {}
+        for v in values[i::num_chunks]:
+            state = merge(state, sketches.space_saving_init(v))
+        partials.append(state)
+    state = {}
+    for s in partials:
+        state = merge(state, s)
+    return sketches.space_saving_top(state)
+
+
+@pytest.mark.parametrize("num_chunks", [1, 4])
+def test_space_saving_guarantees(num_chunks):
+    random.seed(num_chunks)
+    k = 20
+    values = ["hot{0}".format(i % 3) for i in range(3000)] + ["cold{0}".format(random.randint(0, 2000)) for _ in range(3000)]
+    random.shuffle(values)
+    counts = collections.Counter(values)
+    top = _space_saving(values, k, num_chunks)
+    assert len(top) <= k
+    listed = dict((x, (count, error)) for x, count, error in top)
+    for x, n in counts.items():
+        if n > len(values) / float(k): #every value above N/k is listed
+            assert x in listed
+    for x, (count, error) in listed.items(): #counts are over estimates by at most their error
+        assert count - error <= counts[x] <= count
+    assert [x for x, _, _ in top[:3]] == sorted(["hot0", "hot1", "hot2"], key=lambda x: (-listed[x][0], x))
+
+
+def test_space_saving_is_exact_below_k():
+    values = ["a"] * 5 + ["b"] * 3 + ["c"]
+    assert _space_saving(values, 10, 3) == [["a", 5, 0], ["b", 3, 0], ["c", 1, 0]]
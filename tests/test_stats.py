@@ -0,0 +1,81 @@
+import json
+import os
+import time
+
+from python_hiveish.mapreduce import stats
+
+
+def test_catalog_persists_and_merges_updates(tmp_path):
+    path = str(tmp_path / "stats.json")
+    catalog = stats.StatsCatalog(path)
+    catalog.update("/t", rows = 100, distinct = {"0": 10, "1": 50})
+    catalog.update("/t", bytes = 2048, updated = time.time())
+    reloaded = stats.StatsCatalog(path)
+    assert reloaded.get("/t")["rows"] == 100 and reloaded.get("/t")["bytes"] == 2048
+    assert reloaded.get("/other") == {}
+    assert os.listdir(str(tmp_path)) == ["stats.json"] #the temporary file was renamed into place
+    assert stats.table_key(["/b", "/a"]) == "/a,/b"
+
+
+def test_catalog_estimates(tmp_path):
+    catalog = stats.StatsCatalog(str(tmp_path / "stats.json"))
+    catalog.update("/t", rows = 100, distinct = {"0": 10, "1": 50}, heavy_hitters = {"0": [["a", 40]]}, bytes = 10, updated = time.time() - 100)
+    assert catalog.distinct("/t", [0]) == 10
+    assert catalog.distinct("/t", [0, 1]) == 100 #the product, capped at the rows
+    assert catalog.distinct("/t", [2]) is None
+    assert catalog.heavy_hitters("/t", 0) == [["a", 40]] and catalog.heavy_hitters("/t", 1) is None
+    assert catalog.bytes("/t") == 10 and catalog.bytes("/t", max_age = 1000) == 10 and catalog.bytes("/t", max_age = 10) is None
+
+
+def _platform_args(platform_args, tmp_path, **kw):
+    from python_hiveish.mapreduce import execute
+    args = execute.PlatformArgs("python", platform_args.temp_path, platform_args.output_root, "", "", "inprocess", [], num_mappers = 2, 
+                                stats_catalog = str(tmp_path / "stats.json"), **kw)
+    return execute, args
+
+
+def test_collect_stats_and_planning(platform_args, write_table, read_output, tmp_path):
+    execute, args = _platform_args(platform_args, tmp_path, bytes_per_reducer = 1000)
+    rows = [["u{0}".format(i), "k0" if i % 3 == 0 else "k{0}".format(i % 50), str(i % 9)] for i in range(3000)]
+    t = write_table("t", rows, num_files = 3)
+    recorded = execute.collect_stats(args, t, [0, 1, 2])
+    assert recorded["rows"] == 3000
+    assert abs(recorded["distinct"]["0"] - 3000) < 300 #nearly unique
+    assert recorded["distinct"]["1"] == len(set(r[1] for r in rows)) and recorded["distinct"]["2"] == 9
+    assert recorded["heavy_hitters"]["1"][0] == ["k0", sum(1 for r in rows if r[1] == "k0")]
+    assert recorded["bytes"] == sum(os.path.getsize(os.path.join(t, f)) for f in os.listdir(t))
+    
+    assert execute._group_by_plan(args, t, [0])[0] is False #about one group per row: no combiner
+    assert execute._group_by_plan(args, t, [1])[0] is True
+    counts = dict(read_output(execute.select_count_star_where_and_groupby(args, t, [0])))
+    assert len(counts) == 3000 and set(counts.values()) == set([1])
+
+
+def test_catalog_keeps_only_the_input_tables(platform_args, write_table, read_output, tmp_path):
+    execute, args = _platform_args(platform_args, tmp_path)
+    t1 = write_table("t1", [["k{0}".format(i % 20), str(i)] for i in range(200)])
+    t2 = write_table("t2", [["k{0}".format(i), "w{0}".format(i)] for i in range(10)])
+    selected = execute.select_where(args, t2, [0])
+    counted = execute.select_count_star_where_and_groupby(args, selected, [0])
+    #the default join strategy is "auto" with a catalog, and table 2 is a small typedbytes job output: a broadcast join
+    joined = read_output(execute.join(args, t1, selected, [0], [0], table_1_target_columns = [1], table_2_target_columns = [1]))
+    assert len(joined) == 100 and all(v.endswith(",w" + k[1:]) for k, v in joined)
+    assert len(read_output(counted)) == 10
+    with open(str(tmp_path / "stats.json")) as f:
+        catalogued = json.load(f)
+    assert t2 in catalogued and set(catalogued) <= set([t1, t2]) #never the outputs of the jobs
+
+
+def test_batch_queries_are_planned_from_the_catalog(platform_args, write_table, read_output, tmp_path):
+    execute, args = _platform_args(platform_args, tmp_path, bytes_per_reducer = 10000)
+    rows = [["u{0}".format(i), "k{0}".format(i % 7)] for i in range(3000)]
+    t = write_table("t", rows, num_files = 3)
+    execute.collect_stats(args, t, [0, 1])
+    queries = [dict(switch = "select_count_star_where_and_groupby", key_columns = [0]),  #about one group per row
+               dict(switch = "select_count_star_where_and_groupby", key_columns = [1]),  #7 groups
+               dict(switch = "select_where", target_columns = [1], filter_columns = [1], filter_vals = [["k1"]], invert_flags = [False])]
+    out_paths = execute.select_where_batch(args, t, queries)
+    parts = [len([f for f in os.listdir(out) if f.startswith("part-")]) for out in out_paths]
+    assert parts[1] == 1 and parts[0] > 1 and parts[2] > 1 #reducers for the expected shuffle of each query
+    assert dict(read_output(out_paths[1])) == dict(("k{0}".format(i), sum(1 for r in rows if r[1] == "k{0}".format(i))) for i in range(7))
+    assert len(read_output(out_paths[0])) == 3000 and len(read_output(out_paths[2])) == sum(1 for r in rows if r[1] == "k1")